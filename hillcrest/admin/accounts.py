@@ -0,0 +1,112 @@
+# admin/accounts.py
+"""
+Login account provisioning for employees.
+
+Usernames are resolved against the existing ones with a single query, and
+passwords for a batch are hashed in a thread pool: PBKDF2 is deliberately
+slow, but hashlib.pbkdf2_hmac releases the GIL while it runs, so threads use
+several cores without forking the web worker.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Q
+from django.utils.crypto import get_random_string
+
+from doctor.versioning import bump
+from .models import Employee
+from .reference import reference_data
+
+User = get_user_model()
+
+
+def base_username(employee):
+    # role + id + first initial + last name, e.g. doc_12_jsmith
+    base = (employee.first_name[:1] + (employee.last_name or "")).lower()
+    base = "".join(ch for ch in base if ch.isalnum()) or "user"
+    return f"{employee.role[:3]}_{employee.id}_{base}"
+
+
+def resolve_usernames(wanted):
+    """
+    Map each wanted username to a free one (appending 1, 2, ... on a clash),
+    reading all possibly clashing usernames in one query. Also keeps the
+    names unique within `wanted`. Names are compared case-insensitively, as
+    a case-insensitive collation (MySQL's default) would on insert.
+    """
+    if not wanted:
+        return []
+    prefixes = reduce(or_, (Q(username__istartswith=name) for name in {n.lower() for n in wanted}))
+    taken = {u.lower() for u in User.objects.filter(prefixes).values_list("username", flat=True)}
+
+    resolved = []
+    for name in wanted:
+        username, suffix = name, 0
+        while username.lower() in taken:
+            suffix += 1
+            username = f"{name}{suffix}"
+        taken.add(username.lower())
+        resolved.append(username)
+    return resolved
+
+
+def hash_passwords(passwords):
+    """
+    make_password() for each password, spread over ACCOUNT_HASH_WORKERS
+    threads when the batch is large enough to be worth starting them.
+    """
+    workers = getattr(settings, "ACCOUNT_HASH_WORKERS", None) or os.cpu_count() or 1
+    if workers < 2 or len(passwords) < getattr(settings, "ACCOUNT_HASH_POOL_MIN", 4):
+        return [make_password(p) for p in passwords]
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(passwords))) as pool:
+        return list(pool.map(make_password, passwords))
+
+
+def generate_accounts(employees):
+    """
+    Create a login for each employee (that has none yet) in one transaction.
+    Returns [(employee, username, plaintext_password)].
+    """
+    employees = [e for e in employees if e.user_id is None]
+    if not employees:
+        return []
+
+    usernames = resolve_usernames([base_username(e) for e in employees])
+    passwords = [get_random_string(length=10) for _ in employees]
+    hashes = hash_passwords(passwords)
+
+    with transaction.atomic():
+        # skip employees that got an account while the passwords were hashed
+        still_free = set(
+            Employee.objects.select_for_update()
+            .filter(id__in=[e.id for e in employees], user__isnull=True)
+            .values_list("id", flat=True)
+        )
+        rows = [
+            (e, u, p, h) for e, u, p, h in zip(employees, usernames, passwords, hashes) if e.id in still_free
+        ]
+        users = User.objects.bulk_create(
+            [User(username=u, password=h, is_active=True) for _, u, _, h in rows]
+        )
+        if any(user.pk is None for user in users):
+            # backends without RETURNING (MySQL) don't set the new ids
+            ids = dict(User.objects.filter(username__in=[u.username for u in users]).values_list("username", "id"))
+            for user in users:
+                user.pk = ids[user.username]
+
+        for (employee, *_), user in zip(rows, users):
+            employee.user = user
+        Employee.objects.bulk_update([e for e, *_ in rows], ["user"])
+
+        # bulk_update doesn't send post_save
+        bump("employees")
+        transaction.on_commit(reference_data.clear)
+
+    return [(e, u, p) for e, u, p, _ in rows]
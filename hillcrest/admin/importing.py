@@ -0,0 +1,130 @@
+# admin/importing.py
+"""
+Bulk employee import from a CSV or NDJSON upload.
+
+Rows are read lazily from the upload, validated with
+EmployeeImportSerializer and inserted with one bulk_create per
+chunk, so memory depends on the chunk size, not on the file size. Rows that
+fail validation are skipped and reported; the valid ones are still created.
+"""
+import codecs
+import csv
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from doctor.versioning import bump
+from .models import Employee
+from .reference import reference_data
+from .serializers import EmployeeImportSerializer
+
+FORMAT_CSV = "csv"
+FORMAT_NDJSON = "ndjson"
+
+CONTENT_TYPES = {
+    "text/csv": FORMAT_CSV,
+    "application/csv": FORMAT_CSV,
+    "application/x-ndjson": FORMAT_NDJSON,
+    "application/ndjson": FORMAT_NDJSON,
+    "application/jsonl": FORMAT_NDJSON,
+}
+EXTENSIONS = {".csv": FORMAT_CSV, ".ndjson": FORMAT_NDJSON, ".jsonl": FORMAT_NDJSON}
+
+
+class MalformedRow(Exception):
+    pass
+
+
+def detect_format(content_type=None, filename=None):
+    if filename:
+        for ext, fmt in EXTENSIONS.items():
+            if filename.lower().endswith(ext):
+                return fmt
+    if content_type:
+        return CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+    return None
+
+
+def iter_rows(stream, fmt):
+    """
+    Yield one dict per record (or a MalformedRow) from an iterable of byte
+    lines, e.g. an UploadedFile or the HttpRequest itself.
+    """
+    lines = codecs.iterdecode(stream, "utf-8-sig")
+    if fmt == FORMAT_CSV:
+        for row in csv.DictReader(lines):
+            # csv puts surplus columns under the None key
+            if None in row:
+                yield MalformedRow("Too many columns.")
+            else:
+                yield {k.strip(): (v or "").strip() for k, v in row.items() if k}
+        return
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield MalformedRow("Invalid JSON.")
+            continue
+        yield record if isinstance(record, dict) else MalformedRow("Expected a JSON object.")
+
+
+def _clean(record):
+    # CSV has no nulls: treat empty optional cells as missing
+    return {k: v for k, v in record.items() if v not in ("", None)}
+
+
+def import_employees(rows, chunk_size=None, max_errors=None):
+    """
+    Validate and insert `rows` (an iterable of dicts / MalformedRow).
+    Returns {"created", "failed", "errors": [{"row", "errors"}], "errors_truncated"}.
+    """
+    chunk_size = chunk_size or getattr(settings, "EMPLOYEE_IMPORT_CHUNK_SIZE", 1000)
+    max_errors = max_errors if max_errors is not None else getattr(settings, "EMPLOYEE_IMPORT_MAX_ERRORS", 1000)
+    report = {"created": 0, "failed": 0, "errors": [], "errors_truncated": False}
+
+    def fail(row_no, errors):
+        report["failed"] += 1
+        if len(report["errors"]) < max_errors:
+            report["errors"].append({"row": row_no, "errors": errors})
+        else:
+            report["errors_truncated"] = True
+
+    # one serializer instance for every row, so its fields are only built once
+    validator = EmployeeImportSerializer()
+    rows = iter(rows)
+    row_no = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+
+        employees = []
+        for record in chunk:
+            row_no += 1
+            if isinstance(record, MalformedRow):
+                fail(row_no, {"non_field_errors": [str(record)]})
+                continue
+            try:
+                attrs = validator.run_validation(_clean(record))
+            except ValidationError as exc:
+                fail(row_no, exc.detail)
+                continue
+            employees.append(Employee(**attrs))
+
+        if employees:
+            with transaction.atomic():
+                Employee.objects.bulk_create(employees)
+            report["created"] += len(employees)
+
+    if report["created"]:
+        # bulk_create doesn't send post_save
+        bump("employees")
+        transaction.on_commit(reference_data.clear)
+    return report
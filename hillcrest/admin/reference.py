@@ -0,0 +1,95 @@
+# admin/reference.py
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+from doctor.versioning import versions
+from hillcrest.db_router import use_primary
+from .models import Department, Employee
+
+VERSION_KEYS = ("departments", "employees")
+
+
+class ReferenceDataCache:
+    """
+    Process-local snapshot of the reference data that changes a few times a
+    year: departments, employees by role and doctors by department.
+
+    The snapshot is stamped with the shared "departments" / "employees"
+    ResourceVersion counters (doctor/versioning.py). Local saves drop it
+    straight away through the signals in doctor/signals.py; other workers
+    notice the bumped counters the next time they re-check them, at most every
+    REFERENCE_DATA_CHECK_SECONDS.
+    """
+
+    def __init__(self, check_interval=2):
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._stamp = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        departments = {d.id: d for d in Department.objects.all()}
+        by_role = defaultdict(list)
+        doctors_by_department = defaultdict(list)
+        for employee in Employee.objects.select_related("department", "user"):
+            by_role[employee.role].append(employee)
+            if employee.role == Employee.ROLE_DOCTOR and employee.department_id:
+                doctors_by_department[employee.department_id].append(employee)
+        return {
+            "departments": departments,
+            "departments_by_name": {d.name.lower(): d for d in departments.values()},
+            "by_role": dict(by_role),
+            "doctors_by_department": dict(doctors_by_department),
+        }
+
+    def _get(self):
+        now = time.monotonic()
+        snapshot = self._snapshot
+        if snapshot is not None and now - self._checked_at < self.check_interval:
+            return snapshot
+        with self._lock:
+            if self._snapshot is not None and now - self._checked_at < self.check_interval:
+                return self._snapshot
+            # read the counters before loading, so a write racing the load
+            # leaves the snapshot stale-stamped and reloaded on the next check;
+            # both from the primary, so a lagging replica can't pair a new
+            # stamp with old rows and keep them until the next bump
+            with use_primary():
+                stamp = versions(VERSION_KEYS)
+                if self._snapshot is None or stamp != self._stamp:
+                    self._snapshot = self._load()
+                    self._stamp = stamp
+            self._checked_at = now
+            return self._snapshot
+
+    def departments(self):
+        return sorted(self._get()["departments"].values(), key=lambda d: d.name)
+
+    def department(self, department_id):
+        try:
+            return self._get()["departments"].get(int(department_id))
+        except (TypeError, ValueError):
+            return None
+
+    def department_by_name(self, name):
+        return self._get()["departments_by_name"].get(str(name).strip().lower())
+
+    def employees_by_role(self, role):
+        return list(self._get()["by_role"].get(role, ()))
+
+    def doctors_in_department(self, department_id):
+        return list(self._get()["doctors_by_department"].get(department_id, ()))
+
+    def clear(self):
+        with self._lock:
+            self._snapshot = None
+            self._stamp = None
+
+
+reference_data = ReferenceDataCache(
+    check_interval=getattr(settings, "REFERENCE_DATA_CHECK_SECONDS", 2),
+)
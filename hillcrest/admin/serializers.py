@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from .accounts import base_username, resolve_usernames
 from .models import Department, Employee
+from .reference import reference_data
 from django.utils.crypto import get_random_string
 from django.db import transaction
 from django.contrib.auth.hashers import make_password
@@ -14,10 +16,24 @@ class DepartmentSerializer(serializers.ModelSerializer):
         fields = ["id", "name"]
 
 
+class CachedDepartmentField(serializers.PrimaryKeyRelatedField):
+    """
+    department_id resolved from the reference-data cache instead of a query per write.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        department = reference_data.department(data)
+        if department is None:
+            self.fail("does_not_exist", pk_value=data)
+        return department
+
+
 class EmployeeSerializer(serializers.ModelSerializer):
     # show department as object when reading
     department = DepartmentSerializer(read_only=True)
-    department_id = serializers.PrimaryKeyRelatedField(
+    department_id = CachedDepartmentField(
         queryset=Department.objects.all(), source="department", write_only=True, required=False, allow_null=True
     )
 
@@ -58,6 +74,24 @@ class EmployeeSerializer(serializers.ModelSerializer):
         return attrs
 
 
+class EmployeeImportSerializer(EmployeeSerializer):
+    """
+    One row of a bulk import (admin/importing.py). The department can be given
+    by id (department_id) or by name (department), both resolved from the
+    reference-data cache.
+    """
+    department = serializers.CharField(source="department_name", write_only=True, required=False, allow_blank=True)
+
+    def validate(self, attrs):
+        name = attrs.pop("department_name", None)
+        if name and "department" not in attrs:
+            department = reference_data.department_by_name(name)
+            if department is None:
+                raise serializers.ValidationError({"department": f'Unknown department "{name}".'})
+            attrs["department"] = department
+        return super().validate(attrs)
+
+
 class AccountInfoSerializer(serializers.ModelSerializer):
     """
     Serializer that lists account info for employees who've got a user.
@@ -93,19 +127,11 @@ class GenerateAccountSerializer(serializers.Serializer):
         Creates Django user for the given employee.
         Returns (user, plaintext_password)
         """
-        username = validated_data.get("username")
         # generate username if not provided: role + id + first initial + last
-        if not username:
-            base = (employee.first_name[:1] + (employee.last_name or "")).lower()
-            base = "".join(ch for ch in base if ch.isalnum()) or "user"
-            username = f"{employee.role[:3]}_{employee.id}_{base}"
+        username = validated_data.get("username") or base_username(employee)
 
         # ensure username uniqueness
-        original_username = username
-        suffix = 0
-        while User.objects.filter(username=username).exists():
-            suffix += 1
-            username = f"{original_username}{suffix}"
+        username = resolve_usernames([username])[0]
 
         # generate random password
         password = get_random_string(length=10)
@@ -121,3 +147,20 @@ class GenerateAccountSerializer(serializers.Serializer):
             employee.save(update_fields=["user"])
 
         return user, password
+
+
+class BulkGenerateAccountsSerializer(serializers.Serializer):
+    """
+    Which employees to create logins for: the given ids, everyone with the
+    given role, or (neither given) every employee that has no account yet.
+    """
+    employee_ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    role = serializers.ChoiceField(choices=Employee.ROLE_CHOICES, required=False)
+
+    def get_employees(self):
+        qs = Employee.objects.filter(user__isnull=True).order_by("id")
+        if "employee_ids" in self.validated_data:
+            qs = qs.filter(id__in=self.validated_data["employee_ids"])
+        if "role" in self.validated_data:
+            qs = qs.filter(role=self.validated_data["role"])
+        return list(qs)
@@ -1,3 +1,25 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from .models import Employee
+
+User = get_user_model()
+
+
+@override_settings(ROOT_URLCONF="admin.urls")
+class EmployeeImportPermissionTests(TestCase):
+    def post_csv(self, client):
+        return client.post(
+            "/employees/import/", "name,role\nJane Roe,NURSE\n", content_type="text/csv"
+        )
+
+    def test_only_admins_can_import(self):
+        client = APIClient()
+        self.assertIn(self.post_csv(client).status_code, (401, 403))
+        client.force_authenticate(User.objects.create_user(username="staff_1_test", password="x"))
+        self.assertEqual(self.post_csv(client).status_code, 403)
+        self.assertFalse(Employee.objects.exists())
+
+        client.force_authenticate(User.objects.create_user(username="admin_1_test", password="x", is_staff=True))
+        self.assertNotIn(self.post_csv(client).status_code, (401, 403))
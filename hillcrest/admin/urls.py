@@ -1,11 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import DepartmentViewSet, EmployeeViewSet, AccountViewSet
+from .views import DepartmentViewSet, EmployeeViewSet, AccountViewSet, RevenueViewSet, BillingViewSet
 
 router = DefaultRouter()
 router.register(r"departments", DepartmentViewSet, basename="department")
 router.register(r"employees", EmployeeViewSet, basename="employee")
 router.register(r"accounts", AccountViewSet, basename="account")
+router.register(r"revenue", RevenueViewSet, basename="revenue")
+router.register(r"billing", BillingViewSet, basename="billing")
 
 urlpatterns = [
     path("", include(router.urls)),
@@ -1,37 +1,112 @@
+import csv
+import io
+from datetime import date
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from django.db import transaction
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
 
+from doctor.models import RevenueRollup
+from doctor.versioning import ConditionalListMixin
+from admin_panel.models import BillingRecord
+from .accounts import generate_accounts
+from .exports import export_params, export_response
+from .importing import detect_format, import_employees, iter_rows
 from .models import Department, Employee
+from .reference import reference_data
 from .serializers import (
     DepartmentSerializer,
     EmployeeSerializer,
     AccountInfoSerializer,
     GenerateAccountSerializer,
+    BulkGenerateAccountsSerializer,
 )
 
 User = get_user_model()
 
+# (values() field, column) for the exports
+EMPLOYEE_EXPORT_COLUMNS = [
+    ("id", "id"),
+    ("first_name", "first_name"),
+    ("last_name", "last_name"),
+    ("age", "age"),
+    ("gender", "gender"),
+    ("phone", "phone"),
+    ("role", "role"),
+    ("department_id", "department_id"),
+    ("department__name", "department"),
+    ("user__username", "username"),
+    ("created_at", "created_at"),
+    ("updated_at", "updated_at"),
+]
+ACCOUNT_EXPORT_COLUMNS = [
+    ("id", "id"),
+    ("username", "username"),
+    ("email", "email"),
+    ("is_active", "is_active"),
+    ("employee_profile__id", "employee_id"),
+    ("employee_profile__first_name", "employee_first_name"),
+    ("employee_profile__last_name", "employee_last_name"),
+    ("employee_profile__role", "role"),
+    ("date_joined", "date_joined"),
+    ("last_login", "last_login"),
+]
+BILLING_EXPORT_COLUMNS = [
+    ("id", "id"),
+    ("created_at", "created_at"),
+    ("bill_type", "bill_type"),
+    ("patient_name", "patient_name"),
+    ("amount", "amount"),
+    ("additional_info", "additional_info"),
+]
+
 
-class DepartmentViewSet(viewsets.ModelViewSet):
+class DepartmentViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     """
     Admin can add departments and view/delete them.
+    The list answers If-None-Match / If-Modified-Since with 304 when unchanged.
     """
+    list_version_keys = ("departments",)
     queryset = Department.objects.all()
     serializer_class = DepartmentSerializer
     lookup_field = "id"
 
+    def get_queryset(self):
+        # the list is served from the reference-data cache
+        if self.action == "list":
+            return reference_data.departments()
+        return super().get_queryset()
+
+    @action(detail=True, methods=["get"])
+    def doctors(self, request, id=None):
+        """
+        Doctors in this department.
+        GET /departments/{id}/doctors/
+        """
+        department = reference_data.department(id)
+        if department is None:
+            return Response({"detail": "Department not found."}, status=status.HTTP_404_NOT_FOUND)
+        ser = EmployeeSerializer(reference_data.doctors_in_department(department.id), many=True)
+        return Response(ser.data)
+
 
-class EmployeeViewSet(viewsets.ModelViewSet):
+class EmployeeViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     """
     CRUD for employees.
     - When creating/updating an employee with role=doctor, department is required.
     - Admin can generate login for an employee (creates Django User).
     - Deleting an employee also removes linked user if present.
+    - The list answers If-None-Match / If-Modified-Since with 304 when unchanged.
     """
+    list_version_keys = ("employees", "departments")
     queryset = Employee.objects.select_related("department", "user").all()
     serializer_class = EmployeeSerializer
     lookup_field = "id"
@@ -68,13 +143,81 @@ class EmployeeViewSet(viewsets.ModelViewSet):
         user, plaintext_password = serializer.create_account(employee, serializer.validated_data)
         return Response({"username": user.username, "password": plaintext_password}, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=["post"], url_path="generate-accounts", permission_classes=[IsAdminUser])
+    def generate_accounts(self, request):
+        """
+        Create logins for many employees at once.
+        Body (all optional): { "employee_ids": [...], "role": "doctor" }
+        Employees that already have an account are skipped.
+        Response: a CSV download (employee_id, name, role, username, password).
+        The passwords are not stored anywhere in plaintext, so this response is the only copy.
+        """
+        serializer = BulkGenerateAccountsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        created = generate_accounts(serializer.get_employees())
+        if not created:
+            return Response({"detail": "No employees without an account matched."}, status=status.HTTP_400_BAD_REQUEST)
+
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(["employee_id", "name", "role", "username", "password"])
+        for employee, username, password in created:
+            writer.writerow([employee.id, f"{employee.first_name} {employee.last_name}".strip(), employee.role, username, password])
+
+        response = HttpResponse(out.getvalue(), content_type="text/csv", status=status.HTTP_201_CREATED)
+        stamp = timezone.now().strftime("%Y%m%d-%H%M%S")
+        response["Content-Disposition"] = f'attachment; filename="accounts-{stamp}.csv"'
+        response["Cache-Control"] = "no-store"
+        return response
+
+    @action(detail=False, methods=["post"], url_path="import", permission_classes=[IsAdminUser])
+    def import_employees(self, request):
+        """
+        Bulk create employees from a CSV or NDJSON upload, streamed and inserted in chunks.
+        POST /employees/import/ with either
+          - multipart/form-data, file field "file" (*.csv, *.ndjson, *.jsonl), or
+          - the raw file as the body, Content-Type text/csv or application/x-ndjson.
+        Columns / keys: first_name, last_name, age, gender, phone, role, and
+        department (name) or department_id.
+        Response: { "created": n, "failed": n, "errors": [{"row": n, "errors": {...}}], "errors_truncated": bool }
+        """
+        if request.content_type.startswith("multipart/form-data"):
+            upload = request.FILES.get("file")
+            if upload is None:
+                return Response({"detail": 'Upload the file in the "file" field.'}, status=status.HTTP_400_BAD_REQUEST)
+            fmt, stream = detect_format(upload.content_type, upload.name), upload
+        else:
+            # read the body straight from the WSGI input instead of request.data
+            fmt, stream = detect_format(request.content_type), request._request
+        if fmt is None:
+            return Response(
+                {"detail": "Expected a CSV or NDJSON file."}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+            )
+
+        report = import_employees(iter_rows(stream, fmt))
+        if report["created"]:
+            return Response(report, status=status.HTTP_201_CREATED)
+        return Response(report, status=status.HTTP_400_BAD_REQUEST if report["failed"] else status.HTTP_200_OK)
+
+    @action(detail=False, methods=["get"], permission_classes=[IsAdminUser])
+    def export(self, request):
+        """
+        Stream every employee as a file download.
+        GET /employees/export/?fmt=csv|ndjson&gzip=1
+        """
+        fmt, gzip, error = export_params(request)
+        if error:
+            return Response(error, status=status.HTTP_400_BAD_REQUEST)
+        return export_response(Employee.objects.all(), EMPLOYEE_EXPORT_COLUMNS, fmt, "employees", gzip)
+
     @action(detail=False, methods=["get"], url_path="by-role/(?P<role>[^/.]+)")
     def list_by_role(self, request, role=None):
         """
-        Optional: list employees by role
+        Optional: list employees by role (from the reference-data cache)
         GET /employees/by-role/doctor/
         """
-        qs = self.get_queryset().filter(role=role)
+        qs = reference_data.employees_by_role(role)
         page = self.paginate_queryset(qs)
         if page is not None:
             ser = self.get_serializer(page, many=True)
@@ -91,3 +234,81 @@ class AccountViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = User.objects.select_related("employee_profile").all()
     serializer_class = AccountInfoSerializer
     lookup_field = "id"
+
+    @action(detail=False, methods=["get"], permission_classes=[IsAdminUser])
+    def export(self, request):
+        """
+        Stream every account as a file download.
+        GET /accounts/export/?fmt=csv|ndjson&gzip=1
+        """
+        fmt, gzip, error = export_params(request)
+        if error:
+            return Response(error, status=status.HTTP_400_BAD_REQUEST)
+        return export_response(User.objects.all(), ACCOUNT_EXPORT_COLUMNS, fmt, "accounts", gzip)
+
+
+class BillingViewSet(viewsets.ViewSet):
+    """
+    Billing history export.
+    GET /billing/export/?fmt=csv|ndjson&gzip=1&date_from=YYYY-MM-DD&date_to=YYYY-MM-DD
+    date_to is inclusive.
+    """
+
+    @action(detail=False, methods=["get"], permission_classes=[IsAdminUser])
+    def export(self, request):
+        fmt, gzip, error = export_params(request)
+        if error:
+            return Response(error, status=status.HTTP_400_BAD_REQUEST)
+
+        records = BillingRecord.objects.all()
+        try:
+            if request.query_params.get("date_from"):
+                records = records.filter(created_at__date__gte=date.fromisoformat(request.query_params["date_from"]))
+            if request.query_params.get("date_to"):
+                records = records.filter(created_at__date__lte=date.fromisoformat(request.query_params["date_to"]))
+        except ValueError:
+            return Response({"detail": "Dates must be YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+        return export_response(records, BILLING_EXPORT_COLUMNS, fmt, "billing", gzip)
+
+
+class RevenueViewSet(viewsets.ViewSet):
+    """
+    Revenue totals read from the daily rollups (doctor.RevenueRollup), never from BillingRecord.
+    GET /revenue/?year=2025            -> the year, broken down by month
+    GET /revenue/?year=2025&month=11   -> the month, broken down by day
+    Both also break down by bill type and by doctor.
+    """
+    permission_classes = [IsAdminUser]
+
+    def list(self, request):
+        today = timezone.localdate()
+        try:
+            year = int(request.query_params.get("year", today.year))
+            month = request.query_params.get("month")
+            month = int(month) if month else None
+            if month is not None:
+                start = date(year, month, 1)
+                end = date(year + (month == 12), month % 12 + 1, 1)
+            else:
+                start, end = date(year, 1, 1), date(year + 1, 1, 1)
+        except ValueError:
+            return Response({"detail": "Invalid year or month."}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = RevenueRollup.objects.filter(date__gte=start, date__lt=end)
+        totals = {"amount": Sum("amount"), "bills": Sum("bill_count")}
+
+        if month is not None:
+            periods = rows.values("date").annotate(**totals).order_by("date")
+            breakdown = [{"period": p["date"], "amount": p["amount"], "bills": p["bills"]} for p in periods]
+        else:
+            periods = rows.annotate(period=TruncMonth("date")).values("period").annotate(**totals).order_by("period")
+            breakdown = [{"period": p["period"], "amount": p["amount"], "bills": p["bills"]} for p in periods]
+
+        return Response({
+            "year": year,
+            "month": month,
+            "total": rows.aggregate(**totals),
+            "by_period": breakdown,
+            "by_bill_type": list(rows.values("bill_type").annotate(**totals).order_by("bill_type")),
+            "by_doctor": list(rows.values("doctor_id").annotate(**totals).order_by("-amount")),
+        })
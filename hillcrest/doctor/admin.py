@@ -1,6 +1,6 @@
 # doctor/admin.py
 from django.contrib import admin
-from .models import Prescription, PrescriptionItem, LabOrder, PharmacyOrder
+from .models import Prescription, PrescriptionItem, LabTest, LabOrder, LabOrderLine, PharmacyOrder, BillingOutbox, RevenueRollup
 
 @admin.register(Prescription)
 class PrescriptionAdmin(admin.ModelAdmin):
@@ -11,12 +11,33 @@ class PrescriptionAdmin(admin.ModelAdmin):
 class PrescriptionItemAdmin(admin.ModelAdmin):
     list_display = ("id","prescription","medicine_name","dosage")
 
+@admin.register(LabTest)
+class LabTestAdmin(admin.ModelAdmin):
+    list_display = ("id","code","name","price","is_active")
+    search_fields = ("code","name")
+
+class LabOrderLineInline(admin.TabularInline):
+    model = LabOrderLine
+    extra = 0
+    raw_id_fields = ("test",)
+
 @admin.register(LabOrder)
 class LabOrderAdmin(admin.ModelAdmin):
     list_display = ("id","appointment","doctor","patient","is_processed","created_at")
     search_fields = ("patient__full_name","doctor__user__username")
+    inlines = [LabOrderLineInline]
 
 @admin.register(PharmacyOrder)
 class PharmacyOrderAdmin(admin.ModelAdmin):
-    list_display = ("id","appointment","doctor","patient","is_dispensed","created_at")
+    list_display = ("id","appointment","doctor","patient","is_dispensed","claimed_by","claim_expires_at","created_at")
     search_fields = ("patient__full_name","doctor__user__username")
+
+@admin.register(BillingOutbox)
+class BillingOutboxAdmin(admin.ModelAdmin):
+    list_display = ("id","bill_type","patient_name","amount","created_at","processed_at")
+    list_filter = ("bill_type",)
+
+@admin.register(RevenueRollup)
+class RevenueRollupAdmin(admin.ModelAdmin):
+    list_display = ("date","bill_type","doctor","bill_count","amount")
+    list_filter = ("bill_type",)
@@ -0,0 +1,192 @@
+# doctor/archive.py
+"""
+Hot/cold archival.
+
+`manage.py archive_records` moves finished work older than ARCHIVE_AFTER_DAYS
+out of the live tables, so the worklist, queue and typeahead indexes only
+cover recent and open rows:
+
+- completed appointments, together with their prescription and orders, once
+  every order is processed / dispensed (or, for pharmacy orders, cancelled);
+- processed lab orders and dispensed or cancelled pharmacy orders on their
+  own (their appointment may still be live).
+
+Each row is copied into an Archived* table (doctor/models.py) as the document
+the API returns for it and deleted from the live table in the same
+transaction, one batch at a time. An interrupted run leaves every row in
+exactly one place and the next run carries on where it stopped.
+
+Lab results and stock movements are not moved; they keep pointing at the
+archived order's id. patient_timeline, appointment_detail and the lab results
+endpoint read the archive where the live row is gone.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from receptionist.models import Appointment
+from .models import (
+    Prescription,
+    LabOrder,
+    PharmacyOrder,
+    ArchivedAppointment,
+    ArchivedLabOrder,
+    ArchivedPharmacyOrder,
+)
+from .serializers import PrescriptionSerializer, LabOrderSerializer, PharmacyOrderSerializer
+
+ARCHIVE_AFTER_DAYS = getattr(settings, "ARCHIVE_AFTER_DAYS", 365)
+ARCHIVE_BATCH_SIZE = getattr(settings, "ARCHIVE_BATCH_SIZE", 500)
+
+
+def archive_cutoff(days=ARCHIVE_AFTER_DAYS):
+    return timezone.now() - timedelta(days=days)
+
+
+def archivable_appointments(before):
+    """Completed appointments older than `before` with no open lab / pharmacy order."""
+    return (
+        Appointment.objects.filter(status="COMPLETED", appointment_datetime__lt=before)
+        .exclude(id__in=LabOrder.objects.filter(is_processed=False).values("appointment_id"))
+        .exclude(
+            id__in=PharmacyOrder.objects.filter(is_dispensed=False, cancelled_at__isnull=True).values("appointment_id")
+        )
+    )
+
+
+def archivable_lab_orders(before):
+    return LabOrder.objects.filter(is_processed=True, created_at__lt=before)
+
+
+def archivable_pharmacy_orders(before):
+    return PharmacyOrder.objects.filter(
+        Q(is_dispensed=True) | Q(cancelled_at__isnull=False), created_at__lt=before
+    )
+
+
+def _archive_lab_orders(orders):
+    ArchivedLabOrder.objects.bulk_create([
+        ArchivedLabOrder(
+            id=o.id,
+            appointment_id=o.appointment_id,
+            patient_id=o.patient_id,
+            created_at=o.created_at,
+            data=LabOrderSerializer(o).data,
+        )
+        for o in orders
+    ])
+    # lines go with the order; results stay (no constraint, see labtech.models)
+    LabOrder.objects.filter(id__in=[o.id for o in orders]).delete()
+
+
+def _archive_pharmacy_orders(orders):
+    ArchivedPharmacyOrder.objects.bulk_create([
+        ArchivedPharmacyOrder(
+            id=o.id,
+            appointment_id=o.appointment_id,
+            patient_id=o.patient_id,
+            created_at=o.created_at,
+            data=PharmacyOrderSerializer(o).data,
+        )
+        for o in orders
+    ])
+    PharmacyOrder.objects.filter(id__in=[o.id for o in orders]).delete()
+
+
+def archive_appointments(before, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Archive one batch of appointments (oldest ids first) with their
+    prescriptions and orders. Returns the number of appointments moved.
+    """
+    from receptionist.serializers import AppointmentSerializer
+
+    with transaction.atomic():
+        ids = list(
+            archivable_appointments(before).select_for_update().order_by("id").values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+
+        lab_orders = list(LabOrder.objects.filter(appointment_id__in=ids))
+        pharmacy_orders = list(PharmacyOrder.objects.filter(appointment_id__in=ids))
+        # an order added since the candidates were picked keeps its visit live
+        still_open = (
+            {o.appointment_id for o in lab_orders if not o.is_processed}
+            | {o.appointment_id for o in pharmacy_orders if not o.is_dispensed and o.cancelled_at is None}
+        )
+        ids = [i for i in ids if i not in still_open]
+        if not ids:
+            return 0
+
+        appts = list(Appointment.objects.filter(id__in=ids).select_related("patient").order_by("id"))
+        prescriptions = {
+            p.appointment_id: p
+            for p in Prescription.objects.filter(appointment_id__in=ids).prefetch_related("items")
+        }
+        ArchivedAppointment.objects.bulk_create([
+            ArchivedAppointment(
+                id=a.id,
+                patient_id=a.patient_id,
+                doctor_id=a.doctor_id,
+                appointment_datetime=a.appointment_datetime,
+                status=a.status,
+                data=AppointmentSerializer(a).data,
+                prescription=(
+                    PrescriptionSerializer(prescriptions[a.id]).data if a.id in prescriptions else None
+                ),
+            )
+            for a in appts
+        ])
+        _archive_lab_orders([o for o in lab_orders if o.appointment_id not in still_open])
+        _archive_pharmacy_orders([o for o in pharmacy_orders if o.appointment_id not in still_open])
+        # prescription, items and the scheduling slot cascade
+        Appointment.objects.filter(id__in=ids).delete()
+
+    return len(ids)
+
+
+def archive_lab_orders(before, batch_size=ARCHIVE_BATCH_SIZE):
+    """Archive one batch of processed lab orders. Returns the number moved."""
+    with transaction.atomic():
+        orders = list(archivable_lab_orders(before).select_for_update().order_by("id")[:batch_size])
+        if orders:
+            _archive_lab_orders(orders)
+    return len(orders)
+
+
+def archive_pharmacy_orders(before, batch_size=ARCHIVE_BATCH_SIZE):
+    """Archive one batch of dispensed pharmacy orders. Returns the number moved."""
+    with transaction.atomic():
+        orders = list(archivable_pharmacy_orders(before).select_for_update().order_by("id")[:batch_size])
+        if orders:
+            _archive_pharmacy_orders(orders)
+    return len(orders)
+
+
+# in this order: whole visits first, so their orders move with them
+ARCHIVERS = (
+    ("appointments", archivable_appointments, archive_appointments),
+    ("lab_orders", archivable_lab_orders, archive_lab_orders),
+    ("pharmacy_orders", archivable_pharmacy_orders, archive_pharmacy_orders),
+)
+
+
+# -------------------------------------------------------
+# READS
+# -------------------------------------------------------
+def attach_archived_orders(visits, patient_id):
+    """
+    Set `archived_lab_orders` / `archived_pharmacy_orders` on each visit of a
+    timeline page (live Appointments and ArchivedAppointments alike), in two
+    queries.
+    """
+    ids = [v.id for v in visits]
+    for attr, model in (("archived_lab_orders", ArchivedLabOrder), ("archived_pharmacy_orders", ArchivedPharmacyOrder)):
+        by_visit = {}
+        for order in model.objects.filter(patient_id=patient_id, appointment_id__in=ids).order_by("created_at", "id"):
+            by_visit.setdefault(order.appointment_id, []).append(order)
+        for visit in visits:
+            setattr(visit, attr, by_visit.get(visit.id, []))
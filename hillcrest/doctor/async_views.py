@@ -0,0 +1,242 @@
+# doctor/async_views.py
+"""
+Async (ASGI) versions of the doctor endpoints, mounted under async/ in doctor/urls.py.
+
+Reads use Django's async ORM, so a worker is not tied up while a query runs.
+DRF has no async views, so these are plain Django views: session
+authentication via request.auser() and JSON in/out. Validation and writes go
+through the same serializers and helpers as doctor/views.py, run with
+sync_to_async so the two paths behave identically.
+"""
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.utils.encoders import JSONEncoder
+
+from receptionist.models import Appointment
+from .idempotency import aidempotent
+from .models import Prescription, ArchivedAppointment
+from .pagination import AppointmentKeysetPagination
+from .profiles import aresolve_staff_profile
+from .serializers import (
+    PrescriptionSerializer,
+    PrescriptionItemSerializer,
+    LabOrderSerializer,
+    PharmacyOrderSerializer
+)
+from .versioning import appointment_keys, bump
+from .views import save_order_with_bill, worklist_queryset
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, safe=False, encoder=JSONEncoder)
+
+
+def doctor_required(view):
+    """
+    Async counterpart of IsAuthenticated + IsDoctor; leaves the profile on
+    request.staff_profile.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return json_response({"detail": "Authentication credentials were not provided."}, status=401)
+        profile = await aresolve_staff_profile(request)
+        if not user.is_superuser and (profile is None or profile.role != "DOCTOR"):
+            return json_response({"detail": "You do not have permission to perform this action."}, status=403)
+        if profile is None:
+            return json_response({"detail": "No staff profile for this user"}, status=403)
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def read_json(request, allow_list=False):
+    try:
+        body = json.loads(request.body or b"{}")
+    except ValueError:
+        return None, json_response({"detail": "Malformed JSON"}, status=400)
+    if not isinstance(body, dict) and not (allow_list and isinstance(body, list)):
+        return None, json_response({"detail": "Expected a JSON object"}, status=400)
+    return body, None
+
+
+async def get_own_appointment(request, appt_id):
+    return await (
+        Appointment.objects.select_related("patient")
+        .filter(id=appt_id, doctor=request.staff_profile)
+        .afirst()
+    )
+
+
+def not_found():
+    return json_response({"detail": "Appointment not found or not assigned to you"}, status=404)
+
+
+# --------------------------------------------------------------
+# LIST APPOINTMENTS FOR LOGGED-IN DOCTOR
+# --------------------------------------------------------------
+@require_http_methods(["GET"])
+@doctor_required
+async def my_appointments(request):
+    appts, errors = worklist_queryset(request.staff_profile, request.GET)
+    if errors:
+        return json_response(errors, status=400)
+
+    paginator = AppointmentKeysetPagination()
+    try:
+        page = await paginator.apaginate_queryset(appts, request)
+    except NotFound as exc:  # undecodable cursor; DRF would answer this 404 for the sync view
+        return json_response({"detail": exc.detail}, status=404)
+
+    from receptionist.serializers import AppointmentSerializer
+    data = await sync_to_async(lambda: AppointmentSerializer(page, many=True).data)()
+    return json_response({"next": paginator.get_next_link(), "results": data})
+
+
+# --------------------------------------------------------------
+# APPOINTMENT DETAIL
+# --------------------------------------------------------------
+@require_http_methods(["GET"])
+@doctor_required
+async def appointment_detail(request, appt_id):
+    appt = await get_own_appointment(request, appt_id)
+    if appt is None:
+        archived = await ArchivedAppointment.objects.filter(id=appt_id, doctor_id=request.staff_profile.id).afirst()
+        return json_response(archived.data) if archived else not_found()
+
+    from receptionist.serializers import AppointmentSerializer
+    data = await sync_to_async(lambda: AppointmentSerializer(appt).data)()
+    return json_response(data)
+
+
+# --------------------------------------------------------------
+# CREATE PRESCRIPTION (BASE)
+# --------------------------------------------------------------
+@require_http_methods(["POST"])
+@doctor_required
+@aidempotent
+async def create_prescription(request, appt_id):
+    appt = await get_own_appointment(request, appt_id)
+    if appt is None:
+        return not_found()
+    body, error = read_json(request)
+    if error:
+        return error
+
+    data = dict(body)
+    data["appointment"] = appt.id
+    data["patient"] = appt.patient_id
+    data["doctor"] = request.staff_profile.id
+
+    def save():
+        serializer = PrescriptionSerializer(data=data)
+        if not serializer.is_valid():
+            return serializer.errors, 400
+        pres = serializer.save()
+        return PrescriptionSerializer(pres).data, 201
+
+    payload, status = await sync_to_async(save)()
+    if status == 201:
+        appt.status = "COMPLETED"
+        await appt.asave(update_fields=["status"])
+    return json_response(payload, status=status)
+
+
+# --------------------------------------------------------------
+# ADD PRESCRIPTION ITEM(S)
+# --------------------------------------------------------------
+@require_http_methods(["POST"])
+@doctor_required
+@aidempotent
+async def add_prescription_item(request, appt_id):
+    appt = await get_own_appointment(request, appt_id)
+    if appt is None:
+        return json_response({"detail": "Not your appointment"}, status=404)
+
+    pres = await Prescription.objects.filter(appointment=appt).afirst()
+    if pres is None:
+        return json_response({"detail": "Prescription does not exist"}, status=400)
+
+    body, error = read_json(request, allow_list=True)
+    if error:
+        return error
+
+    def save():
+        serializer = PrescriptionItemSerializer(data=body, many=isinstance(body, list))
+        if not serializer.is_valid():
+            return serializer.errors, 400
+        serializer.save(prescription=pres)
+        return serializer.data, 201
+
+    payload, status = await sync_to_async(save)()
+    return json_response(payload, status=status)
+
+
+# --------------------------------------------------------------
+# LAB / PHARMACY ORDERS
+# --------------------------------------------------------------
+async def _create_order(request, appt_id, serializer_class, field, bill_type, id_key):
+    appt = await get_own_appointment(request, appt_id)
+    if appt is None:
+        return not_found()
+    body, error = read_json(request)
+    if error:
+        return error
+
+    doctor = request.staff_profile
+
+    def save():
+        serializer = serializer_class(data={
+            "appointment": appt.id,
+            "doctor": doctor.id,
+            "patient": appt.patient_id,
+            field: body.get(field, []),
+        })
+        if not serializer.is_valid():
+            return serializer.errors, 400
+        try:
+            order = save_order_with_bill(serializer, appt, doctor, bill_type, id_key)
+        except ValidationError as exc:  # e.g. insufficient pharmacy stock
+            return exc.detail, 400
+        return serializer_class(order).data, 201
+
+    payload, status = await sync_to_async(save)()
+    return json_response(payload, status=status)
+
+
+@require_http_methods(["POST"])
+@doctor_required
+@aidempotent
+async def create_lab_order(request, appt_id):
+    return await _create_order(request, appt_id, LabOrderSerializer, "tests", "LAB", "lab_order_id")
+
+
+@require_http_methods(["POST"])
+@doctor_required
+@aidempotent
+async def create_pharmacy_order(request, appt_id):
+    return await _create_order(
+        request, appt_id, PharmacyOrderSerializer, "items", "PHARMACY", "pharmacy_order_id"
+    )
+
+
+# --------------------------------------------------------------
+# MARK APPOINTMENT COMPLETE
+# --------------------------------------------------------------
+@require_http_methods(["POST"])
+@doctor_required
+@aidempotent
+async def mark_appointment_completed(request, appt_id):
+    updated = await Appointment.objects.filter(id=appt_id, doctor=request.staff_profile).aupdate(
+        status="COMPLETED"
+    )
+    if not updated:
+        return not_found()
+    # queryset updates don't send post_save
+    await sync_to_async(bump)(*appointment_keys(appt_id, request.staff_profile.id))
+    return json_response({"detail": "Appointment marked completed"})
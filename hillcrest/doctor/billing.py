@@ -0,0 +1,90 @@
+# doctor/billing.py
+"""
+Billing outbox.
+
+Views call enqueue_bill() inside the transaction that creates the order, so an
+order and its bill are committed together. `manage.py billing_worker` then
+moves pending rows into BillingRecord in batches. A batch is claimed, inserted,
+added to the revenue rollups and marked processed in one transaction, so a
+crashed or retried run never bills twice. Concurrent workers take disjoint
+rows: SKIP LOCKED where the backend has it, a claim token otherwise.
+"""
+import uuid
+
+from django.db import connection, transaction
+from django.db.models import Subquery
+from django.utils import timezone
+
+from admin_panel.models import BillingRecord
+from .models import BillingOutbox
+from .rollups import record_revenue
+
+
+def enqueue_bill(bill_type, patient_name, amount, additional_info):
+    return BillingOutbox.objects.create(
+        bill_type=bill_type,
+        patient_name=patient_name,
+        amount=amount,
+        additional_info=additional_info,
+    )
+
+
+def enqueue_bills(bills):
+    """
+    Several enqueue_bill() rows in one INSERT.
+    bills: [(bill_type, patient_name, amount, additional_info)]
+    """
+    return BillingOutbox.objects.bulk_create([
+        BillingOutbox(bill_type=bill_type, patient_name=patient_name, amount=amount, additional_info=info)
+        for bill_type, patient_name, amount, info in bills
+    ])
+
+
+def drain_outbox(batch_size=500):
+    """
+    Process one batch of pending outbox rows. Returns the number processed.
+    """
+    with transaction.atomic():
+        pending = BillingOutbox.objects.filter(processed_at__isnull=True).order_by("id")
+        if connection.features.has_select_for_update_skip_locked:
+            # lets several workers drain side by side
+            batch = list(pending.select_for_update(skip_locked=True)[:batch_size])
+        else:
+            # no row locks (SQLite): claim with a conditional UPDATE and bill
+            # only the rows carrying this worker's token. The UPDATE is the
+            # transaction's first statement, so it takes the write lock before
+            # reading and a second worker waits, then finds the rows claimed.
+            token = uuid.uuid4().hex
+            unclaimed = pending.filter(claim_token="").values("id")[:batch_size]
+            BillingOutbox.objects.filter(id__in=Subquery(unclaimed)).update(claim_token=token)
+            batch = list(BillingOutbox.objects.filter(claim_token=token).order_by("id"))
+        if not batch:
+            return 0
+
+        records = BillingRecord.objects.bulk_create([
+            BillingRecord(
+                bill_type=row.bill_type,
+                patient_name=row.patient_name,
+                amount=row.amount,
+                additional_info={**row.additional_info, "outbox_id": row.id},
+            )
+            for row in batch
+        ])
+
+        now = timezone.now()
+        # dated by the bill, as rebuild_revenue_rollups does
+        record_revenue(
+            (getattr(record, "created_at", None) or now, row.bill_type, row.additional_info, row.amount)
+            for row, record in zip(batch, records)
+        )
+
+        if all(r.pk for r in records):
+            for row, record in zip(batch, records):
+                row.processed_at = now
+                row.billing_record_id = record.pk
+            BillingOutbox.objects.bulk_update(batch, ["processed_at", "billing_record"])
+        else:
+            # backend doesn't return ids from bulk_create (MySQL)
+            BillingOutbox.objects.filter(id__in=[row.id for row in batch]).update(processed_at=now)
+
+    return len(batch)
@@ -0,0 +1,201 @@
+# doctor/events.py
+"""
+Server-sent events for new and updated lab / pharmacy orders.
+
+Lab technician and pharmacist consoles keep one GET open on
+labtech/orders/events/ or pharmacist/orders/events/ (ASGI only) instead of
+polling. The post_save hooks in doctor/signals.py serialize the order once and,
+when the transaction commits, hand the finished SSE frame to `order_events`,
+a process-local fan-out: every connected console on the "lab" or "pharmacy"
+channel gets the same bytes pushed onto its queue, without another query or
+serializer run per console.
+
+Frames carry an id. A console that reconnects with Last-Event-ID gets what it
+missed from the last ORDER_EVENTS_BACKLOG frames of the channel; if they are
+gone (or the id is from another process / an earlier run) it gets a single
+`resync` event and should reload its list through the REST endpoints. The
+same happens when a console falls ORDER_EVENTS_QUEUE_SIZE frames behind.
+
+The fan-out is per process: a console sees the orders written by the process
+that serves its stream. Run the order-writing endpoints and the streams in the
+same ASGI process (or route each console to one). Changes made with
+queryset.update() send no post_save; lab results publish explicitly when they
+mark an order processed, pharmacist claims are not pushed.
+"""
+import asyncio
+import json
+import threading
+import uuid
+from collections import deque
+
+from django.conf import settings
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_http_methods
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import LabOrder
+from .profiles import aresolve_staff_profile
+from .serializers import LabOrderSerializer, PharmacyOrderSerializer
+
+CHANNEL_LAB = "lab"
+CHANNEL_PHARMACY = "pharmacy"
+
+HEARTBEAT_SECONDS = getattr(settings, "ORDER_EVENTS_HEARTBEAT_SECONDS", 15)
+
+
+class Subscription:
+    """One connected console: a queue of frames owned by the console's event loop."""
+
+    def __init__(self, channel, queue_size):
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.lagged = False
+
+    def _put(self, frame):
+        if self.lagged:
+            return
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # too far behind: drop the backlog and tell the console to reload
+            self.lagged = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    def push(self, frame):
+        """Called from any thread."""
+        self.loop.call_soon_threadsafe(self._put, frame)
+
+
+class OrderEventBroker:
+    """
+    Process-local publish / subscribe of SSE frames, by channel.
+    Event ids are "<process token>-<number within the channel>".
+    """
+
+    def __init__(self, backlog=1000, queue_size=500):
+        self.queue_size = queue_size
+        self._token = uuid.uuid4().hex[:8]
+        self._sequences = {}  # channel -> last event number
+        self._backlogs = {}  # channel -> deque of (sequence, frame)
+        self._backlog_size = backlog
+        self._subscribers = {}  # channel -> set of Subscription
+        self._lock = threading.Lock()
+
+    def publish(self, channel, event, data):
+        """Encode the event once and push it to every subscriber of the channel."""
+        payload = json.dumps(data, cls=JSONEncoder)
+        with self._lock:
+            sequence = self._sequences[channel] = self._sequences.get(channel, 0) + 1
+            frame = f"id: {self._token}-{sequence}\nevent: {event}\ndata: {payload}\n\n".encode()
+            self._backlogs.setdefault(channel, deque(maxlen=self._backlog_size)).append((sequence, frame))
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.push(frame)
+            except RuntimeError:  # its event loop is gone
+                self.unsubscribe(subscription)
+
+    def _missed(self, channel, last_event_id):
+        """Frames after last_event_id, or None when they can't be replayed."""
+        token, _, sequence = last_event_id.partition("-")
+        if token != self._token or not sequence.isdigit():
+            return None
+        sequence = int(sequence)
+        if sequence > self._sequences.get(channel, 0):
+            return None
+        backlog = self._backlogs.get(channel) or ()
+        if backlog and backlog[0][0] > sequence + 1:
+            return None
+        return [frame for seq, frame in backlog if seq > sequence]
+
+    def subscribe(self, channel, last_event_id=None):
+        """
+        Register the calling event loop's console. Returns (subscription,
+        frames to send first); the frames are None when the console must resync.
+        """
+        subscription = Subscription(channel, self.queue_size)
+        with self._lock:
+            missed = self._missed(channel, last_event_id) if last_event_id else []
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription, missed
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.get(subscription.channel, set()).discard(subscription)
+
+
+order_events = OrderEventBroker(
+    backlog=getattr(settings, "ORDER_EVENTS_BACKLOG", 1000),
+    queue_size=getattr(settings, "ORDER_EVENTS_QUEUE_SIZE", 500),
+)
+
+
+def publish_order_event(order, created=False):
+    """
+    Publish order.created / order.updated for a LabOrder or PharmacyOrder once
+    the current transaction commits (immediately in autocommit).
+    """
+    if isinstance(order, LabOrder):
+        channel, data = CHANNEL_LAB, LabOrderSerializer(order).data
+    else:
+        channel, data = CHANNEL_PHARMACY, PharmacyOrderSerializer(order).data
+    event = "order.created" if created else "order.updated"
+    transaction.on_commit(lambda: order_events.publish(channel, event, data))
+
+
+RESYNC_FRAME = b"event: resync\ndata: {}\n\n"
+
+
+async def _frames(channel, last_event_id):
+    # subscribed once the server starts streaming, so a console that is gone
+    # before then leaves nothing behind
+    subscription, missed = order_events.subscribe(channel, last_event_id)
+    try:
+        # tell EventSource how long to wait before reconnecting
+        yield b"retry: 3000\n\n"
+        if missed is None:
+            yield RESYNC_FRAME
+        else:
+            for frame in missed:
+                yield frame
+        while True:
+            try:
+                frame = await asyncio.wait_for(subscription.queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+            if frame is None:
+                yield RESYNC_FRAME
+                subscription.lagged = False
+                continue
+            yield frame
+    finally:
+        order_events.unsubscribe(subscription)
+
+
+def order_event_stream(channel, roles):
+    """
+    Async view streaming the channel's events to staff with one of `roles`
+    (and superusers). Mounted in labtech/urls.py and pharmacist/urls.py.
+    """
+    @require_http_methods(["GET"])
+    async def stream(request):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+        profile = await aresolve_staff_profile(request)
+        if not user.is_superuser and (profile is None or profile.role not in roles):
+            return JsonResponse({"detail": "You do not have permission to perform this action."}, status=403)
+
+        response = StreamingHttpResponse(
+            _frames(channel, request.headers.get("Last-Event-ID")), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # nginx: don't buffer the stream
+        return response
+
+    return stream
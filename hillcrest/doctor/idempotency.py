@@ -0,0 +1,222 @@
+# doctor/idempotency.py
+"""
+Idempotency-Key support for the doctor POST endpoints.
+
+The first request with a given key claims it by inserting a PENDING
+IdempotencyKey row (the unique key_hash makes that atomic across workers),
+runs the view and stores the response. A retry with the same key and the
+same body gets the stored response back without running the view again;
+a duplicate that arrives while the first is still running waits for it
+(up to IDEMPOTENCY_WAIT_SECONDS) and then replays its response, so only
+one of them ever executes.
+
+Keys are scoped to the user and expire after IDEMPOTENCY_KEY_TTL seconds;
+expired rows are purged lazily. 5xx responses and exceptions release the
+key so the client can retry for real.
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from datetime import timedelta
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+RUN, REPLAY, WAIT, MISMATCH = "run", "replay", "wait", "mismatch"
+
+_purge_lock = threading.Lock()
+_last_purge = [0.0]
+
+
+def setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _sha256(*parts):
+    return hashlib.sha256(b"\x1f".join(p if isinstance(p, bytes) else str(p).encode() for p in parts)).hexdigest()
+
+
+def _purge_expired(now):
+    # at most once per IDEMPOTENCY_PURGE_INTERVAL per process
+    with _purge_lock:
+        if time.monotonic() - _last_purge[0] < setting("IDEMPOTENCY_PURGE_INTERVAL", 60):
+            return
+        _last_purge[0] = time.monotonic()
+    IdempotencyKey.objects.filter(expires_at__lt=now).delete()
+
+
+def begin(user_id, key, fingerprint):
+    """
+    Claim `key` for this request. Returns (outcome, row):
+    RUN (row claimed by us), REPLAY (row has the stored response),
+    WAIT (another request holds it) or MISMATCH (same key, different request).
+    """
+    key_hash = _sha256(user_id, key)
+    now = timezone.now()
+    _purge_expired(now)
+
+    for _ in range(3):
+        try:
+            with transaction.atomic():
+                row = IdempotencyKey.objects.create(
+                    key_hash=key_hash,
+                    fingerprint=fingerprint,
+                    expires_at=now + timedelta(seconds=setting("IDEMPOTENCY_KEY_TTL", 24 * 3600)),
+                )
+            return RUN, row
+        except IntegrityError:
+            pass
+
+        row = IdempotencyKey.objects.filter(key_hash=key_hash).first()
+        if row is None:
+            continue  # purged in between; claim again
+        if row.expires_at < now:
+            IdempotencyKey.objects.filter(pk=row.pk, expires_at=row.expires_at).delete()
+            continue
+        if row.fingerprint != fingerprint:
+            return MISMATCH, row
+        if row.state == IdempotencyKey.STATE_DONE:
+            return REPLAY, row
+
+        stale = now - timedelta(seconds=setting("IDEMPOTENCY_PENDING_TIMEOUT", 60))
+        if row.created_at < stale:
+            # the worker that claimed it died mid-request: take the claim over
+            taken = IdempotencyKey.objects.filter(
+                pk=row.pk, state=IdempotencyKey.STATE_PENDING, created_at=row.created_at
+            ).update(created_at=now)
+            if taken:
+                row.created_at = now
+                return RUN, row
+        return WAIT, row
+    return WAIT, None
+
+
+def finish(row, status_code, body):
+    if status_code >= 500:
+        release(row)
+        return
+    IdempotencyKey.objects.filter(pk=row.pk).update(
+        state=IdempotencyKey.STATE_DONE, status_code=status_code, body=body
+    )
+
+
+def release(row):
+    IdempotencyKey.objects.filter(pk=row.pk, state=IdempotencyKey.STATE_PENDING).delete()
+
+
+def _claim_error(outcome):
+    if outcome == MISMATCH:
+        return 422, {"detail": f"{HEADER} was already used for a different request."}
+    return 409, {"detail": f"A request with this {HEADER} is still being processed; retry shortly."}
+
+
+def _poll_delays():
+    waited, delay = 0.0, 0.05
+    limit = setting("IDEMPOTENCY_WAIT_SECONDS", 10)
+    while waited < limit:
+        yield delay
+        waited += delay
+        delay = min(delay * 2, 0.5)
+
+
+def _key_and_fingerprint(request):
+    key = request.headers.get(HEADER)
+    if not key:
+        return None, None, None
+    if len(key) > MAX_KEY_LENGTH:
+        return None, None, (400, {"detail": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters."})
+    return key, _sha256(request.method, request.path, request.body), None
+
+
+def idempotent(view):
+    """
+    For DRF function views, placed under @api_view/@permission_classes.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key, fingerprint, error = _key_and_fingerprint(request)
+        if error:
+            return Response(error[1], status=error[0])
+        if key is None:
+            return view(request, *args, **kwargs)
+
+        outcome, row = begin(request.user.pk, key, fingerprint)
+        for delay in _poll_delays():
+            if outcome != WAIT:
+                break
+            time.sleep(delay)
+            outcome, row = begin(request.user.pk, key, fingerprint)
+
+        if outcome == REPLAY:
+            response = Response(json.loads(row.body) if row.body else None, status=row.status_code)
+            response[REPLAYED_HEADER] = "true"
+            return response
+        if outcome != RUN:
+            status, detail = _claim_error(outcome)
+            return Response(detail, status=status)
+
+        try:
+            response = view(request, *args, **kwargs)
+        except BaseException:
+            release(row)
+            raise
+        body = json.dumps(getattr(response, "data", None), cls=JSONEncoder)
+        finish(row, response.status_code, body)
+        return response
+    return wrapper
+
+
+def aidempotent(view):
+    """
+    Async counterpart for doctor/async_views.py, placed under @doctor_required.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        key, fingerprint, error = _key_and_fingerprint(request)
+        if error:
+            return _json(error[1], error[0])
+        if key is None:
+            return await view(request, *args, **kwargs)
+
+        user = await request.auser()
+        outcome, row = await sync_to_async(begin)(user.pk, key, fingerprint)
+        for delay in _poll_delays():
+            if outcome != WAIT:
+                break
+            await asyncio.sleep(delay)
+            outcome, row = await sync_to_async(begin)(user.pk, key, fingerprint)
+
+        if outcome == REPLAY:
+            response = HttpResponse(row.body, status=row.status_code, content_type="application/json")
+            response[REPLAYED_HEADER] = "true"
+            return response
+        if outcome != RUN:
+            status, detail = _claim_error(outcome)
+            return _json(detail, status)
+
+        try:
+            response = await view(request, *args, **kwargs)
+        except BaseException:
+            await sync_to_async(release)(row)
+            raise
+        await sync_to_async(finish)(row, response.status_code, response.content.decode())
+        return response
+    return wrapper
+
+
+def _json(data, status):
+    return HttpResponse(json.dumps(data), status=status, content_type="application/json")
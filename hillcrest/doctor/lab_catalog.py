@@ -0,0 +1,67 @@
+# doctor/lab_catalog.py
+import threading
+import time
+
+from django.conf import settings
+
+from hillcrest.db_router import use_primary
+from .models import LabTest
+from .versioning import versions
+
+VERSION_KEY = "lab_tests"
+
+
+class LabTestCache:
+    """
+    In-process copy of the active LabTest catalog, keyed by upper-cased code
+    and name. Loaded in one query on first use and stamped with the shared
+    "lab_tests" ResourceVersion counter. Local saves drop it through the
+    LabTest signals in doctor/signals.py; other workers notice the bumped
+    counter the next time they re-check it, at most every check_interval
+    seconds.
+    """
+
+    def __init__(self, check_interval=2):
+        self.check_interval = check_interval
+        self._by_key = None
+        self._stamp = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        by_key = {}
+        for test in LabTest.objects.filter(is_active=True):
+            by_key[test.code.upper()] = test
+            by_key.setdefault(test.name.upper(), test)
+        return by_key
+
+    def _get(self):
+        now = time.monotonic()
+        by_key = self._by_key
+        if by_key is not None and now - self._checked_at < self.check_interval:
+            return by_key
+        with self._lock:
+            if self._by_key is not None and now - self._checked_at < self.check_interval:
+                return self._by_key
+            # stamp and rows from the primary: a lagging replica could pair a
+            # new stamp with old prices
+            with use_primary():
+                stamp = versions([VERSION_KEY])
+                if self._by_key is None or stamp != self._stamp:
+                    self._by_key = self._load()
+                    self._stamp = stamp
+            self._checked_at = now
+            return self._by_key
+
+    def lookup(self, key):
+        return self._get().get(str(key).strip().upper())
+
+    def clear(self):
+        with self._lock:
+            self._by_key = None
+            self._stamp = None
+
+
+lab_test_cache = LabTestCache(
+    check_interval=getattr(settings, "LAB_TEST_CACHE_CHECK_SECONDS", 2),
+)
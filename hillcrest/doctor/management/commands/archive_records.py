@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from doctor.archive import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, ARCHIVERS, archive_cutoff
+
+
+class Command(BaseCommand):
+    help = (
+        "Move completed appointments, processed lab orders and dispensed pharmacy orders "
+        "older than --days into the archive tables, in batches. Safe to stop and re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="archive rows older than this")
+        parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+        parser.add_argument("--max-batches", type=int, help="stop after this many batches per kind")
+        parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+        parser.add_argument("--dry-run", action="store_true", help="only count what would be archived")
+
+    def handle(self, *args, **opts):
+        if opts["days"] < 1:
+            raise CommandError("--days must be at least 1")
+        before = archive_cutoff(opts["days"])
+        self.stdout.write(f"archiving rows older than {before:%Y-%m-%d %H:%M}")
+
+        for kind, archivable, archive_batch in ARCHIVERS:
+            if opts["dry_run"]:
+                self.stdout.write(f"{kind}: {archivable(before).count()} to archive")
+                continue
+
+            total = batches = 0
+            try:
+                while opts["max_batches"] is None or batches < opts["max_batches"]:
+                    close_old_connections()
+                    moved = archive_batch(before, opts["batch_size"])
+                    if not moved:
+                        break
+                    total += moved
+                    batches += 1
+                    self.stdout.write(f"{kind}: archived {moved} (total {total})")
+                    if opts["pause"]:
+                        time.sleep(opts["pause"])
+            except KeyboardInterrupt:
+                self.stdout.write(self.style.WARNING(f"{kind}: interrupted after {total}; re-run to continue"))
+                return
+            self.stdout.write(self.style.SUCCESS(f"{kind}: {total} archived"))
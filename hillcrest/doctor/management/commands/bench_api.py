@@ -0,0 +1,243 @@
+import json
+import math
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import setup_test_environment
+from django.utils import timezone
+
+from admin_panel.models import StaffProfile
+from hillcrest.metrics import METRICS_ROUTE, registry
+from receptionist.models import Appointment
+
+# (name, "doctor" | "admin" url prefix, path); {appt_id} and {since} are filled in per run
+SCENARIOS = [
+    ("doctor.worklist", "doctor", "my-appointments/?limit=50"),
+    ("doctor.worklist_filtered", "doctor", "my-appointments/?status=COMPLETED&date_from={since}&limit=50"),
+    ("doctor.appointment_detail", "doctor", "appointments/{appt_id}/"),
+    ("doctor.async_worklist", "doctor", "async/my-appointments/?limit=50"),
+    ("admin.departments", "admin", "departments/"),
+    ("admin.employees", "admin", "employees/"),
+    ("admin.doctors_by_role", "admin", "employees/by-role/doctor/"),
+    ("admin.accounts", "admin", "accounts/"),
+    ("admin.revenue_year", "admin", "revenue/?year={year}"),
+]
+
+METRIC_LINE = re.compile(r"^(hillcrest_http_requests_total|hillcrest_db_queries_total)\{.*\} (\S+)$")
+
+
+def percentile(sorted_values, pct):
+    # nearest-rank
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def metric_totals(text):
+    """(requests, queries) summed over every route in a /metrics page."""
+    totals = Counter()
+    for line in text.splitlines():
+        match = METRIC_LINE.match(line)
+        if match:
+            totals[match.group(1)] += float(match.group(2))
+    return totals["hillcrest_http_requests_total"], totals["hillcrest_db_queries_total"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the doctor and admin GET endpoints at a given concurrency, in process "
+        "(Django test client) or against a running server (--base-url), and report "
+        "p50/p95/p99 latency, throughput and SQL queries per request as JSON. "
+        "Seed data first with `manage.py seed_clinic`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username", default="seed_doc_1", help="a user with a DOCTOR StaffProfile")
+        parser.add_argument("--base-url", help="e.g. http://127.0.0.1:8000; default: in-process test client")
+        parser.add_argument("--doctor-prefix", default="/doctor/", help="where doctor.urls is mounted")
+        parser.add_argument("--admin-prefix", default="/api/admin/", help="where admin.urls is mounted")
+        parser.add_argument("--metrics-token",
+                            help="bearer token for /metrics with --base-url; default: settings.METRICS_TOKEN")
+        parser.add_argument("--only", help="comma-separated scenario names (or name prefixes)")
+        parser.add_argument("--requests", type=int, default=200, help="per scenario")
+        parser.add_argument("--warmup", type=int, default=10, help="untimed requests per scenario")
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+        parser.add_argument("--baseline", help="an earlier report to compare p95 against")
+        parser.add_argument("--max-regression", type=float, default=20.0,
+                            help="fail when a p95 is this many percent above the baseline")
+
+    def handle(self, *args, **opts):
+        setup_test_environment()
+        try:
+            user = get_user_model().objects.get(username=opts["username"])
+            doctor = StaffProfile.objects.get(user=user)
+        except (get_user_model().DoesNotExist, StaffProfile.DoesNotExist):
+            raise CommandError(f"No doctor login {opts['username']}; run seed_clinic or pass --username")
+
+        appt = Appointment.objects.filter(doctor=doctor).order_by("-appointment_datetime").first()
+        if appt is None:
+            raise CommandError(f"{opts['username']} has no appointments")
+        fill = {
+            "appt_id": appt.id,
+            "since": (timezone.localdate() - timedelta(days=30)).isoformat(),
+            "year": timezone.localdate().year,
+        }
+        prefixes = {"doctor": opts["doctor_prefix"], "admin": opts["admin_prefix"]}
+
+        client = Client()
+        client.force_login(user)
+        self.session_cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+        self.cookies = client.cookies
+        self.base_url = opts["base_url"].rstrip("/") if opts["base_url"] else None
+        self.metrics_token = opts["metrics_token"] or getattr(settings, "METRICS_TOKEN", "")
+        if self.base_url and not self.metrics_token:
+            raise CommandError("--base-url reads query counts from /metrics: pass --metrics-token or set METRICS_TOKEN")
+
+        only = [name.strip() for name in (opts["only"] or "").split(",") if name.strip()]
+        scenarios = [
+            (name, prefixes[area] + path.format(**fill)) for name, area, path in SCENARIOS
+            if not only or any(name.startswith(o) for o in only)
+        ]
+        if not scenarios:
+            raise CommandError("--only matched no scenario")
+
+        results = []
+        for name, url in scenarios:
+            results.append(self.run_scenario(name, url, opts["requests"], opts["warmup"], opts["concurrency"]))
+            self.stderr.write(f"{name}: p95 {results[-1]['p95_ms']} ms")
+
+        report = {
+            "meta": {
+                "started_at": timezone.now().isoformat(),
+                "mode": "http" if self.base_url else "test-client",
+                "base_url": self.base_url,
+                "database": connection.vendor,
+                "concurrency": opts["concurrency"],
+                "requests_per_scenario": opts["requests"],
+                "appointments_for_doctor": Appointment.objects.filter(doctor=doctor).count(),
+            },
+            "scenarios": results,
+        }
+        if opts["baseline"]:
+            report["regressions"] = self.compare(opts["baseline"], results, opts["max_regression"])
+
+        text = json.dumps(report, indent=2)
+        self.stdout.write(text)
+        if opts["output"]:
+            with open(opts["output"], "w") as fh:
+                fh.write(text + "\n")
+        if report.get("regressions"):
+            raise CommandError(f"{len(report['regressions'])} scenario(s) regressed; see 'regressions'")
+
+    # ------------------------------------------------------------------
+    def requester(self):
+        if self.base_url:
+            def get(url):
+                req = urllib.request.Request(self.base_url + url, headers={"Cookie": self.session_cookie})
+                try:
+                    with urllib.request.urlopen(req) as response:
+                        response.read()
+                        return response.status
+                except urllib.error.HTTPError as exc:
+                    return exc.code
+            return get
+
+        local = threading.local()
+
+        def get(url):
+            if not hasattr(local, "client"):
+                local.client = Client()
+                local.client.cookies = self.cookies
+            response = local.client.get(url)
+            if getattr(response, "streaming", False):
+                b"".join(response.streaming_content)
+            return response.status_code
+        return get
+
+    def metrics_snapshot(self):
+        if not self.base_url:
+            return metric_totals(registry.render())
+        req = urllib.request.Request(
+            f"{self.base_url}/{METRICS_ROUTE}", headers={"Authorization": f"Bearer {self.metrics_token}"}
+        )
+        try:
+            with urllib.request.urlopen(req) as response:
+                return metric_totals(response.read().decode())
+        except urllib.error.HTTPError as exc:
+            raise CommandError(f"GET /{METRICS_ROUTE} answered {exc.code}; check --metrics-token")
+        except urllib.error.URLError as exc:
+            raise CommandError(f"GET /{METRICS_ROUTE} failed: {exc.reason}")
+
+    def run_scenario(self, name, url, total, warmup, concurrency):
+        get = self.requester()
+
+        def one(_):
+            t0 = time.perf_counter()
+            status = get(url)
+            return time.perf_counter() - t0, status
+
+        def close(_):
+            for conn in connections.all(initialized_only=True):
+                conn.close()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, range(warmup)))
+            before = self.metrics_snapshot()
+            t0 = time.perf_counter()
+            done = list(pool.map(one, range(total)))
+            elapsed = time.perf_counter() - t0
+            after = self.metrics_snapshot()
+            list(pool.map(close, range(concurrency)))
+
+        latencies = sorted(d[0] for d in done)
+        statuses = Counter(d[1] for d in done)
+        queries = None
+        if after[0] > before[0]:
+            queries = round((after[1] - before[1]) / (after[0] - before[0]), 2)
+
+        def ms(value):
+            return round(value * 1000, 2)
+
+        return {
+            "name": name,
+            "url": url,
+            "requests": total,
+            "errors": sum(count for status, count in statuses.items() if status >= 400),
+            "statuses": {str(status): count for status, count in sorted(statuses.items())},
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(total / elapsed, 1),
+            "p50_ms": ms(percentile(latencies, 50)),
+            "p95_ms": ms(percentile(latencies, 95)),
+            "p99_ms": ms(percentile(latencies, 99)),
+            "max_ms": ms(latencies[-1]),
+            # from the MetricsMiddleware counters; None if no request was counted
+            "queries_per_request": queries,
+        }
+
+    def compare(self, path, results, max_regression):
+        with open(path) as fh:
+            baseline = {s["name"]: s for s in json.load(fh)["scenarios"]}
+        regressions = []
+        for result in results:
+            before = baseline.get(result["name"])
+            if not before or not before.get("p95_ms"):
+                continue
+            change = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100
+            result["p95_change_pct"] = round(change, 1)
+            if change > max_regression:
+                regressions.append({"name": result["name"], "baseline_p95_ms": before["p95_ms"],
+                                    "p95_ms": result["p95_ms"], "change_pct": round(change, 1)})
+        return regressions
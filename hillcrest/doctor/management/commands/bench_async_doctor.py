@@ -0,0 +1,95 @@
+import asyncio
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment
+
+
+def summarize(label, latencies, elapsed, statuses):
+    latencies = sorted(latencies)
+    return {
+        "mode": label,
+        "requests": len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+        "statuses": {str(k): statuses.count(k) for k in sorted(set(statuses))},
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare one worker serving the doctor GET endpoints through the sync "
+        "(WSGI, thread pool) views and the async (ASGI, event loop) views."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username", required=True, help="a user with a DOCTOR StaffProfile")
+        parser.add_argument("--prefix", default="/doctor/", help="where doctor.urls is mounted")
+        parser.add_argument("--endpoint", default="my-appointments/?limit=50")
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=50, help="in-flight requests (async)")
+        parser.add_argument("--threads", type=int, default=4, help="threads of the sync worker")
+
+    def handle(self, *args, **opts):
+        setup_test_environment()
+        try:
+            user = get_user_model().objects.get(username=opts["username"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user {opts['username']}")
+
+        sync_url = f"{opts['prefix']}{opts['endpoint']}"
+        async_url = f"{opts['prefix']}async/{opts['endpoint']}"
+        total = opts["requests"]
+
+        results = [self.run_sync(user, sync_url, total, opts["threads"])]
+        results.append(asyncio.run(self.run_async(user, async_url, total, opts["concurrency"])))
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def run_sync(self, user, url, total, threads):
+        client = Client()
+        client.force_login(user)
+        cookies = client.cookies
+        local = threading.local()
+
+        def one(_):
+            if not hasattr(local, "client"):
+                local.client = Client()
+                local.client.cookies = cookies
+            t0 = time.perf_counter()
+            status = local.client.get(url).status_code
+            return time.perf_counter() - t0, status
+
+        def close(_):
+            connection.close()
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            done = list(pool.map(one, range(total)))
+            list(pool.map(close, range(threads)))
+        elapsed = time.perf_counter() - t0
+        return summarize(f"wsgi ({threads} threads)", [d[0] for d in done], elapsed, [d[1] for d in done])
+
+    async def run_async(self, user, url, total, concurrency):
+        client = AsyncClient()
+        await client.aforce_login(user)
+        gate = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with gate:
+                t0 = time.perf_counter()
+                response = await client.get(url)
+                return time.perf_counter() - t0, response.status_code
+
+        t0 = time.perf_counter()
+        done = await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - t0
+        return summarize(f"asgi ({concurrency} in flight)", [d[0] for d in done], elapsed, [d[1] for d in done])
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from doctor.billing import drain_outbox
+
+
+class Command(BaseCommand):
+    help = "Drain the billing outbox into BillingRecord in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--interval", type=float, default=2.0, help="seconds to sleep when the outbox is empty")
+        parser.add_argument("--once", action="store_true", help="drain what is pending and exit")
+
+    def handle(self, *args, **opts):
+        batch_size, interval = opts["batch_size"], opts["interval"]
+        total = 0
+        try:
+            while True:
+                close_old_connections()
+                processed = drain_outbox(batch_size)
+                total += processed
+                if processed:
+                    self.stdout.write(f"billed {processed} (total {total})")
+                    continue
+                if opts["once"]:
+                    break
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"billing_worker stopped, {total} bills written"))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from admin_panel.models import BillingRecord
+from doctor.models import RevenueRollup
+from doctor.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute RevenueRollup rows from BillingRecord (backfill or repair)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="only rebuild days on or after YYYY-MM-DD")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **opts):
+        records = BillingRecord.objects.all()
+        rollups = RevenueRollup.objects.all()
+        if opts["since"]:
+            since = parse_date(opts["since"])
+            if since is None:
+                raise CommandError("--since must be YYYY-MM-DD")
+            records = records.filter(created_at__date__gte=since)
+            rollups = rollups.filter(date__gte=since)
+
+        read, rows = rebuild_rollups(records, chunk_size=opts["chunk_size"])
+        with transaction.atomic():
+            rollups.delete()
+            RevenueRollup.objects.bulk_create(rows, batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(rows)} rollup rows from {read} bills"))
@@ -0,0 +1,270 @@
+import random
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from admin.models import Department, Employee
+from admin_panel.models import BillingRecord, StaffProfile
+from doctor.models import (
+    LabOrder,
+    LabOrderLine,
+    LabTest,
+    PharmacyOrder,
+    Prescription,
+    PrescriptionItem,
+)
+from doctor.versioning import bump
+from pharmacist.models import Medicine
+from receptionist.models import Appointment, Patient
+from reception.models import AppointmentSlot
+
+FIRST = ["Aisha", "Arjun", "Bilal", "Chen", "Divya", "Elena", "Farah", "Ganesh", "Hana", "Imran",
+         "Jane", "Karthik", "Lakshmi", "Mohan", "Nisha", "Omar", "Priya", "Rahul", "Sara", "Vikram"]
+LAST = ["Roe", "Kumar", "Khan", "Nair", "Iyer", "Patel", "Singh", "Das", "Menon", "Reddy",
+        "Fernandes", "Joseph", "Thomas", "Varma", "Pillai", "Shah", "Rao", "Bose", "Gupta", "Ali"]
+DEPARTMENTS = ["General Medicine", "Cardiology", "Paediatrics", "Orthopaedics", "Dermatology", "ENT"]
+LAB_TESTS = [("CBC", "Complete blood count", "150.00"), ("LFT", "Liver function test", "450.00"),
+             ("KFT", "Kidney function test", "400.00"), ("TSH", "Thyroid stimulating hormone", "300.00"),
+             ("HBA1C", "Glycated haemoglobin", "350.00"), ("LIPID", "Lipid profile", "500.00"),
+             ("URINE", "Urine routine", "120.00"), ("XRAY", "Chest X-ray", "600.00")]
+MEDICINES = ["Paracetamol", "Amoxicillin", "Cetirizine", "Metformin", "Amlodipine", "Omeprazole",
+             "Ibuprofen", "Azithromycin", "Atorvastatin", "Losartan", "Salbutamol", "Pantoprazole",
+             "Vitamin D3", "Iron Folic", "ORS", "Montelukast", "Diclofenac", "Levothyroxine"]
+DIAGNOSES = ["Viral fever", "Hypertension", "Type 2 diabetes", "URTI", "Gastritis", "Allergic rhinitis",
+             "Back pain", "Migraine", "Dermatitis", "Routine check-up"]
+USERNAME_PREFIX = "seed_"
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a development database with realistic volumes: staff, patients, years of "
+        "appointments with prescriptions, lab / pharmacy orders and bills, and the revenue "
+        "rollups. Rows are bulk-inserted with explicit ids, so don't run it against a "
+        "database that is taking writes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--doctors", type=int, default=20)
+        parser.add_argument("--patients", type=int, default=20000)
+        parser.add_argument("--years", type=float, default=2, help="history length")
+        parser.add_argument("--per-day", type=int, default=12, help="appointments per doctor per working day")
+        parser.add_argument("--future-days", type=int, default=14, help="days of upcoming BOOKED appointments")
+        parser.add_argument("--password", default="hillcrest", help="password of every seeded login")
+        parser.add_argument("--random-seed", type=int, default=42)
+        parser.add_argument("--batch", type=int, default=5000)
+
+    def handle(self, *args, **opts):
+        User = get_user_model()
+        if User.objects.filter(username__startswith=USERNAME_PREFIX).exists():
+            raise CommandError("This database is already seeded (users named seed_*).")
+
+        self.rng = random.Random(opts["random_seed"])
+        self.batch = opts["batch"]
+        self.next_id = {}
+        started = timezone.now()
+
+        with transaction.atomic():
+            doctors = self.seed_staff(opts["doctors"], opts["password"])
+            self.seed_catalogs()
+            patients = self.seed_patients(opts["patients"])
+        self.seed_history(doctors, patients, opts["years"], opts["per_day"], opts["future_days"])
+
+        call_command("rebuild_revenue_rollups", stdout=self.stdout)
+        # bulk inserts send no post_save; move the conditional-GET versions along once
+        bump("departments", "employees", "patients")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"seeded in {(timezone.now() - started).total_seconds():.0f}s; "
+            f"logins {USERNAME_PREFIX}doc_1.. / {opts['password']}"
+        ))
+
+    # ------------------------------------------------------------------
+    def ids(self, model, count):
+        # explicit primary keys, so related rows can be built before the
+        # insert on every backend (MySQL returns no ids from bulk_create)
+        if model not in self.next_id:
+            self.next_id[model] = (model.objects.aggregate(m=Max("id"))["m"] or 0) + 1
+        start = self.next_id[model]
+        self.next_id[model] += count
+        return range(start, start + count)
+
+    def insert(self, model, objs):
+        model.objects.bulk_create(objs, batch_size=self.batch)
+
+    def name(self):
+        return f"{self.rng.choice(FIRST)} {self.rng.choice(LAST)}"
+
+    def seed_staff(self, n_doctors, password):
+        User = get_user_model()
+        hashed = make_password(password)  # one hash shared by every seeded login
+        departments = [Department(id=i, name=n) for i, n in zip(self.ids(Department, len(DEPARTMENTS)), DEPARTMENTS)
+                       if not Department.objects.filter(name=n).exists()]
+        self.insert(Department, departments)
+        departments = list(Department.objects.all())
+
+        staff = [("DOCTOR", Employee.ROLE_DOCTOR, f"doc_{i + 1}") for i in range(n_doctors)] + [
+            ("RECEPTIONIST", Employee.ROLE_RECEPTIONIST, "reception_1"),
+            ("PHARMACIST", Employee.ROLE_PHARMACIST, "pharmacy_1"),
+            ("LAB_TECHNICIAN", Employee.ROLE_LAB, "lab_1"),
+        ]
+        user_ids = self.ids(User, len(staff))
+        self.insert(User, [
+            User(id=uid, username=f"{USERNAME_PREFIX}{login}", password=hashed, is_active=True)
+            for uid, (_, _, login) in zip(user_ids, staff)
+        ])
+        profile_ids = self.ids(StaffProfile, len(staff))
+        self.insert(StaffProfile, [
+            StaffProfile(id=pid, user_id=uid, role=role) for pid, uid, (role, _, _) in zip(profile_ids, user_ids, staff)
+        ])
+        self.insert(Employee, [
+            Employee(
+                first_name=self.rng.choice(FIRST), last_name=self.rng.choice(LAST), role=emp_role, user_id=uid,
+                department=self.rng.choice(departments) if emp_role == Employee.ROLE_DOCTOR else None,
+            )
+            for uid, (_, emp_role, _) in zip(user_ids, staff)
+        ])
+        self.stdout.write(f"staff: {len(staff)} ({n_doctors} doctors)")
+        return list(profile_ids)[:n_doctors]
+
+    def seed_catalogs(self):
+        self.insert(LabTest, [
+            LabTest(code=code, name=name, price=price)
+            for code, name, price in LAB_TESTS if not LabTest.objects.filter(code=code).exists()
+        ])
+        self.insert(Medicine, [
+            Medicine(name=name, price=Decimal(self.rng.randrange(200, 5000)) / 100, stock=100000)
+            for name in MEDICINES if not Medicine.objects.filter(name=name).exists()
+        ])
+        self.tests = list(LabTest.objects.filter(is_active=True))
+        self.medicines = list(Medicine.objects.filter(is_active=True))
+
+    def seed_patients(self, count):
+        ids = self.ids(Patient, count)
+        for start in range(0, count, self.batch):
+            self.insert(Patient, [
+                Patient(id=pid, full_name=self.name(),
+                        phone="9" + "".join(self.rng.choice("0123456789") for _ in range(9)))
+                for pid in ids[start:start + self.batch]
+            ])
+        self.stdout.write(f"patients: {count}")
+        return [(pid, name) for pid, name in Patient.objects.filter(id__gte=ids.start, id__lt=ids.stop).values_list("id", "full_name")]
+
+    def seed_history(self, doctors, patients, years, per_day, future_days):
+        tz = timezone.get_current_timezone()
+        today = timezone.localdate()
+        day = today - timedelta(days=int(years * 365))
+        last = today + timedelta(days=future_days)
+        total = 0
+        while day <= last:
+            with transaction.atomic():
+                # a month per transaction
+                for _ in range(30):
+                    if day > last:
+                        break
+                    if day.weekday() != 6:  # closed on Sundays
+                        total += self.seed_day(day, tz, doctors, patients, per_day, day < today)
+                    day += timedelta(days=1)
+            self.stdout.write(f"  appointments up to {day}: {total}", ending="\r")
+            self.stdout.flush()
+        self.stdout.write(f"appointments: {total}" + " " * 20)
+
+    def seed_day(self, day, tz, doctors, patients, per_day, past):
+        rng = self.rng
+        opens = timezone.make_aware(datetime.combine(day, time(9, 0)), tz)
+        slot = timedelta(minutes=15)
+
+        appts = []  # (appt id, doctor id, start, (patient id, name), status)
+        for doctor in doctors:
+            n = max(0, int(rng.gauss(per_day, per_day / 4)))
+            starts = sorted(rng.sample(range(32), min(n, 32)))  # 9:00-17:00 in 15 minute slots
+            for s in starts:
+                status = "BOOKED"
+                if past:
+                    status = rng.choices(["COMPLETED", "CANCELLED", "BOOKED"], [90, 6, 4])[0]
+                appts.append((doctor, opens + s * slot, rng.choice(patients), status))
+        if not appts:
+            return 0
+
+        ids = self.ids(Appointment, len(appts))
+        self.insert(Appointment, [
+            Appointment(id=aid, patient_id=patient[0], doctor_id=doctor, appointment_datetime=start, status=status)
+            for aid, (doctor, start, patient, status) in zip(ids, appts)
+        ])
+        self.insert(AppointmentSlot, [
+            AppointmentSlot(appointment_id=aid, doctor_id=doctor, start=start, end=start + slot,
+                            is_active=status != "CANCELLED")
+            for aid, (doctor, start, _, status) in zip(ids, appts)
+        ])
+
+        completed = [(aid, *rest) for aid, rest in zip(ids, appts) if rest[3] == "COMPLETED"]
+        if completed:
+            self.seed_consultations(completed)
+        return len(appts)
+
+    def seed_consultations(self, completed):
+        rng = self.rng
+        prescriptions, items, lab_orders, lines, pharmacy_orders, bills = [], [], [], [], [], []
+        pres_ids = iter(self.ids(Prescription, len(completed)))
+
+        for aid, doctor, start, (patient_id, patient_name), _ in completed:
+            pres_id = next(pres_ids)
+            prescriptions.append(Prescription(
+                id=pres_id, appointment_id=aid, doctor_id=doctor, patient_id=patient_id,
+                diagnosis=rng.choice(DIAGNOSES), is_dispensed=True,
+            ))
+            drugs = rng.sample(self.medicines, rng.randint(1, 3))
+            items += [PrescriptionItem(prescription_id=pres_id, medicine_name=m.name, dosage="1-0-1",
+                                       duration=f"{rng.randint(3, 10)} days") for m in drugs]
+            order_info = {"appointment_id": aid, "doctor_id": doctor}
+
+            if rng.random() < 0.35:
+                tests = rng.sample(self.tests, rng.randint(1, 3))
+                order_id = next(iter(self.ids(LabOrder, 1)))
+                lab_orders.append((start, LabOrder(
+                    id=order_id, appointment_id=aid, doctor_id=doctor, patient_id=patient_id, is_processed=True,
+                    tests=[{"test": t.code, "name": t.name, "price": str(t.price)} for t in tests],
+                )))
+                lines += [LabOrderLine(order_id=order_id, test=t, price=t.price, created_at=start) for t in tests]
+                bills.append((start, BillingRecord(
+                    bill_type="LAB", patient_name=patient_name, amount=sum(t.price for t in tests),
+                    additional_info={"lab_order_id": order_id, **order_info},
+                )))
+
+            if rng.random() < 0.6:
+                order_id = next(iter(self.ids(PharmacyOrder, 1)))
+                order_items = [{"name": m.name, "qty": rng.randint(1, 20), "price": str(m.price)} for m in drugs]
+                order = PharmacyOrder(
+                    id=order_id, appointment_id=aid, doctor_id=doctor, patient_id=patient_id,
+                    items=order_items, is_dispensed=True,
+                )
+                pharmacy_orders.append((start, order))
+                bills.append((start, BillingRecord(
+                    bill_type="PHARMACY", patient_name=patient_name, amount=order.total_amount(),
+                    additional_info={"pharmacy_order_id": order_id, **order_info},
+                )))
+
+        day = completed[0][2]
+        self.insert(Prescription, prescriptions)
+        self.insert(PrescriptionItem, items)
+        for model, rows in ((LabOrder, lab_orders), (PharmacyOrder, pharmacy_orders)):
+            self.insert(model, [obj for _, obj in rows])
+            self.backdate(model, [obj.id for _, obj in rows], day)
+        self.insert(LabOrderLine, lines)
+        bill_ids = self.ids(BillingRecord, len(bills))
+        for bid, (_, bill) in zip(bill_ids, bills):
+            bill.id = bid
+        self.insert(BillingRecord, [bill for _, bill in bills])
+        self.backdate(BillingRecord, list(bill_ids), day)
+        self.backdate(Prescription, [p.id for p in prescriptions], day)
+
+    def backdate(self, model, ids, when):
+        # created_at is auto_now_add, which bulk_create overrides; one UPDATE per model per day
+        if ids:
+            model.objects.filter(id__in=ids).update(created_at=when.replace(hour=18, minute=0))
@@ -0,0 +1,31 @@
+# Appointment lives in the receptionist app; the worklist index is added here
+# because doctor.views.my_appointments is the query that needs it.
+
+from django.db import migrations, models
+
+INDEX = models.Index(
+    fields=['doctor', '-appointment_datetime', '-id'],
+    name='appt_doctor_datetime_idx',
+)
+
+
+def add_index(apps, schema_editor):
+    Appointment = apps.get_model('receptionist', 'Appointment')
+    schema_editor.add_index(Appointment, INDEX)
+
+
+def remove_index(apps, schema_editor):
+    Appointment = apps.get_model('receptionist', 'Appointment')
+    schema_editor.remove_index(Appointment, INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0001_initial'),
+        ('receptionist', '0004_alter_appointment_token_number'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_index, remove_index),
+    ]
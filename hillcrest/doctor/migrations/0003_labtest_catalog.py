@@ -0,0 +1,90 @@
+# Generated by Django 5.2.8 on 2026-10-17 15:53
+
+from decimal import Decimal, InvalidOperation
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_lines(apps, schema_editor):
+    """
+    Build catalog entries and LabOrderLine rows from the existing free-form
+    LabOrder.tests JSON so historical orders show up in reports.
+    """
+    LabTest = apps.get_model('doctor', 'LabTest')
+    LabOrder = apps.get_model('doctor', 'LabOrder')
+    LabOrderLine = apps.get_model('doctor', 'LabOrderLine')
+
+    catalog = {t.code.upper(): t for t in LabTest.objects.all()}
+    codes = set(catalog)
+
+    def unique_code(name):
+        # code is unique and max 50 chars: names sharing a 50-char prefix get a suffix
+        code, n = name[:50], 1
+        while code.upper() in codes:
+            n += 1
+            code = f"{name[:50 - len(str(n)) - 1]}~{n}"
+        codes.add(code.upper())
+        return code
+
+    batch = []
+    for order in LabOrder.objects.only('id', 'tests', 'created_at').iterator(chunk_size=1000):
+        for entry in order.tests or []:
+            name = str(entry.get('test', '') if isinstance(entry, dict) else entry).strip()
+            if not name:
+                continue
+            try:
+                price = Decimal(str(entry.get('price', 0) if isinstance(entry, dict) else 0))
+            except InvalidOperation:
+                price = Decimal('0')
+            test = catalog.get(name.upper())
+            if test is None:
+                test = LabTest.objects.create(code=unique_code(name), name=name, price=price)
+                catalog[name.upper()] = test
+            batch.append(LabOrderLine(order_id=order.id, test=test, price=price, created_at=order.created_at))
+        if len(batch) >= 1000:
+            LabOrderLine.objects.bulk_create(batch)
+            batch = []
+    LabOrderLine.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0002_appointment_doctor_datetime_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LabTest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=50, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+            options={
+                'ordering': ['code'],
+            },
+        ),
+        migrations.AddField(
+            model_name='prescription',
+            name='is_dispensed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='LabOrderLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField()),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='doctor.laborder')),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='order_lines', to='doctor.labtest')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['test', 'created_at'], name='laborderline_test_created_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_lines, migrations.RunPython.noop),
+    ]
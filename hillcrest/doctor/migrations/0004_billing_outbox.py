@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-17 15:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0004_alter_staffprofile_consultation_fee_and_more'),
+        ('doctor', '0003_labtest_catalog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillingOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bill_type', models.CharField(max_length=20)),
+                ('patient_name', models.CharField(max_length=255)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('additional_info', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('billing_record', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='admin_panel.billingrecord')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['processed_at', 'id'], name='billingoutbox_pending_idx')],
+            },
+        ),
+    ]
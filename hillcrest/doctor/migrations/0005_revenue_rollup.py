@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-17 15:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0004_alter_staffprofile_consultation_fee_and_more'),
+        ('doctor', '0004_billing_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('bill_type', models.CharField(max_length=20)),
+                ('bill_count', models.PositiveIntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('doctor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='admin_panel.staffprofile')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'bill_type', 'doctor'), name='revenuerollup_unique_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-17 15:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0004_alter_staffprofile_consultation_fee_and_more'),
+        ('doctor', '0005_revenue_rollup'),
+        ('receptionist', '0004_alter_appointment_token_number'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pharmacyorder',
+            name='claim_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pharmacyorder',
+            name='claimed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='claimed_pharmacy_orders', to='admin_panel.staffprofile'),
+        ),
+        migrations.AddIndex(
+            model_name='pharmacyorder',
+            index=models.Index(fields=['is_dispensed', 'created_at'], name='pharmacyorder_pending_idx'),
+        ),
+    ]
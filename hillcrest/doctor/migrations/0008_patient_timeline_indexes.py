@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-17 16:22
+
+from django.db import migrations, models
+
+# Appointment lives in the receptionist app; the timeline pages over a
+# patient's appointments, so that index is added here like 0002's.
+APPOINTMENT_INDEX = models.Index(
+    fields=['patient', '-appointment_datetime', '-id'],
+    name='appt_patient_datetime_idx',
+)
+
+
+def add_index(apps, schema_editor):
+    Appointment = apps.get_model('receptionist', 'Appointment')
+    schema_editor.add_index(Appointment, APPOINTMENT_INDEX)
+
+
+def remove_index(apps, schema_editor):
+    Appointment = apps.get_model('receptionist', 'Appointment')
+    schema_editor.remove_index(Appointment, APPOINTMENT_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0004_alter_staffprofile_consultation_fee_and_more'),
+        ('doctor', '0007_resource_version'),
+        ('receptionist', '0004_alter_appointment_token_number'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='laborder',
+            index=models.Index(fields=['patient', 'created_at'], name='laborder_patient_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pharmacyorder',
+            index=models.Index(fields=['patient', 'created_at'], name='pharmacyorder_patient_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prescription',
+            index=models.Index(fields=['patient', 'created_at'], name='prescription_patient_idx'),
+        ),
+        migrations.RunPython(add_index, remove_index),
+    ]
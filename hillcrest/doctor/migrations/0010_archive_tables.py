@@ -0,0 +1,58 @@
+# Generated by Django 5.2.8 on 2026-10-17 16:40
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0009_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAppointment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('patient_id', models.BigIntegerField()),
+                ('doctor_id', models.BigIntegerField(null=True)),
+                ('appointment_datetime', models.DateTimeField()),
+                ('status', models.CharField(max_length=20)),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('prescription', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['patient_id', '-appointment_datetime', '-id'], name='archappt_patient_datetime_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedLabOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('appointment_id', models.BigIntegerField()),
+                ('patient_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField()),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['patient_id', 'created_at'], name='archlaborder_patient_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedPharmacyOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('appointment_id', models.BigIntegerField()),
+                ('patient_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField()),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['patient_id', 'created_at'], name='archpharmorder_patient_idx')],
+            },
+        ),
+    ]
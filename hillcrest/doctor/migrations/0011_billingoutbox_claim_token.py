@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0010_archive_tables'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='billingoutbox',
+            name='claim_token',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+    ]
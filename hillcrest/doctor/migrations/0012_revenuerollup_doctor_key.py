@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:40
+
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+
+
+def fill_doctor_key(apps, schema_editor):
+    """
+    doctor_key = doctor_id, 0 without a doctor. Rows without a doctor that the
+    old (nullable) key let through twice are merged into one.
+    """
+    RevenueRollup = apps.get_model('doctor', 'RevenueRollup')
+    RevenueRollup.objects.filter(doctor__isnull=False).update(doctor_key=F('doctor_id'))
+
+    duplicates = (
+        RevenueRollup.objects.filter(doctor__isnull=True)
+        .values('date', 'bill_type')
+        .annotate(n=Count('id'), bills=Sum('bill_count'), total=Sum('amount'))
+        .filter(n__gt=1)
+    )
+    for dup in duplicates:
+        rows = RevenueRollup.objects.filter(doctor__isnull=True, date=dup['date'], bill_type=dup['bill_type'])
+        keep = rows.order_by('id').first()
+        rows.exclude(id=keep.id).delete()
+        RevenueRollup.objects.filter(id=keep.id).update(bill_count=dup['bills'], amount=dup['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0011_billingoutbox_claim_token'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='revenuerollup',
+            name='revenuerollup_unique_key',
+        ),
+        migrations.AddField(
+            model_name='revenuerollup',
+            name='doctor_key',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_doctor_key, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='revenuerollup',
+            constraint=models.UniqueConstraint(fields=('date', 'bill_type', 'doctor_key'), name='revenuerollup_unique_key'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0012_revenuerollup_doctor_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pharmacyorder',
+            name='cancelled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,4 +1,8 @@
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models import Sum
 from admin_panel.models import StaffProfile, BillingRecord
 from receptionist.models import Appointment, Patient
 
@@ -21,6 +25,11 @@ class Prescription(models.Model):
     # 🔥 NEW FIELD: pharmacist will update this
     is_dispensed = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["patient", "created_at"], name="prescription_patient_idx"),
+        ]
+
     def __str__(self):
         return f"Prescription {self.id} for appt {self.appointment_id}"
 
@@ -41,6 +50,19 @@ class PrescriptionItem(models.Model):
         return f"{self.medicine_name} ({self.prescription_id})"
 
 
+class LabTest(models.Model):
+    code = models.CharField(max_length=50, unique=True)  # e.g. "CBC"
+    name = models.CharField(max_length=255)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ["code"]
+
+    def __str__(self):
+        return f"{self.code} - {self.name}"
+
+
 class LabOrder(models.Model):
     appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE)
     doctor = models.ForeignKey(StaffProfile, on_delete=models.SET_NULL, null=True)
@@ -51,9 +73,34 @@ class LabOrder(models.Model):
 
     is_processed = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["patient", "created_at"], name="laborder_patient_idx"),
+        ]
+
     def __str__(self):
         return f"LabOrder {self.id} for appt {self.appointment_id}"
 
+    def total_amount(self):
+        # single aggregate over the normalized lines, Decimal throughout
+        return self.lines.aggregate(total=Sum("price"))["total"] or Decimal("0")
+
+
+class LabOrderLine(models.Model):
+    # normalized copy of LabOrder.tests, one row per ordered test
+    order = models.ForeignKey(LabOrder, on_delete=models.CASCADE, related_name='lines')
+    test = models.ForeignKey(LabTest, on_delete=models.PROTECT, related_name='order_lines')
+    price = models.DecimalField(max_digits=10, decimal_places=2)  # catalog price at order time
+    created_at = models.DateTimeField()  # copied from the order for reporting
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["test", "created_at"], name="laborderline_test_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.test_id} on LabOrder {self.order_id}"
+
 
 class PharmacyOrder(models.Model):
     appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE)
@@ -64,6 +111,166 @@ class PharmacyOrder(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     is_dispensed = models.BooleanField(default=False)
+    # set when the order is given up (visit cancelled, abandoned) and its reserved stock released
+    cancelled_at = models.DateTimeField(null=True, blank=True)
+
+    # dispensing queue lease (pharmacist/queue.py)
+    claimed_by = models.ForeignKey(
+        StaffProfile, on_delete=models.SET_NULL, null=True, blank=True, related_name='claimed_pharmacy_orders'
+    )
+    claim_expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["is_dispensed", "created_at"], name="pharmacyorder_pending_idx"),
+            models.Index(fields=["patient", "created_at"], name="pharmacyorder_patient_idx"),
+        ]
 
     def __str__(self):
         return f"PharmacyOrder {self.id} for appt {self.appointment_id}"
+
+    def total_amount(self):
+        return sum(
+            (Decimal(str(i.get("price", 0))) * int(i.get("qty", 1)) for i in (self.items or [])),
+            Decimal("0"),
+        )
+
+
+class BillingOutbox(models.Model):
+    # written in the same transaction as the order; billing_worker turns rows into BillingRecords
+    bill_type = models.CharField(max_length=20)
+    patient_name = models.CharField(max_length=255)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    additional_info = models.JSONField(default=dict)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    billing_record = models.ForeignKey(BillingRecord, null=True, blank=True, on_delete=models.SET_NULL)
+    claim_token = models.CharField(max_length=32, blank=True, default="")  # see drain_outbox (no SKIP LOCKED)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["processed_at", "id"], name="billingoutbox_pending_idx"),
+        ]
+
+    def __str__(self):
+        return f"Outbox {self.id} {self.bill_type} {self.amount}"
+
+
+class RevenueRollup(models.Model):
+    # one row per (day, bill type, doctor); maintained by doctor/rollups.py
+    date = models.DateField()
+    bill_type = models.CharField(max_length=20)
+    doctor = models.ForeignKey(StaffProfile, null=True, blank=True, on_delete=models.SET_NULL)
+    # doctor_id, or 0 for bills without a doctor: NULLs never collide in a unique key
+    doctor_key = models.PositiveBigIntegerField(default=0)
+
+    bill_count = models.PositiveIntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["date", "bill_type", "doctor_key"], name="revenuerollup_unique_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.bill_type} doctor={self.doctor_id}: {self.amount}"
+
+
+class ResourceVersion(models.Model):
+    # change counter per cacheable resource, e.g. "appointment:42" or "departments"; see doctor/versioning.py
+    key = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.key} v{self.version}"
+
+
+class IdempotencyKey(models.Model):
+    # one row per Idempotency-Key (scoped to the user), see doctor/idempotency.py
+    STATE_PENDING = "PENDING"
+    STATE_DONE = "DONE"
+
+    key_hash = models.CharField(max_length=64, unique=True)  # sha256 of "user_id:key"
+    fingerprint = models.CharField(max_length=64)  # sha256 of method, path and body
+    state = models.CharField(max_length=10, default=STATE_PENDING)
+
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    body = models.TextField(blank=True)  # JSON response body
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["expires_at"], name="idempotencykey_expires_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.key_hash[:12]} {self.state} {self.status_code}"
+
+
+# -------------------------------------------------------
+# ARCHIVE (cold) tables, filled by doctor/archive.py
+# -------------------------------------------------------
+# Rows keep their original id and are stored as the document the API returns
+# for them, plus the columns the history reads filter and order on. Plain id
+# columns instead of foreign keys: the referenced rows may be archived too.
+
+class ArchivedAppointment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    patient_id = models.BigIntegerField()
+    doctor_id = models.BigIntegerField(null=True)
+    appointment_datetime = models.DateTimeField()
+    status = models.CharField(max_length=20)
+
+    data = models.JSONField(encoder=DjangoJSONEncoder)  # AppointmentSerializer output
+    prescription = models.JSONField(encoder=DjangoJSONEncoder, null=True)  # PrescriptionSerializer output
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["patient_id", "-appointment_datetime", "-id"], name="archappt_patient_datetime_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Archived appointment {self.id}"
+
+
+class ArchivedLabOrder(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    appointment_id = models.BigIntegerField()
+    patient_id = models.BigIntegerField()
+    created_at = models.DateTimeField()
+
+    data = models.JSONField(encoder=DjangoJSONEncoder)  # LabOrderSerializer output
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["patient_id", "created_at"], name="archlaborder_patient_idx"),
+        ]
+
+    def __str__(self):
+        return f"Archived LabOrder {self.id}"
+
+
+class ArchivedPharmacyOrder(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    appointment_id = models.BigIntegerField()
+    patient_id = models.BigIntegerField()
+    created_at = models.DateTimeField()
+
+    data = models.JSONField(encoder=DjangoJSONEncoder)  # PharmacyOrderSerializer output
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["patient_id", "created_at"], name="archpharmorder_patient_idx"),
+        ]
+
+    def __str__(self):
+        return f"Archived PharmacyOrder {self.id}"
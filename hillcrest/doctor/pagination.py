@@ -0,0 +1,95 @@
+# doctor/pagination.py
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class AppointmentKeysetPagination(BasePagination):
+    """
+    Keyset pagination over (appointment_datetime, id), newest first.
+    The cursor is the position of the last row of the previous page, so every
+    page is a single index range scan no matter how deep the history goes.
+    """
+    cursor_query_param = "cursor"
+    page_size_query_param = "limit"
+    page_size = 50
+    max_page_size = 200
+
+    @staticmethod
+    def params(request):
+        return getattr(request, "query_params", request.GET)
+
+    def get_page_size(self, request):
+        try:
+            size = int(self.params(request).get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, appt):
+        raw = f"{appt.appointment_datetime.isoformat()}|{appt.pk}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = self.params(request).get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode()).decode()
+            dt, pk = raw.split("|", 1)
+            return datetime.fromisoformat(dt), int(pk)
+        except (ValueError, UnicodeDecodeError):
+            raise NotFound("Invalid cursor")
+
+    def _page_queryset(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            dt, pk = position
+            queryset = queryset.filter(
+                Q(appointment_datetime__lt=dt) | Q(appointment_datetime=dt, id__lt=pk)
+            )
+
+        # fetch one extra row to know whether there is a next page
+        return queryset.order_by("-appointment_datetime", "-id")[:self.page_size + 1]
+
+    def _set_page(self, rows):
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self._set_page(list(self._page_queryset(queryset, request)))
+
+    def paginate_querysets(self, querysets, request):
+        """
+        One page over several querysets ordered the same way, e.g. live and
+        archived appointments: each is read with the same cursor and limit and
+        the rows are merged. Ids must be unique across them.
+        """
+        rows = [row for queryset in querysets for row in self._page_queryset(queryset, request)]
+        rows.sort(key=lambda row: (row.appointment_datetime, row.pk), reverse=True)
+        return self._set_page(rows[:self.page_size + 1])
+
+    async def apaginate_queryset(self, queryset, request):
+        # for the async views in doctor/async_views.py (plain Django requests)
+        return self._set_page([row async for row in self._page_queryset(queryset, request)])
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "results": data,
+        })
@@ -1,19 +1,17 @@
 # doctor/permissions.py
 from rest_framework.permissions import BasePermission
-from admin_panel.models import StaffProfile
+from .profiles import resolve_staff_profile
 
 class IsDoctor(BasePermission):
     """
     Allow access only to superusers or StaffProfile.role == 'DOCTOR'.
+    The resolved profile is left on request.staff_profile for the view.
     """
     def has_permission(self, request, view):
         user = request.user
         if not user or not user.is_authenticated:
             return False
+        sp = resolve_staff_profile(request)
         if user.is_superuser:
             return True
-        try:
-            sp = StaffProfile.objects.get(user=user)
-            return sp.role == 'DOCTOR'
-        except StaffProfile.DoesNotExist:
-            return False
+        return sp is not None and sp.role == 'DOCTOR'
@@ -0,0 +1,116 @@
+# doctor/profiles.py
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from admin_panel.models import StaffProfile
+
+# sentinel cached for users that have no StaffProfile, so IsDoctor does not
+# re-query for superusers / non-staff accounts on every call
+_MISSING = object()
+
+
+class ProfileCache:
+    """
+    Small process-local LRU cache (user_id -> StaffProfile) with a TTL.
+    Entries are dropped by the StaffProfile / Employee signals in doctor/signals.py.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._data[user_id]
+                return None
+            self._data.move_to_end(user_id)
+            return value
+
+    def set(self, user_id, value):
+        with self._lock:
+            self._data[user_id] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._data.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+profile_cache = ProfileCache(
+    maxsize=getattr(settings, "STAFF_PROFILE_CACHE_SIZE", 1024),
+    ttl=getattr(settings, "STAFF_PROFILE_CACHE_TTL", 300),
+)
+
+
+def resolve_staff_profile(request):
+    """
+    Return the StaffProfile of request.user (or None) and attach it to the
+    request as `staff_profile` / `staff_role`. Called from the permission
+    classes, i.e. after DRF authentication, so it is resolved at most once
+    per request; across requests it is served from `profile_cache`.
+    """
+    if hasattr(request, "staff_profile"):
+        return request.staff_profile
+
+    user = request.user
+    profile = None
+    if user and user.is_authenticated:
+        profile = profile_cache.get(user.pk)
+        if profile is None:
+            profile = StaffProfile.objects.filter(user=user).first() or _MISSING
+            profile_cache.set(user.pk, profile)
+        if profile is _MISSING:
+            profile = None
+
+    request.staff_profile = profile
+    request.staff_role = profile.role if profile else None
+    return profile
+
+
+def get_staff_profile(request):
+    """
+    Same as resolve_staff_profile() but raises StaffProfile.DoesNotExist,
+    matching the old `StaffProfile.objects.get(user=request.user)` calls.
+    """
+    profile = resolve_staff_profile(request)
+    if profile is None:
+        raise StaffProfile.DoesNotExist("No StaffProfile for this user")
+    return profile
+
+
+
+async def aresolve_staff_profile(request):
+    """
+    Async counterpart of resolve_staff_profile() for plain Django async views.
+    """
+    if hasattr(request, "staff_profile"):
+        return request.staff_profile
+
+    user = await request.auser()
+    profile = None
+    if user and user.is_authenticated:
+        profile = profile_cache.get(user.pk)
+        if profile is None:
+            profile = await StaffProfile.objects.filter(user=user).afirst() or _MISSING
+            profile_cache.set(user.pk, profile)
+        if profile is _MISSING:
+            profile = None
+
+    request.staff_profile = profile
+    request.staff_role = profile.role if profile else None
+    return profile
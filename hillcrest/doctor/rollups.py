@@ -0,0 +1,128 @@
+# doctor/rollups.py
+"""
+Daily revenue rollups, keyed by (date, bill_type, doctor).
+
+record_revenue() is called with every bill as it is written (billing worker
+batches and single BillingRecord saves), so month / year figures are a sum over
+a handful of rollup rows instead of a scan of BillingRecord. Bills are dated
+by BillingRecord.created_at on both paths, as rebuild_rollups() does.
+
+Editing a BillingRecord with save() moves it from its old key / amount to the
+new one, and deleting it takes it out (doctor/signals.py). queryset.update()
+sends no signals: run `manage.py rebuild_revenue_rollups` after bulk edits.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from receptionist.models import Appointment
+from .models import RevenueRollup
+
+
+def bill_key(created_at, bill_type, additional_info):
+    info = additional_info or {}
+    return (
+        timezone.localdate(created_at) if timezone.is_aware(created_at) else created_at.date(),
+        bill_type,
+        info.get("doctor_id"),
+    )
+
+
+def _increment(date, bill_type, doctor_id, count, amount):
+    updated = RevenueRollup.objects.filter(date=date, bill_type=bill_type, doctor_key=doctor_id or 0).update(
+        bill_count=F("bill_count") + count,
+        amount=F("amount") + amount,
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            RevenueRollup.objects.create(
+                date=date, bill_type=bill_type, doctor_id=doctor_id, doctor_key=doctor_id or 0,
+                bill_count=count, amount=amount,
+            )
+    except IntegrityError:
+        # another writer created the row first
+        _increment(date, bill_type, doctor_id, count, amount)
+
+
+def _group(bills):
+    totals = defaultdict(lambda: [0, Decimal("0")])
+    for created_at, bill_type, additional_info, amount in bills:
+        entry = totals[bill_key(created_at, bill_type, additional_info)]
+        entry[0] += 1
+        entry[1] += Decimal(str(amount))
+    # a fixed order, so concurrent writers lock the rollup rows alike
+    return sorted(totals.items(), key=str)
+
+
+def record_revenue(bills):
+    """
+    bills: iterable of (created_at, bill_type, additional_info, amount).
+    Groups in memory first, so a batch costs one UPDATE per distinct key.
+    """
+    with transaction.atomic():
+        for (date, bill_type, doctor_id), (count, amount) in _group(bills):
+            _increment(date, bill_type, doctor_id, count, amount)
+
+
+def remove_revenue(bills):
+    """
+    Take bills back out of their rollups (a deleted BillingRecord, or the old
+    values of an edited one). Same bills shape as record_revenue().
+    """
+    with transaction.atomic():
+        for (date, bill_type, doctor_id), (count, amount) in _group(bills):
+            RevenueRollup.objects.filter(date=date, bill_type=bill_type, doctor_key=doctor_id or 0).update(
+                bill_count=F("bill_count") - count,
+                amount=F("amount") - amount,
+            )
+
+
+def rebuild_rollups(records, chunk_size=2000):
+    """
+    Recompute rollups from scratch for the given BillingRecord queryset.
+    Bills written before doctor_id was recorded are attributed through their appointment.
+    Returns (number of bills read, unsaved RevenueRollup rows).
+    """
+    totals = defaultdict(lambda: [0, Decimal("0")])
+    pending = []  # (key without doctor, appointment_id, amount) needing a doctor lookup
+    read = 0
+
+    def resolve_pending():
+        doctors = dict(
+            Appointment.objects.filter(id__in={p[1] for p in pending}).values_list("id", "doctor_id")
+        )
+        for (date, bill_type), appointment_id, amount in pending:
+            entry = totals[(date, bill_type, doctors.get(appointment_id))]
+            entry[0] += 1
+            entry[1] += amount
+        pending.clear()
+
+    rows = records.values_list("created_at", "bill_type", "additional_info", "amount")
+    for created_at, bill_type, additional_info, amount in rows.iterator(chunk_size=chunk_size):
+        read += 1
+        date, bill_type, doctor_id = bill_key(created_at, bill_type, additional_info)
+        amount = Decimal(str(amount))
+        appointment_id = (additional_info or {}).get("appointment_id")
+        if doctor_id is None and appointment_id:
+            pending.append(((date, bill_type), appointment_id, amount))
+            if len(pending) >= chunk_size:
+                resolve_pending()
+            continue
+        entry = totals[(date, bill_type, doctor_id)]
+        entry[0] += 1
+        entry[1] += amount
+    if pending:
+        resolve_pending()
+
+    return read, [
+        RevenueRollup(
+            date=date, bill_type=bill_type, doctor_id=doctor_id, doctor_key=doctor_id or 0,
+            bill_count=count, amount=amount,
+        )
+        for (date, bill_type, doctor_id), (count, amount) in totals.items()
+    ]
@@ -1,14 +1,56 @@
+from django.db import connections, transaction
+from django.db.models.functions import Upper
 from rest_framework import serializers
-from .models import Prescription, PrescriptionItem, LabOrder, PharmacyOrder
+from pharmacist.models import Medicine
+from receptionist.models import Appointment
+from pharmacist.stock import InsufficientStock, order_lines, reserve_stock
+from .lab_catalog import lab_test_cache
+from .models import Prescription, PrescriptionItem, LabOrder, LabOrderLine, PharmacyOrder, ArchivedAppointment
 
 
 # -------------------------------------------------------
 # PRESCRIPTION ITEM
 # -------------------------------------------------------
+def bulk_create_items(prescription, items_data):
+    """
+    Insert all items of a prescription in a single INSERT.
+    Backends that don't return ids from bulk_create (MySQL) get them re-read
+    in one extra query, so callers can still serialize the created rows.
+    """
+    new_items = [PrescriptionItem(prescription=prescription, **data) for data in items_data]
+    if connections[PrescriptionItem.objects.db].features.can_return_rows_from_bulk_insert:
+        return PrescriptionItem.objects.bulk_create(new_items)
+
+    with transaction.atomic():
+        # concurrent inserts for this prescription wait on the lock, so the
+        # rows after last_id are exactly the ones inserted here
+        list(Prescription.objects.select_for_update().filter(pk=prescription.pk).values_list("pk"))
+        last_id = prescription.items.order_by("-id").values_list("id", flat=True).first() or 0
+        PrescriptionItem.objects.bulk_create(new_items)
+        return list(prescription.items.filter(id__gt=last_id).order_by("id"))
+
+
+class PrescriptionItemListSerializer(serializers.ListSerializer):
+    """
+    Used for many=True; save(prescription=...) writes every item in one INSERT.
+    """
+    def create(self, validated_data):
+        if not validated_data:
+            return []
+        prescription = validated_data[0]["prescription"]
+        items_data = [
+            {k: v for k, v in data.items() if k != "prescription"}
+            for data in validated_data
+        ]
+        with transaction.atomic():
+            return bulk_create_items(prescription, items_data)
+
+
 class PrescriptionItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = PrescriptionItem
         fields = ("id", "medicine_name", "dosage", "duration", "instructions")
+        list_serializer_class = PrescriptionItemListSerializer
 
 
 # -------------------------------------------------------
@@ -33,10 +75,10 @@ class PrescriptionSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         items_data = validated_data.pop("items", [])
-        prescription = Prescription.objects.create(**validated_data)
-
-        for item_data in items_data:
-            PrescriptionItem.objects.create(prescription=prescription, **item_data)
+        with transaction.atomic():
+            prescription = Prescription.objects.create(**validated_data)
+            if items_data:
+                bulk_create_items(prescription, items_data)
 
         return prescription
 
@@ -50,6 +92,41 @@ class LabOrderSerializer(serializers.ModelSerializer):
         fields = "__all__"
         read_only_fields = ("doctor", "created_at")
 
+    def validate_tests(self, value):
+        """
+        Accepts the old [{"test": "CBC", "price": 100}] shape (or plain codes)
+        but resolves every test against the LabTest catalog; any client price is ignored.
+        """
+        if not isinstance(value, list):
+            raise serializers.ValidationError("Expected a list of tests.")
+
+        tests, unknown = [], []
+        for entry in value:
+            key = entry.get("test") if isinstance(entry, dict) else entry
+            lab_test = lab_test_cache.lookup(key) if key else None
+            if lab_test is None:
+                unknown.append(key)
+                continue
+            tests.append(lab_test)
+
+        if unknown:
+            raise serializers.ValidationError(f"Unknown lab tests: {unknown}")
+        return tests
+
+    def create(self, validated_data):
+        lab_tests = validated_data.pop("tests", [])
+        # keep the JSON column for existing readers, priced from the catalog
+        validated_data["tests"] = [
+            {"test": t.code, "name": t.name, "price": float(t.price)} for t in lab_tests
+        ]
+        with transaction.atomic():
+            order = LabOrder.objects.create(**validated_data)
+            LabOrderLine.objects.bulk_create([
+                LabOrderLine(order=order, test=t, price=t.price, created_at=order.created_at)
+                for t in lab_tests
+            ])
+        return order
+
 
 # -------------------------------------------------------
 # PHARMACY ORDER
@@ -58,4 +135,149 @@ class PharmacyOrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = PharmacyOrder
         fields = "__all__"
-        read_only_fields = ("doctor", "created_at")
+        read_only_fields = ("doctor", "created_at", "cancelled_at", "claimed_by", "claim_expires_at")
+
+    def validate_items(self, value):
+        """
+        Items keep the [{"name": ..., "qty": ...}] shape; names are resolved
+        against the Medicine catalog in one query and priced from it.
+        """
+        if not isinstance(value, list):
+            raise serializers.ValidationError("Expected a list of items.")
+
+        wanted = {}
+        for entry in value:
+            if not isinstance(entry, dict) or not entry.get("name"):
+                raise serializers.ValidationError("Each item needs a name.")
+            try:
+                qty = int(entry.get("qty", 1))
+            except (TypeError, ValueError):
+                raise serializers.ValidationError(f"Invalid qty for {entry['name']}.")
+            if qty < 1:
+                raise serializers.ValidationError(f"Invalid qty for {entry['name']}.")
+            key = str(entry["name"]).strip().upper()
+            wanted[key] = wanted.get(key, 0) + qty
+
+        medicines = {
+            m.key: m for m in
+            Medicine.objects.annotate(key=Upper("name")).filter(key__in=wanted, is_active=True)
+        }
+        unknown = [k for k in wanted if k not in medicines]
+        if unknown:
+            raise serializers.ValidationError(f"Unknown medicines: {unknown}")
+
+        return [
+            {"medicine_id": m.id, "name": m.name, "qty": wanted[key], "price": float(m.price)}
+            for key, m in medicines.items()
+        ]
+
+    def create(self, validated_data):
+        staff = validated_data.get("doctor")
+        try:
+            with transaction.atomic():
+                order = PharmacyOrder.objects.create(**validated_data)
+                reserve_stock(order_lines(order), order=order, staff=staff)
+        except InsufficientStock as exc:
+            raise serializers.ValidationError({"items": f"Insufficient stock for medicines {exc.medicine_ids}"})
+        return order
+
+
+# -------------------------------------------------------
+# FINALIZE CONSULTATION (everything in one request)
+# -------------------------------------------------------
+class ConsultationSerializer(serializers.Serializer):
+    """
+    The whole visit: prescription notes / diagnosis and items, lab tests and
+    pharmacy items. Every section is validated before anything is written,
+    with the same rules as the single-step endpoints.
+    """
+    notes = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    diagnosis = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    items = PrescriptionItemSerializer(many=True, required=False)
+    tests = serializers.ListField(required=False)
+    pharmacy_items = serializers.ListField(required=False)
+
+    def validate_tests(self, value):
+        return LabOrderSerializer().validate_tests(value)
+
+    def validate_pharmacy_items(self, value):
+        return PharmacyOrderSerializer().validate_items(value)
+
+    def create(self, validated_data):
+        """
+        Expects the appointment (patient selected) and doctor in save() kwargs.
+        Returns (prescription, lab_order or None, pharmacy_order or None).
+        """
+        appt = validated_data["appointment"]
+        fields = {"appointment": appt, "doctor": validated_data["doctor"], "patient": appt.patient}
+
+        prescription = Prescription.objects.create(
+            notes=validated_data.get("notes"), diagnosis=validated_data.get("diagnosis"), **fields
+        )
+        if validated_data.get("items"):
+            bulk_create_items(prescription, validated_data["items"])
+
+        lab_order = pharmacy_order = None
+        if validated_data.get("tests"):
+            lab_order = LabOrderSerializer().create({**fields, "tests": validated_data["tests"]})
+        if validated_data.get("pharmacy_items"):
+            try:
+                pharmacy_order = PharmacyOrderSerializer().create({**fields, "items": validated_data["pharmacy_items"]})
+            except serializers.ValidationError as exc:
+                raise serializers.ValidationError({"pharmacy_items": exc.detail["items"]})
+        return prescription, lab_order, pharmacy_order
+
+
+# -------------------------------------------------------
+# PATIENT TIMELINE (read only)
+# -------------------------------------------------------
+def timeline_documents(serializer_class, live, archived):
+    """Live orders and archived ones (already documents), by created_at."""
+    orders = sorted([*live, *archived], key=lambda o: (o.created_at, o.id))
+    return [o.data if o in archived else serializer_class(o).data for o in orders]
+
+
+class TimelineVisitSerializer(serializers.ModelSerializer):
+    """
+    One visit of the patient timeline. Expects the appointment to come from
+    doctor.views.patient_timeline, i.e. with `prescription` (and its items),
+    `lab_orders` and `pharmacy_orders` prefetched and the archived orders
+    attached by doctor.archive.attach_archived_orders.
+    """
+    prescription = serializers.SerializerMethodField()
+    lab_orders = serializers.SerializerMethodField()
+    pharmacy_orders = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Appointment
+        fields = ("id", "appointment_datetime", "status", "doctor", "prescription", "lab_orders", "pharmacy_orders")
+
+    def get_prescription(self, appt):
+        pres = getattr(appt, "prescription", None)
+        return PrescriptionSerializer(pres).data if pres else None
+
+    def get_lab_orders(self, appt):
+        return timeline_documents(LabOrderSerializer, appt.lab_orders, appt.archived_lab_orders)
+
+    def get_pharmacy_orders(self, appt):
+        return timeline_documents(PharmacyOrderSerializer, appt.pharmacy_orders, appt.archived_pharmacy_orders)
+
+
+class ArchivedVisitSerializer(serializers.ModelSerializer):
+    """
+    A visit from the archive, in the same shape as TimelineVisitSerializer.
+    Its prescription and orders were stored as documents when it was archived.
+    """
+    doctor = serializers.IntegerField(source="doctor_id")
+    lab_orders = serializers.SerializerMethodField()
+    pharmacy_orders = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ArchivedAppointment
+        fields = ("id", "appointment_datetime", "status", "doctor", "prescription", "lab_orders", "pharmacy_orders")
+
+    def get_lab_orders(self, visit):
+        return [o.data for o in visit.archived_lab_orders]
+
+    def get_pharmacy_orders(self, visit):
+        return [o.data for o in visit.archived_pharmacy_orders]
@@ -0,0 +1,130 @@
+# doctor/signals.py
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+from admin_panel.models import StaffProfile, BillingRecord
+from admin.models import Department, Employee
+from admin.reference import reference_data
+from receptionist.models import Appointment, Patient
+from .events import publish_order_event
+from .lab_catalog import VERSION_KEY as LAB_TEST_VERSION_KEY, lab_test_cache
+from .models import LabTest, LabOrder, PharmacyOrder
+from .profiles import profile_cache
+from .rollups import record_revenue, remove_revenue
+from .versioning import appointment_keys, bump
+
+
+def stored_value(sender, instance, attname, update_fields=None):
+    """
+    The value of `attname` currently in the database for an instance about to
+    be saved; None for new rows and for saves whose update_fields leave it alone.
+    """
+    if instance._state.adding or instance.pk is None:
+        return None
+    if update_fields is not None and not {attname, attname.removesuffix("_id")} & set(update_fields):
+        return None
+    return sender._base_manager.filter(pk=instance.pk).values_list(attname, flat=True).first()
+
+
+@receiver(pre_save, sender=StaffProfile)
+@receiver(pre_save, sender=Employee)
+def remember_previous_user(sender, instance, update_fields=None, **kwargs):
+    instance._previous_user_id = stored_value(sender, instance, "user_id", update_fields)
+
+
+@receiver(post_save, sender=StaffProfile)
+@receiver(post_delete, sender=StaffProfile)
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def invalidate_cached_profile(sender, instance, **kwargs):
+    # a profile moved to another user must drop the old user's entry too
+    for user_id in {instance.user_id, getattr(instance, "_previous_user_id", None)}:
+        if user_id:
+            profile_cache.invalidate(user_id)
+
+
+@receiver(post_save, sender=LabTest)
+@receiver(post_delete, sender=LabTest)
+def invalidate_lab_test_cache(sender, instance, **kwargs):
+    bump(LAB_TEST_VERSION_KEY)
+    transaction.on_commit(lab_test_cache.clear)
+
+
+# pushed to the lab / pharmacy consoles (doctor/events.py)
+@receiver(post_save, sender=LabOrder)
+@receiver(post_save, sender=PharmacyOrder)
+def push_order_event(sender, instance, created, **kwargs):
+    publish_order_event(instance, created=created)
+
+
+BILLED_FIELDS = ("created_at", "bill_type", "additional_info", "amount")
+
+
+def billed_as(record):
+    """The (created_at, bill_type, additional_info, amount) a bill is rolled up under."""
+    created_at = getattr(record, "created_at", None) or timezone.now()
+    return created_at, record.bill_type, record.additional_info, record.amount
+
+
+@receiver(pre_save, sender=BillingRecord)
+def remember_billed_values(sender, instance, update_fields=None, **kwargs):
+    # what the stored bill is rolled up under, for moving it if the save changes that
+    instance._billed_as = None
+    if instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not set(BILLED_FIELDS) & set(update_fields):
+        return
+    instance._billed_as = sender._base_manager.filter(pk=instance.pk).values_list(*BILLED_FIELDS).first()
+
+
+@receiver(post_save, sender=BillingRecord)
+def add_bill_to_rollups(sender, instance, created, **kwargs):
+    # bulk_create (billing worker) doesn't send post_save; it updates rollups itself
+    if created:
+        record_revenue([billed_as(instance)])
+    elif getattr(instance, "_billed_as", None) is not None:
+        remove_revenue([instance._billed_as])
+        record_revenue([billed_as(instance)])
+
+
+@receiver(post_delete, sender=BillingRecord)
+def remove_bill_from_rollups(sender, instance, **kwargs):
+    remove_revenue([billed_as(instance)])
+
+
+# versions behind the conditional GETs (doctor/versioning.py)
+@receiver(pre_save, sender=Appointment)
+def remember_previous_doctor(sender, instance, update_fields=None, **kwargs):
+    instance._previous_doctor_id = stored_value(sender, instance, "doctor_id", update_fields)
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def bump_appointment_version(sender, instance, **kwargs):
+    bump(*appointment_keys(instance.id, instance.doctor_id))
+    # a reassigned appointment also leaves the previous doctor's worklist
+    previous = getattr(instance, "_previous_doctor_id", None)
+    if previous and previous != instance.doctor_id:
+        bump(*appointment_keys(instance.id, previous)[1:])
+
+
+@receiver(post_save, sender=Patient)
+@receiver(post_delete, sender=Patient)
+def bump_patient_version(sender, instance, **kwargs):
+    bump("patients")
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def bump_department_version(sender, instance, **kwargs):
+    bump("departments")
+    transaction.on_commit(reference_data.clear)
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def bump_employee_version(sender, instance, **kwargs):
+    bump("employees")
+    transaction.on_commit(reference_data.clear)
@@ -1,3 +1,450 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from admin_panel.models import BillingRecord, StaffProfile
+from hillcrest.testing import (
+    assert_queries_do_not_grow,
+    retry_locked,
+    run_concurrently,
+    skip_unless_concurrent_writes,
+)
+from pharmacist.models import Medicine
+from receptionist.models import Appointment, Patient
+from . import idempotency
+from .billing import drain_outbox, enqueue_bill
+from .idempotency import REPLAYED_HEADER, begin, idempotent
+from .lab_catalog import lab_test_cache
+from .models import (
+    BillingOutbox,
+    IdempotencyKey,
+    LabOrder,
+    LabTest,
+    PharmacyOrder,
+    Prescription,
+    PrescriptionItem,
+    RevenueRollup,
+)
+from .profiles import profile_cache
+from .serializers import PharmacyOrderSerializer
+from .versioning import appointment_keys, versions
+from .views import save_order_with_bill
+
+User = get_user_model()
+
+
+@override_settings(ROOT_URLCONF="doctor.urls")
+class DoctorQueryCountTests(TestCase):
+    """The doctor's list endpoints run the same queries for 1 row as for 10."""
+
+    def setUp(self):
+        profile_cache.clear()
+        user = User.objects.create_user(username="doc_1_test", password="x")
+        self.doctor = StaffProfile.objects.create(user=user, role="DOCTOR")
+        self.patient = Patient.objects.create(full_name="Jane Roe", phone="9000000000")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.start = timezone.now() - timedelta(days=30)
+        # the first request also fills the staff profile cache
+        self.client.get("/my-appointments/")
+
+    def add_appointments(self, n):
+        offset = Appointment.objects.count()
+        for i in range(offset, offset + n):
+            Appointment.objects.create(
+                patient=Patient.objects.create(full_name=f"Patient {i}", phone=f"9{i:09d}"),
+                doctor=self.doctor,
+                appointment_datetime=self.start + timedelta(hours=i),
+            )
+
+    def add_visits(self, n):
+        # a visit with a prescription (two items), a lab order and a pharmacy order
+        offset = Appointment.objects.filter(patient=self.patient).count()
+        for i in range(offset, offset + n):
+            appt = Appointment.objects.create(
+                patient=self.patient,
+                doctor=self.doctor,
+                appointment_datetime=self.start + timedelta(hours=i),
+                status="COMPLETED",
+            )
+            pres = Prescription.objects.create(appointment=appt, doctor=self.doctor, patient=self.patient)
+            PrescriptionItem.objects.create(prescription=pres, medicine_name="Paracetamol", dosage="500mg")
+            PrescriptionItem.objects.create(prescription=pres, medicine_name="Cetirizine", dosage="10mg")
+            LabOrder.objects.create(appointment=appt, doctor=self.doctor, patient=self.patient, tests=[])
+            PharmacyOrder.objects.create(appointment=appt, doctor=self.doctor, patient=self.patient, items=[])
+
+    def test_worklist(self):
+        assert_queries_do_not_grow(
+            lambda: self.client.get("/my-appointments/"),
+            self.add_appointments,
+        )
+
+    def test_worklist_filtered(self):
+        assert_queries_do_not_grow(
+            lambda: self.client.get("/my-appointments/", {"date_from": "2000-01-01", "date_to": "2999-12-31"}),
+            self.add_appointments,
+        )
+
+    def test_patient_timeline(self):
+        assert_queries_do_not_grow(
+            lambda: self.client.get(f"/patients/{self.patient.id}/timeline/"),
+            self.add_visits,
+        )
+
+
+class ProfileCacheSignalTests(TestCase):
+    def test_repointed_profile_drops_both_users(self):
+        old_user = User.objects.create_user(username="old_user", password="x")
+        new_user = User.objects.create_user(username="new_user", password="x")
+        profile = StaffProfile.objects.create(user=old_user, role="DOCTOR")
+        profile_cache.set(old_user.pk, profile)
+        profile_cache.set(new_user.pk, profile)
+
+        profile.user = new_user
+        profile.save()
+
+        self.assertIsNone(profile_cache.get(old_user.pk))
+        self.assertIsNone(profile_cache.get(new_user.pk))
+
+    def test_unrelated_update_skips_the_lookup(self):
+        user = User.objects.create_user(username="doc_2_test", password="x")
+        profile = StaffProfile.objects.create(user=user, role="DOCTOR")
+        with self.assertNumQueries(1):
+            profile.save(update_fields=["role"])
+
+
+class AppointmentVersionSignalTests(TestCase):
+    def test_reassignment_bumps_both_worklists(self):
+        first, second = (StaffProfile.objects.create(role="DOCTOR") for _ in range(2))
+        patient = Patient.objects.create(full_name="Jane Roe", phone="9000000000")
+        appt = Appointment.objects.create(patient=patient, doctor=first, appointment_datetime=timezone.now())
+        keys = appointment_keys(appt.id, first.id) + appointment_keys(appt.id, second.id)[1:]
+        before = versions(keys)
+
+        appt.doctor = second
+        with self.captureOnCommitCallbacks(execute=True):
+            appt.save()
+
+        after = versions(keys)
+        self.assertTrue(all(after[key] > before[key] for key in keys), (before, after))
+
+
+def enqueue_test_bills(n, amount="10.00"):
+    for i in range(n):
+        enqueue_bill("LAB", f"Patient {i}", Decimal(amount), {"lab_order_id": i + 1})
+
+
+class BillingOutboxTests(TestCase):
+    def assert_billed_once(self, n):
+        self.assertEqual(BillingRecord.objects.count(), n)
+        outbox_ids = [r.additional_info["outbox_id"] for r in BillingRecord.objects.all()]
+        self.assertEqual(len(set(outbox_ids)), n)
+        self.assertFalse(BillingOutbox.objects.filter(processed_at__isnull=True).exists())
+        self.assertEqual(RevenueRollup.objects.aggregate(n=Sum("bill_count"))["n"], n)
+
+    def test_rerun_does_not_bill_again(self):
+        enqueue_test_bills(7)
+        self.assertEqual(drain_outbox(batch_size=5), 5)
+        self.assertEqual(drain_outbox(batch_size=5), 2)
+        self.assertEqual(drain_outbox(batch_size=5), 0)
+        self.assert_billed_once(7)
+
+    def test_rolled_back_order_leaves_no_outbox_row(self):
+        doctor = StaffProfile.objects.create(role="DOCTOR")
+        patient = Patient.objects.create(full_name="Jane Roe", phone="9000000000")
+        appt = Appointment.objects.create(patient=patient, doctor=doctor, appointment_datetime=timezone.now())
+        Medicine.objects.create(name="Paracetamol", price=Decimal("2.50"), stock=10)
+        serializer = PharmacyOrderSerializer(data={
+            "appointment": appt.id, "patient": patient.id, "items": [{"name": "Paracetamol", "qty": 2}],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            save_order_with_bill(serializer, appt, doctor, "PHARMACY", "pharmacy_order_id")
+            self.assertEqual(BillingOutbox.objects.count(), 1)
+            raise RuntimeError("request failed after the order was saved")
+
+        self.assertFalse(PharmacyOrder.objects.exists())
+        self.assertFalse(BillingOutbox.objects.exists())
+        self.assertEqual(drain_outbox(), 0)
+        self.assertFalse(BillingRecord.objects.exists())
+
+
+class BillingOutboxConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        skip_unless_concurrent_writes(self)
+
+    def test_overlapping_drains_bill_each_row_once(self):
+        enqueue_test_bills(300)
+
+        def worker(i):
+            processed = 0
+            while True:
+                n = retry_locked(drain_outbox, batch_size=25)
+                if not n:
+                    return processed
+                processed += n
+
+        self.assertEqual(sum(run_concurrently(worker, 4)), 300)
+        BillingOutboxTests.assert_billed_once(self, 300)
+
+
+class RevenueRollupSignalTests(TestCase):
+    def rollups(self):
+        return {
+            (r.bill_type, r.doctor_key): (r.bill_count, r.amount)
+            for r in RevenueRollup.objects.filter(bill_count__gt=0)
+        }
+
+    def test_edits_and_deletes_follow_the_bill(self):
+        first, second = (StaffProfile.objects.create(role="DOCTOR") for _ in range(2))
+        bill = BillingRecord.objects.create(
+            bill_type="LAB", patient_name="Jane Roe", amount=Decimal("10.00"), additional_info={"doctor_id": first.id},
+        )
+        self.assertEqual(self.rollups(), {("LAB", first.id): (1, Decimal("10.00"))})
+
+        bill.amount = Decimal("25.00")
+        bill.save()
+        self.assertEqual(self.rollups(), {("LAB", first.id): (1, Decimal("25.00"))})
+
+        bill.bill_type = "PHARMACY"
+        bill.additional_info = {"doctor_id": second.id}
+        bill.save()
+        self.assertEqual(self.rollups(), {("PHARMACY", second.id): (1, Decimal("25.00"))})
+
+        bill.delete()
+        self.assertEqual(self.rollups(), {})
+
+    def test_unrelated_update_leaves_the_rollups_alone(self):
+        bill = BillingRecord.objects.create(bill_type="LAB", patient_name="Jane Roe", amount=Decimal("10.00"))
+        bill.patient_name = "Jane A. Roe"
+        with self.assertNumQueries(1):
+            bill.save(update_fields=["patient_name"])
+        self.assertEqual(self.rollups(), {("LAB", 0): (1, Decimal("10.00"))})
+
+
+@override_settings(ROOT_URLCONF="doctor.urls")
+class FinalizeConsultationTests(TestCase):
+    def setUp(self):
+        profile_cache.clear()
+        user = User.objects.create_user(username="doc_5_test", password="x")
+        self.doctor = StaffProfile.objects.create(user=user, role="DOCTOR")
+        patient = Patient.objects.create(full_name="Jane Roe", phone="9000000000")
+        self.appt = Appointment.objects.create(patient=patient, doctor=self.doctor, appointment_datetime=timezone.now())
+        LabTest.objects.create(code="CBC", name="Complete blood count", price=Decimal("100.00"))
+        lab_test_cache.clear()
+        self.medicine = Medicine.objects.create(name="Paracetamol", price=Decimal("2.50"), stock=10)
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def finalize(self, **changes):
+        body = {
+            "notes": "Fever for two days",
+            "diagnosis": "Viral fever",
+            "items": [{"medicine_name": "Paracetamol", "dosage": "500mg", "duration": "3 days"}],
+            "tests": ["CBC"],
+            "pharmacy_items": [{"name": "Paracetamol", "qty": 2}],
+            **changes,
+        }
+        return self.client.post(f"/appointments/{self.appt.id}/finalize/", body, format="json")
+
+    def assert_nothing_written(self):
+        self.assertFalse(Prescription.objects.exists())
+        self.assertFalse(PrescriptionItem.objects.exists())
+        self.assertFalse(LabOrder.objects.exists())
+        self.assertFalse(PharmacyOrder.objects.exists())
+        self.assertFalse(BillingOutbox.objects.exists())
+        self.appt.refresh_from_db()
+        self.assertEqual(self.appt.status, "BOOKED")
+        self.medicine.refresh_from_db()
+        self.assertEqual(self.medicine.reserved, 0)
+
+    def test_writes_the_whole_visit(self):
+        response = self.finalize()
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(PrescriptionItem.objects.filter(prescription__appointment=self.appt).count(), 1)
+        self.assertEqual(LabOrder.objects.filter(appointment=self.appt).count(), 1)
+        self.assertEqual(PharmacyOrder.objects.filter(appointment=self.appt).count(), 1)
+        bills = {row.bill_type: row.amount for row in BillingOutbox.objects.all()}
+        self.assertEqual(bills, {"LAB": Decimal("100.00"), "PHARMACY": Decimal("5.00")})
+        self.appt.refresh_from_db()
+        self.assertEqual(self.appt.status, "COMPLETED")
+        self.medicine.refresh_from_db()
+        self.assertEqual(self.medicine.reserved, 2)
+
+    def test_invalid_section_writes_nothing(self):
+        for changes in (
+            {"items": [{"dosage": "500mg"}]},
+            {"tests": ["NOPE"]},
+            {"pharmacy_items": [{"name": "Unobtainium", "qty": 1}]},
+            # stock is checked while writing, after the prescription is saved
+            {"pharmacy_items": [{"name": "Paracetamol", "qty": 11}]},
+        ):
+            with self.subTest(changes=changes):
+                self.assertEqual(self.finalize(**changes).status_code, 400)
+                self.assert_nothing_written()
+
+    def test_closed_or_prescribed_appointment_conflicts(self):
+        for status in ("CANCELLED", "COMPLETED"):
+            with self.subTest(status=status):
+                Appointment.objects.filter(id=self.appt.id).update(status=status)
+                self.assertEqual(self.finalize().status_code, 409)
+                self.assertFalse(Prescription.objects.exists())
+
+        Appointment.objects.filter(id=self.appt.id).update(status="BOOKED")
+        Prescription.objects.create(appointment=self.appt, doctor=self.doctor, patient=self.appt.patient)
+        self.assertEqual(self.finalize().status_code, 409)
+        self.assertFalse(LabOrder.objects.exists())
+        self.assertFalse(BillingOutbox.objects.exists())
+
+
+def make_lab_visit(username):
+    """A doctor login with one appointment, and CBC in the lab catalog. Returns (user, appointment)."""
+    user = User.objects.create_user(username=username, password="x")
+    doctor = StaffProfile.objects.create(user=user, role="DOCTOR")
+    patient = Patient.objects.create(full_name="Jane Roe", phone="9000000000")
+    appt = Appointment.objects.create(patient=patient, doctor=doctor, appointment_datetime=timezone.now())
+    LabTest.objects.create(code="CBC", name="Complete blood count", price=Decimal("100.00"))
+    LabTest.objects.create(code="LFT", name="Liver function test", price=Decimal("250.00"))
+    lab_test_cache.clear()
+    return user, appt
+
+
+@override_settings(ROOT_URLCONF="doctor.urls")
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        profile_cache.clear()
+        self.user, self.appt = make_lab_visit("doc_6_test")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def order_lab_tests(self, key, tests=("CBC",)):
+        return self.client.post(
+            f"/appointments/{self.appt.id}/lab-order/", {"tests": list(tests)},
+            format="json", headers={"Idempotency-Key": key},
+        )
+
+    def test_retry_replays_the_stored_response(self):
+        first = self.order_lab_tests("visit-1")
+        retry = self.order_lab_tests("visit-1")
+
+        self.assertEqual(first.status_code, 201)
+        self.assertNotIn(REPLAYED_HEADER, first)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry[REPLAYED_HEADER], "true")
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(LabOrder.objects.count(), 1)
+        drain_outbox()
+        self.assertEqual(BillingRecord.objects.count(), 1)
+
+    def test_same_key_for_a_different_request_is_refused(self):
+        self.assertEqual(self.order_lab_tests("visit-1").status_code, 201)
+        self.assertEqual(self.order_lab_tests("visit-1", tests=["LFT"]).status_code, 422)
+        self.assertEqual(LabOrder.objects.count(), 1)
+
+    def test_exception_releases_the_key(self):
+        with mock.patch("doctor.views.save_order_with_bill", side_effect=RuntimeError("database went away")):
+            with self.assertRaises(RuntimeError):
+                self.order_lab_tests("visit-1")
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        retry = self.order_lab_tests("visit-1")
+        self.assertEqual(retry.status_code, 201)
+        self.assertNotIn(REPLAYED_HEADER, retry)
+
+    def test_server_error_releases_the_key(self):
+        calls = []
+
+        @api_view(["POST"])
+        @idempotent
+        def view(request):
+            calls.append(request.data["status"])
+            return Response({}, status=request.data["status"])
+
+        def post(status):
+            request = APIRequestFactory().post(
+                "/flaky/", {"status": status}, format="json", headers={"Idempotency-Key": "flaky"}
+            )
+            force_authenticate(request, self.user)
+            return view(request)
+
+        self.assertEqual(post(503).status_code, 503)
+        self.assertEqual(post(503).status_code, 503)
+        self.assertEqual(calls, [503, 503])
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_stale_pending_key_is_taken_over(self):
+        outcome, row = begin(self.user.pk, "visit-1", "fingerprint")
+        self.assertEqual(outcome, idempotency.RUN)
+        # the first worker is still running: the duplicate has to wait
+        self.assertEqual(begin(self.user.pk, "visit-1", "fingerprint")[0], idempotency.WAIT)
+
+        with override_settings(IDEMPOTENCY_PENDING_TIMEOUT=60):
+            IdempotencyKey.objects.filter(pk=row.pk).update(created_at=timezone.now() - timedelta(seconds=61))
+            outcome, taken = begin(self.user.pk, "visit-1", "fingerprint")
+
+        self.assertEqual((outcome, taken.pk), (idempotency.RUN, row.pk))
+
+    def test_expired_keys_are_purged(self):
+        self.order_lab_tests("visit-1")
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        idempotency._last_purge[0] = 0.0
+
+        begin(self.user.pk, "visit-2", "fingerprint")
+
+        self.assertEqual(list(IdempotencyKey.objects.values_list("key_hash", flat=True)),
+                         [idempotency._sha256(self.user.pk, "visit-2")])
+        # the expired key runs the view again
+        self.assertEqual(self.order_lab_tests("visit-1").status_code, 201)
+        self.assertEqual(LabOrder.objects.count(), 2)
+
+    async def test_async_retry_replays_the_stored_response(self):
+        await self.async_client.aforce_login(self.user)
+        url = f"/async/appointments/{self.appt.id}/lab-order/"
+        responses = [
+            await self.async_client.post(
+                url, {"tests": ["CBC"]}, content_type="application/json", headers={"Idempotency-Key": "visit-1"}
+            )
+            for _ in range(2)
+        ]
+
+        self.assertEqual([r.status_code for r in responses], [201, 201])
+        self.assertNotIn(REPLAYED_HEADER, responses[0])
+        self.assertEqual(responses[1][REPLAYED_HEADER], "true")
+        self.assertEqual(responses[1].json(), responses[0].json())
+        self.assertEqual(await LabOrder.objects.acount(), 1)
+
+
+@override_settings(ROOT_URLCONF="doctor.urls")
+class IdempotencyConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        skip_unless_concurrent_writes(self)
+        profile_cache.clear()
+
+    def test_concurrent_duplicates_run_once(self):
+        user, appt = make_lab_visit("doc_7_test")
+
+        def worker(i):
+            client = APIClient()
+            client.force_authenticate(user)
+            response = client.post(
+                f"/appointments/{appt.id}/lab-order/", {"tests": ["CBC"]},
+                format="json", headers={"Idempotency-Key": "visit-1"},
+            )
+            return response.status_code, response.has_header(REPLAYED_HEADER)
+
+        results = run_concurrently(worker, 4)
+
+        self.assertEqual(sorted(results), [(201, False)] + [(201, True)] * 3)
+        self.assertEqual(LabOrder.objects.count(), 1)
+        self.assertEqual(BillingOutbox.objects.count(), 1)
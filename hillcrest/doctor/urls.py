@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     path("my-appointments/", views.my_appointments),
@@ -7,10 +7,13 @@ urlpatterns = [
     # Appointment Detail
     path("appointments/<int:appt_id>/", views.appointment_detail),
 
+    # Patient history: visits with prescriptions, lab and pharmacy orders
+    path("patients/<int:patient_id>/timeline/", views.patient_timeline),
+
     # Create prescription (doctor’s notes)
     path("appointments/<int:appt_id>/prescription/", views.create_prescription),
 
-    # Add prescription item (medicine)
+    # Add prescription item(s) (medicine) - single object or a list
     path(
         "appointments/<int:appt_id>/prescription/add-item/",
         views.add_prescription_item
@@ -22,6 +25,20 @@ urlpatterns = [
     # Pharmacy order
     path("appointments/<int:appt_id>/pharmacy-order/", views.create_pharmacy_order),
 
+    # Whole consultation in one request (prescription, items, orders, complete)
+    path("appointments/<int:appt_id>/finalize/", views.finalize_consultation),
+
     # Complete appointment
     path("appointments/<int:appt_id>/complete/", views.mark_appointment_completed),
 ]
+
+# Async (ASGI) versions of the endpoints above, see doctor/async_views.py
+urlpatterns += [
+    path("async/my-appointments/", async_views.my_appointments),
+    path("async/appointments/<int:appt_id>/", async_views.appointment_detail),
+    path("async/appointments/<int:appt_id>/prescription/", async_views.create_prescription),
+    path("async/appointments/<int:appt_id>/prescription/add-item/", async_views.add_prescription_item),
+    path("async/appointments/<int:appt_id>/lab-order/", async_views.create_lab_order),
+    path("async/appointments/<int:appt_id>/pharmacy-order/", async_views.create_pharmacy_order),
+    path("async/appointments/<int:appt_id>/complete/", async_views.mark_appointment_completed),
+]
@@ -0,0 +1,114 @@
+# doctor/versioning.py
+"""
+Per-resource version counters for conditional GETs.
+
+Model save/delete signals (doctor/signals.py) bump a key such as
+"appointment:42" or "departments" after the transaction commits. A polling
+client that sends If-None-Match / If-Modified-Since is answered from a single
+lookup on the small ResourceVersion table, after at most an indexed ownership
+check (appointment_detail): a 304 never loads the resource or runs a
+serializer.
+"""
+import hashlib
+from functools import wraps
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework.response import Response
+
+from .models import ResourceVersion
+
+
+def _bump_now(key):
+    now = timezone.now()
+    if ResourceVersion.objects.filter(key=key).update(version=F("version") + 1, updated_at=now):
+        return
+    try:
+        with transaction.atomic():
+            ResourceVersion.objects.create(key=key, version=1, updated_at=now)
+    except IntegrityError:
+        ResourceVersion.objects.filter(key=key).update(version=F("version") + 1, updated_at=now)
+
+
+def bump(*keys):
+    """Bump keys once the current transaction commits (immediately in autocommit)."""
+    for key in keys:
+        transaction.on_commit(lambda key=key: _bump_now(key))
+
+
+def appointment_keys(appt_id, doctor_id):
+    return (f"appointment:{appt_id}", f"appointments:doctor:{doctor_id}")
+
+
+def versions(keys):
+    """{key: version} for the given keys; keys never bumped are 0."""
+    found = dict(ResourceVersion.objects.filter(key__in=keys).values_list("key", "version"))
+    return {key: found.get(key, 0) for key in keys}
+
+
+def validators(keys):
+    """(etag, last_modified) for the given keys, from one query."""
+    rows = dict(
+        (key, (version, updated_at))
+        for key, version, updated_at in
+        ResourceVersion.objects.filter(key__in=keys).values_list("key", "version", "updated_at")
+    )
+    stamp = ";".join(f"{key}={rows.get(key, (0, None))[0]}" for key in keys)
+    etag = '"%s"' % hashlib.md5(stamp.encode()).hexdigest()
+    modified = [updated_at for _, updated_at in rows.values()]
+    return etag, max(modified) if modified else None
+
+
+def is_not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        tags = [t.strip() for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+    since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+    return since is not None and last_modified is not None and int(last_modified.timestamp()) <= since
+
+
+def _conditional(request, keys, render):
+    etag, last_modified = validators(keys)
+    if is_not_modified(request, etag, last_modified):
+        response = Response(status=304)
+    else:
+        response = render()
+        if response.status_code != 200:
+            return response
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    return response
+
+
+def conditional_get(keys_for):
+    """
+    For DRF function views, placed under @api_view/@permission_classes so
+    permissions run first: keys_for(request, *args, **kwargs) -> list of version keys.
+    keys_for may return None when the resource is missing or not the caller's;
+    the view then runs unconditionally (and answers its own 404) instead of
+    a 304 being given for it.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            keys = keys_for(request, *args, **kwargs)
+            if keys is None:
+                return view(request, *args, **kwargs)
+            return _conditional(request, keys, lambda: view(request, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+class ConditionalListMixin:
+    """
+    For ViewSets: answers list() conditionally on `list_version_keys`.
+    """
+    list_version_keys = ()
+
+    def list(self, request, *args, **kwargs):
+        parent = super().list
+        return _conditional(request, list(self.list_version_keys), lambda: parent(request, *args, **kwargs))
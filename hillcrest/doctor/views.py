@@ -1,21 +1,72 @@
 # doctor/views.py
 
+from datetime import datetime, time, timedelta
+
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 
-from admin_panel.models import StaffProfile, BillingRecord
 from receptionist.models import Appointment
-from .models import Prescription, PrescriptionItem, LabOrder, PharmacyOrder
+from .archive import attach_archived_orders
+from .billing import enqueue_bill, enqueue_bills
+from .models import Prescription, PrescriptionItem, LabOrder, PharmacyOrder, ArchivedAppointment
 from .serializers import (
     PrescriptionSerializer,
     PrescriptionItemSerializer,
     LabOrderSerializer,
-    PharmacyOrderSerializer
+    PharmacyOrderSerializer,
+    TimelineVisitSerializer,
+    ArchivedVisitSerializer,
+    ConsultationSerializer,
 )
+from .idempotency import idempotent
+from .pagination import AppointmentKeysetPagination
 from .permissions import IsDoctor
+from .profiles import get_staff_profile
+from .versioning import conditional_get
+
+
+def worklist_queryset(doctor, params):
+    """
+    The doctor's appointments filtered by date_from / date_to / status.
+    Returns (queryset, errors).
+    """
+    appts = Appointment.objects.filter(doctor=doctor).select_related("patient")
+
+    # plain dates become datetime bounds so the (doctor, appointment_datetime) index is used
+    for param, lookup in (("date_from", "gte"), ("date_to", "lt")):
+        value = params.get(param)
+        if not value:
+            continue
+        # plain dates first (parse_datetime would take them as midnight); well-formed
+        # but impossible values such as 2024-02-30 raise ValueError
+        try:
+            d = parse_date(value)
+            if d is not None:
+                if param == "date_to":
+                    d += timedelta(days=1)
+                dt = datetime.combine(d, time.min)
+            else:
+                dt = parse_datetime(value)
+                if dt is None:
+                    return None, {param: "Invalid date."}
+                if param == "date_to":
+                    lookup = "lte"
+        except (ValueError, OverflowError):
+            return None, {param: "Invalid date."}
+        if timezone.is_naive(dt):
+            dt = timezone.make_aware(dt)
+        appts = appts.filter(**{f"appointment_datetime__{lookup}": dt})
+
+    if params.get("status"):
+        appts = appts.filter(status=params["status"].upper())
+
+    return appts, None
 
 
 # --------------------------------------------------------------
@@ -23,38 +74,127 @@ from .permissions import IsDoctor
 # --------------------------------------------------------------
 @api_view(["GET"])
 @permission_classes([IsAuthenticated, IsDoctor])
+@conditional_get(lambda request: [f"appointments:doctor:{getattr(request.staff_profile, 'id', None)}", "patients"])
 def my_appointments(request):
-    doctor = StaffProfile.objects.get(user=request.user)
-    appts = Appointment.objects.filter(doctor=doctor).order_by("-appointment_datetime")
+    """
+    Paginated worklist, newest first.
+    Query params: cursor, limit, date_from, date_to (YYYY-MM-DD or ISO datetime), status
+    """
+    doctor = get_staff_profile(request)
+    appts, errors = worklist_queryset(doctor, request.query_params)
+    if errors:
+        return Response(errors, status=400)
+
+    paginator = AppointmentKeysetPagination()
+    page = paginator.paginate_queryset(appts, request)
 
     from receptionist.serializers import AppointmentSerializer
-    return Response(AppointmentSerializer(appts, many=True).data)
+    return paginator.get_paginated_response(AppointmentSerializer(page, many=True).data)
 
 
 # --------------------------------------------------------------
 # APPOINTMENT DETAIL
 # --------------------------------------------------------------
+def own_appointment_keys(request, appt_id):
+    """
+    Version keys for the doctor's own appointment, live or archived; None when
+    it doesn't exist or belongs to someone else, so no 304 is given for it.
+    """
+    doctor = get_staff_profile(request)
+    doctor_id = getattr(doctor, "id", None)
+    if not (
+        Appointment.objects.filter(id=appt_id, doctor_id=doctor_id).exists()
+        or ArchivedAppointment.objects.filter(id=appt_id, doctor_id=doctor_id).exists()
+    ):
+        return None
+    return [f"appointment:{appt_id}", "patients"]
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated, IsDoctor])
+@conditional_get(own_appointment_keys)
 def appointment_detail(request, appt_id):
-    doctor = StaffProfile.objects.get(user=request.user)
+    doctor = get_staff_profile(request)
 
     try:
         appt = Appointment.objects.get(id=appt_id, doctor=doctor)
     except Appointment.DoesNotExist:
-        return Response({"detail": "Appointment not found or not assigned to you"}, status=404)
+        archived = ArchivedAppointment.objects.filter(id=appt_id, doctor_id=doctor.id).first()
+        if archived is None:
+            return Response({"detail": "Appointment not found or not assigned to you"}, status=404)
+        return Response(archived.data)
 
     from receptionist.serializers import AppointmentSerializer
     return Response(AppointmentSerializer(appt).data)
 
 
+# --------------------------------------------------------------
+# PATIENT TIMELINE
+# --------------------------------------------------------------
+@api_view(["GET"])
+@permission_classes([IsAuthenticated, IsDoctor])
+def patient_timeline(request, patient_id):
+    """
+    The patient's visits, newest first, each with its prescription (and items),
+    lab orders and pharmacy orders. Available to doctors who have an
+    appointment with the patient.
+    Query params: cursor, limit (keyset pagination as in my_appointments)
+
+    Archived visits and orders (doctor/archive.py) are merged in. Built with a
+    fixed number of queries whatever the page size: a page each of live and
+    archived appointments, then one each for prescriptions, items, lab orders,
+    pharmacy orders, archived lab orders and archived pharmacy orders.
+    """
+    doctor = get_staff_profile(request)
+    if not (
+        Appointment.objects.filter(patient_id=patient_id, doctor=doctor).exists()
+        or ArchivedAppointment.objects.filter(patient_id=patient_id, doctor_id=doctor.id).exists()
+    ):
+        return Response({"detail": "Patient not found or not seen by you"}, status=404)
+
+    paginator = AppointmentKeysetPagination()
+    page = paginator.paginate_querysets(
+        [
+            Appointment.objects.filter(patient_id=patient_id),
+            ArchivedAppointment.objects.filter(patient_id=patient_id),
+        ],
+        request,
+    )
+    live = [visit for visit in page if isinstance(visit, Appointment)]
+
+    # the patient_id filters let the (patient, created_at) indexes drive these
+    prefetch_related_objects(
+        live,
+        Prefetch(
+            "prescription",
+            queryset=Prescription.objects.filter(patient_id=patient_id).prefetch_related("items"),
+        ),
+        Prefetch(
+            "laborder_set",
+            queryset=LabOrder.objects.filter(patient_id=patient_id).order_by("created_at"),
+            to_attr="lab_orders",
+        ),
+        Prefetch(
+            "pharmacyorder_set",
+            queryset=PharmacyOrder.objects.filter(patient_id=patient_id).order_by("created_at"),
+            to_attr="pharmacy_orders",
+        ),
+    )
+    attach_archived_orders(page, patient_id)
+    return paginator.get_paginated_response([
+        (TimelineVisitSerializer if isinstance(visit, Appointment) else ArchivedVisitSerializer)(visit).data
+        for visit in page
+    ])
+
+
 # --------------------------------------------------------------
 # CREATE PRESCRIPTION (BASE)
 # --------------------------------------------------------------
 @api_view(["POST"])
 @permission_classes([IsAuthenticated, IsDoctor])
+@idempotent
 def create_prescription(request, appt_id):
-    doctor = StaffProfile.objects.get(user=request.user)
+    doctor = get_staff_profile(request)
 
     try:
         appt = Appointment.objects.get(id=appt_id, doctor=doctor)
@@ -84,8 +224,9 @@ def create_prescription(request, appt_id):
 # --------------------------------------------------------------
 @api_view(["POST"])
 @permission_classes([IsAuthenticated, IsDoctor])
+@idempotent
 def add_prescription_item(request, appt_id):
-    doctor = StaffProfile.objects.get(user=request.user)
+    doctor = get_staff_profile(request)
 
     try:
         appt = Appointment.objects.get(id=appt_id, doctor=doctor)
@@ -97,7 +238,10 @@ def add_prescription_item(request, appt_id):
     except Prescription.DoesNotExist:
         return Response({"detail": "Prescription does not exist"}, status=400)
 
-    serializer = PrescriptionItemSerializer(data=request.data)
+    # accepts a single item or a list of items; a list is validated as a
+    # whole and written with one INSERT
+    many = isinstance(request.data, list)
+    serializer = PrescriptionItemSerializer(data=request.data, many=many)
     if serializer.is_valid():
         serializer.save(prescription=pres)
         return Response(serializer.data, status=201)
@@ -106,13 +250,39 @@ def add_prescription_item(request, appt_id):
 
 
 
+def save_order_with_bill(serializer, appt, doctor, bill_type, id_key):
+    """
+    Save a lab / pharmacy order; the order and its outbox row commit
+    together and billing_worker writes the bill.
+    """
+    with transaction.atomic():
+        order = serializer.save()
+
+        total = order.total_amount()
+
+        if total > 0:
+            enqueue_bill(
+                bill_type=bill_type,
+                patient_name=appt.patient.full_name,
+                amount=total,
+                additional_info={
+                    id_key: order.id,
+                    "appointment_id": appt.id,
+                    "doctor_id": doctor.id
+                }
+            )
+
+    return order
+
+
 # --------------------------------------------------------------
 # LAB ORDER
 # --------------------------------------------------------------
 @api_view(["POST"])
 @permission_classes([IsAuthenticated, IsDoctor])
+@idempotent
 def create_lab_order(request, appt_id):
-    doctor = StaffProfile.objects.get(user=request.user)
+    doctor = get_staff_profile(request)
 
     try:
         appt = Appointment.objects.get(id=appt_id, doctor=doctor)
@@ -127,21 +297,7 @@ def create_lab_order(request, appt_id):
     })
 
     if serializer.is_valid():
-        order = serializer.save()
-
-        total = sum(float(t.get("price", 0)) for t in (order.tests or []))
-
-        if total > 0:
-            BillingRecord.objects.create(
-                bill_type="LAB",
-                patient_name=appt.patient.full_name,
-                amount=total,
-                additional_info={
-                    "lab_order_id": order.id,
-                    "appointment_id": appt.id
-                }
-            )
-
+        order = save_order_with_bill(serializer, appt, doctor, "LAB", "lab_order_id")
         return Response(LabOrderSerializer(order).data, status=201)
 
     return Response(serializer.errors, status=400)
@@ -152,8 +308,9 @@ def create_lab_order(request, appt_id):
 # --------------------------------------------------------------
 @api_view(["POST"])
 @permission_classes([IsAuthenticated, IsDoctor])
+@idempotent
 def create_pharmacy_order(request, appt_id):
-    doctor = StaffProfile.objects.get(user=request.user)
+    doctor = get_staff_profile(request)
 
     try:
         appt = Appointment.objects.get(id=appt_id, doctor=doctor)
@@ -168,27 +325,77 @@ def create_pharmacy_order(request, appt_id):
     })
 
     if serializer.is_valid():
-        order = serializer.save()
+        order = save_order_with_bill(serializer, appt, doctor, "PHARMACY", "pharmacy_order_id")
+        return Response(PharmacyOrderSerializer(order).data, status=201)
 
-        total = sum(
-            float(i.get("price", 0)) * int(i.get("qty", 1))
-            for i in (order.items or [])
-        )
+    return Response(serializer.errors, status=400)
 
-        if total > 0:
-            BillingRecord.objects.create(
-                bill_type="PHARMACY",
-                patient_name=appt.patient.full_name,
-                amount=total,
-                additional_info={
-                    "pharmacy_order_id": order.id,
-                    "appointment_id": appt.id
-                }
-            )
 
-        return Response(PharmacyOrderSerializer(order).data, status=201)
+# --------------------------------------------------------------
+# FINALIZE CONSULTATION (prescription + items + orders + complete)
+# --------------------------------------------------------------
+# a consultation can't be finalized from these
+CLOSED_APPOINTMENT_STATUSES = ("COMPLETED", "CANCELLED")
 
-    return Response(serializer.errors, status=400)
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated, IsDoctor])
+@idempotent
+def finalize_consultation(request, appt_id):
+    """
+    The whole visit in one request and one transaction, instead of
+    create_prescription, add-item, lab-order, pharmacy-order and complete.
+    Body: {
+        "notes": "...", "diagnosis": "...",
+        "items": [{"medicine_name": ..., "dosage": ..., "duration": ..., "instructions": ...}],
+        "tests": ["CBC", ...],
+        "pharmacy_items": [{"name": "Paracetamol", "qty": 2}]
+    }
+    Every part except the prescription itself is optional. Nothing is written
+    unless all of it is valid and in stock.
+    """
+    doctor = get_staff_profile(request)
+
+    serializer = ConsultationSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=400)
+
+    with transaction.atomic():
+        # locked so two submissions of the same visit can't both go through
+        appt = (
+            Appointment.objects.select_for_update().select_related("patient")
+            .filter(id=appt_id, doctor=doctor).first()
+        )
+        if appt is None:
+            return Response({"detail": "Appointment not found or not assigned to you"}, status=404)
+        # checked under the lock: a visit cancelled at the desk meanwhile is not billed or completed
+        if appt.status in CLOSED_APPOINTMENT_STATUSES:
+            return Response({"detail": f"This appointment is already {appt.status.lower()}"}, status=409)
+        if Prescription.objects.filter(appointment=appt).exists():
+            return Response({"detail": "This consultation already has a prescription"}, status=409)
+
+        prescription, lab_order, pharmacy_order = serializer.save(appointment=appt, doctor=doctor)
+
+        bills = []
+        for order, bill_type, id_key in ((lab_order, "LAB", "lab_order_id"),
+                                         (pharmacy_order, "PHARMACY", "pharmacy_order_id")):
+            total = order.total_amount() if order else 0
+            if total > 0:
+                info = {id_key: order.id, "appointment_id": appt.id, "doctor_id": doctor.id}
+                bills.append((bill_type, appt.patient.full_name, total, info))
+        if bills:
+            enqueue_bills(bills)
+
+        appt.status = "COMPLETED"
+        appt.save(update_fields=["status"])
+
+    return Response({
+        "appointment": appt.id,
+        "status": appt.status,
+        "prescription": PrescriptionSerializer(prescription).data,
+        "lab_order": LabOrderSerializer(lab_order).data if lab_order else None,
+        "pharmacy_order": PharmacyOrderSerializer(pharmacy_order).data if pharmacy_order else None,
+    }, status=201)
 
 
 # --------------------------------------------------------------
@@ -196,8 +403,9 @@ def create_pharmacy_order(request, appt_id):
 # --------------------------------------------------------------
 @api_view(["POST"])
 @permission_classes([IsAuthenticated, IsDoctor])
+@idempotent
 def mark_appointment_completed(request, appt_id):
-    doctor = StaffProfile.objects.get(user=request.user)
+    doctor = get_staff_profile(request)
 
     try:
         appt = Appointment.objects.get(id=appt_id, doctor=doctor)
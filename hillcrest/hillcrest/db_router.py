@@ -0,0 +1,110 @@
+"""
+Primary / read-replica routing for hillcrest.
+
+Reads go to a randomly chosen replica from settings.DATABASE_REPLICAS, except:
+
+- a request that isn't GET/HEAD/OPTIONS is pinned to the primary for its
+  whole duration;
+- once anything is written (db_for_write) the rest of the request reads the
+  primary, as does anything inside a transaction.atomic() block;
+- after a write, the client gets a short-lived cookie that keeps its next
+  requests on the primary until the replicas have caught up
+  (settings.REPLICA_PIN_SECONDS), giving read-your-writes across requests.
+
+ReplicaRoutingMiddleware sets up the per-request state, sync or async (the
+state is kept in context variables, which sync_to_async carries into the ORM
+threads and back); outside a request (management commands, workers) reads use
+replicas unless pinned explicitly with `use_primary()`.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+PIN_COOKIE = "db_pin_primary"
+
+_pinned = ContextVar("db_pinned_to_primary", default=False)
+_wrote = ContextVar("db_wrote", default=False)
+
+
+def replicas():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+def pin_to_primary():
+    _pinned.set(True)
+
+
+@contextmanager
+def use_primary():
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        choices = replicas()
+        # reads inside a transaction on the primary (select_for_update, read-then-write) stay there
+        if _pinned.get() or not choices or connections["default"].in_atomic_block:
+            return "default"
+        return random.choice(choices)
+
+    def db_for_write(self, model, **hints):
+        _pinned.set(True)
+        _wrote.set(True)
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
+
+
+class ReplicaRoutingMiddleware:
+    SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _start(self, request):
+        pinned = request.method not in self.SAFE_METHODS or PIN_COOKIE in request.COOKIES
+        return _pinned.set(pinned), _wrote.set(False)
+
+    def _finish(self, request, response):
+        if replicas() and (_wrote.get() or request.method not in self.SAFE_METHODS):
+            response.set_cookie(
+                PIN_COOKIE, "1",
+                max_age=getattr(settings, "REPLICA_PIN_SECONDS", 5),
+                httponly=True, samesite="Lax",
+            )
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        pin_token, wrote_token = self._start(request)
+        try:
+            return self._finish(request, self.get_response(request))
+        finally:
+            _wrote.reset(wrote_token)
+            _pinned.reset(pin_token)
+
+    async def __acall__(self, request):
+        pin_token, wrote_token = self._start(request)
+        try:
+            return self._finish(request, await self.get_response(request))
+        finally:
+            _wrote.reset(wrote_token)
+            _pinned.reset(pin_token)
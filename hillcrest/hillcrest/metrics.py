@@ -0,0 +1,223 @@
+"""
+Per-route request metrics in Prometheus text format.
+
+MetricsMiddleware records, for every request, the route pattern it resolved
+to (e.g. "doctor/appointments/<int:appt_id>/"), its latency, and the number
+and total time of the SQL queries it ran on any database alias. The numbers
+are served at /metrics (hillcrest/urls.py) to scrapers that send
+"Authorization: Bearer <settings.METRICS_TOKEN>".
+
+Counters are process-local: with several workers each one reports its own
+totals and Prometheus sums them across scrape targets.
+
+The middleware runs sync under WSGI and async under ASGI. Queries are
+counted by one execute wrapper installed on every connection object (Django
+keeps one per thread, and async views query from sync_to_async threads); it
+adds to the counter of the request in the current context, which
+sync_to_async carries into those threads.
+
+Queries run while a StreamingHttpResponse is being consumed, i.e. after
+the view has returned, are not counted.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+
+METRICS_ROUTE = "metrics"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RouteStats:
+    __slots__ = ("requests", "buckets", "latency_sum", "queries", "query_seconds", "max_queries")
+
+    def __init__(self, n_buckets):
+        self.requests = {}  # status -> count
+        self.buckets = [0] * (n_buckets + 1)  # last one is +Inf
+        self.latency_sum = 0.0
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.max_queries = 0
+
+
+class MetricsRegistry:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.bucket_bounds = tuple(sorted(buckets))
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def observe(self, route, method, status, seconds, queries, query_seconds):
+        with self._lock:
+            stats = self._routes.get((route, method))
+            if stats is None:
+                stats = self._routes[(route, method)] = RouteStats(len(self.bucket_bounds))
+            stats.requests[status] = stats.requests.get(status, 0) + 1
+            stats.buckets[bisect_left(self.bucket_bounds, seconds)] += 1
+            stats.latency_sum += seconds
+            stats.queries += queries
+            stats.query_seconds += query_seconds
+            stats.max_queries = max(stats.max_queries, queries)
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+    def render(self):
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = [
+                "# HELP hillcrest_http_requests_total Requests by route, method and status.",
+                "# TYPE hillcrest_http_requests_total counter",
+            ]
+            for (route, method), stats in routes:
+                for status, count in sorted(stats.requests.items()):
+                    lines.append(
+                        f'hillcrest_http_requests_total{{{_labels(route, method)},status="{status}"}} {count}'
+                    )
+
+            lines += [
+                "# HELP hillcrest_http_request_duration_seconds Request latency by route.",
+                "# TYPE hillcrest_http_request_duration_seconds histogram",
+            ]
+            for (route, method), stats in routes:
+                labels = _labels(route, method)
+                cumulative = 0
+                for bound, count in zip(self.bucket_bounds + ("+Inf",), stats.buckets):
+                    cumulative += count
+                    lines.append(f'hillcrest_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"hillcrest_http_request_duration_seconds_sum{{{labels}}} {stats.latency_sum:.6f}")
+                lines.append(f"hillcrest_http_request_duration_seconds_count{{{labels}}} {cumulative}")
+
+            for name, kind, help_text, attr, fmt in (
+                ("hillcrest_db_queries_total", "counter", "SQL queries run by route.", "queries", "{}"),
+                ("hillcrest_db_query_duration_seconds_total", "counter", "Time spent in SQL by route.",
+                 "query_seconds", "{:.6f}"),
+                ("hillcrest_db_queries_per_request_max", "gauge", "Most SQL queries seen in one request, by route.",
+                 "max_queries", "{}"),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                for (route, method), stats in routes:
+                    lines.append(f"{name}{{{_labels(route, method)}}} {fmt.format(getattr(stats, attr))}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(route, method):
+    return f'route="{_escape(route)}",method="{method}"'
+
+
+registry = MetricsRegistry(getattr(settings, "METRICS_LATENCY_BUCKETS", DEFAULT_BUCKETS))
+
+
+def route_of(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        # unresolved (404) paths are lumped together so they can't blow up the label set
+        return "<unmatched>"
+    return match.route or match.view_name or "<unnamed>"
+
+
+class QueryCounter:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+_current_counter = ContextVar("metrics_query_counter", default=None)
+
+
+def count_query(execute, sql, params, many, context):
+    counter = _current_counter.get()
+    if counter is None:  # outside a request
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        counter.queries += 1
+        counter.seconds += time.perf_counter() - start
+
+
+def install_query_counter(connection, **kwargs):
+    # outermost, so the append / pop of connection.execute_wrapper() blocks
+    # around it is left undisturbed
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, count_query)
+
+
+# every connection object gets the wrapper when it first connects, in
+# whichever thread that happens
+connection_created.connect(install_query_counter)
+
+
+class MetricsMiddleware:
+    """
+    Goes first in MIDDLEWARE so the latency covers the whole stack.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _start(self):
+        # connections opened before this module was imported
+        for conn in connections.all(initialized_only=True):
+            install_query_counter(conn)
+        counter = QueryCounter()
+        return counter, _current_counter.set(counter), time.perf_counter()
+
+    def _finish(self, request, status, counter, token, start):
+        _current_counter.reset(token)
+        if route_of(request) != METRICS_ROUTE:
+            registry.observe(
+                route_of(request), request.method, status,
+                time.perf_counter() - start, counter.queries, counter.seconds,
+            )
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        counter, token, start = self._start()
+        status = 500
+        try:
+            response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            self._finish(request, status, counter, token, start)
+
+    async def __acall__(self, request):
+        counter, token, start = self._start()
+        status = 500
+        try:
+            response = await self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            self._finish(request, status, counter, token, start)
+
+
+def metrics_view(request):
+    # 404 rather than 401 so the endpoint doesn't advertise itself; nobody
+    # gets in while METRICS_TOKEN is unset
+    token = getattr(settings, "METRICS_TOKEN", "")
+    scheme, _, credentials = request.headers.get("Authorization", "").partition(" ")
+    if not token or scheme.lower() != "bearer" or not constant_time_compare(credentials.strip(), token):
+        raise Http404
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
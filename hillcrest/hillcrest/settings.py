@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -40,11 +41,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'hillcrest.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'hillcrest.db_router.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -72,16 +75,64 @@ WSGI_APPLICATION = 'hillcrest.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'hospital_camp5',
-        'USER': 'root',
-        'PASSWORD': 'Aishu@2002',
-        'HOST': 'localhost',    
-        'PORT': '3306',
+# Connections are kept open per worker thread for DB_CONN_MAX_AGE seconds
+# (0 = close after every request, None = forever) and checked before reuse.
+#
+# Read replicas: DB_REPLICA_HOSTS=host1,host2 adds one alias per host; safe
+# GET traffic is spread over them by hillcrest.db_router.
+#
+# DB_ENGINE=sqlite runs locally with two SQLite aliases standing in for primary
+# and replica. They share one file by default (separate connections, so
+# read-your-writes pinning still matters); point DB_SQLITE_REPLICA at a copy
+# to simulate replication lag.
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'mysql')
+DB_CONN_MAX_AGE = os.environ.get('DB_CONN_MAX_AGE', '60')
+
+if DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            # a file, not the in-memory default, so the concurrency tests can run
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+            # writers queue for the lock at BEGIN instead of deadlocking mid-transaction
+            # (SQLite's stand-in for the row locks taken with select_for_update)
+            'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
+        },
+        'replica1': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_SQLITE_REPLICA', BASE_DIR / 'db.sqlite3'),
+            'TEST': {'MIRROR': 'default'},
+        },
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.mysql',
+            'NAME': os.environ.get('DB_NAME', 'hospital_camp5'),
+            'USER': os.environ.get('DB_USER', 'root'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', 'Aishu@2002'),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '3306'),
+        }
     }
-}
+    for i, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), start=1):
+        DATABASES[f'replica{i}'] = {
+            **DATABASES['default'],
+            'HOST': host.strip(),
+            'TEST': {'MIRROR': 'default'},
+        }
+
+for _db in DATABASES.values():
+    _db['CONN_MAX_AGE'] = None if DB_CONN_MAX_AGE == 'none' else int(DB_CONN_MAX_AGE)
+    _db['CONN_HEALTH_CHECKS'] = True
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['hillcrest.db_router.PrimaryReplicaRouter']
+
+# seconds a client keeps reading from the primary after it wrote something
+REPLICA_PIN_SECONDS = 5
 
 
 # Password validation
@@ -124,3 +175,87 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Process-local cache of user -> StaffProfile (doctor/profiles.py)
+
+STAFF_PROFILE_CACHE_SIZE = 1024
+STAFF_PROFILE_CACHE_TTL = 300  # seconds
+
+
+# Pharmacist dispensing queue lease (pharmacist/queue.py), and the age after
+# which expire_pharmacy_orders gives up undispensed orders (pharmacist/stock.py)
+
+PHARMACY_CLAIM_LEASE_SECONDS = 300
+PHARMACY_ORDER_EXPIRY_DAYS = 14
+
+
+# Lab result attachments (labtech/storage.py)
+
+LAB_RESULTS_ROOT = BASE_DIR / 'media' / 'lab_results'
+LAB_UPLOAD_LEASE_SECONDS = 600  # how long one chunk may take before another upload can take over
+
+
+# Default appointment length used by reception scheduling (reception/scheduling.py)
+
+APPOINTMENT_SLOT_MINUTES = 15
+
+
+# Departments / staff directory snapshot (admin/reference.py): how often each
+# worker re-checks the shared version counters
+
+REFERENCE_DATA_CHECK_SECONDS = 2
+
+
+# Lab test catalog cache (doctor/lab_catalog.py): same, for the "lab_tests" counter
+
+LAB_TEST_CACHE_CHECK_SECONDS = 2
+
+
+# Bulk employee import (admin/importing.py)
+
+EMPLOYEE_IMPORT_CHUNK_SIZE = 1000
+EMPLOYEE_IMPORT_MAX_ERRORS = 1000  # rows listed in the error report; the rest are only counted
+
+
+# Bulk account generation (admin/accounts.py): password hashing threads
+# (None = one per CPU) and the smallest batch worth starting them for
+
+ACCOUNT_HASH_WORKERS = None
+ACCOUNT_HASH_POOL_MIN = 4
+
+
+# Streaming exports (admin/exports.py): rows fetched per keyset page
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+# Per-route request / SQL metrics (hillcrest/metrics.py), served at /metrics
+# to requests with "Authorization: Bearer <METRICS_TOKEN>" (unset = disabled)
+
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# Idempotency-Key handling for the doctor POST endpoints (doctor/idempotency.py)
+
+IDEMPOTENCY_KEY_TTL = 24 * 3600  # seconds a stored response can be replayed
+IDEMPOTENCY_WAIT_SECONDS = 10  # how long a concurrent duplicate waits for the first request
+IDEMPOTENCY_PENDING_TIMEOUT = 60  # a claim older than this is taken over (its worker died)
+IDEMPOTENCY_PURGE_INTERVAL = 60
+
+
+# Hot/cold archival (doctor/archive.py, manage.py archive_records): finished
+# appointments and orders older than this move to the archive tables
+
+ARCHIVE_AFTER_DAYS = 365
+ARCHIVE_BATCH_SIZE = 500
+
+
+# Order events pushed to lab / pharmacy consoles over SSE (doctor/events.py):
+# frames kept per channel for Last-Event-ID replay, frames a slow console may
+# fall behind before it is told to resync, and the keep-alive interval
+
+ORDER_EVENTS_BACKLOG = 1000
+ORDER_EVENTS_QUEUE_SIZE = 500
+ORDER_EVENTS_HEARTBEAT_SECONDS = 15
@@ -0,0 +1,95 @@
+"""
+Test helpers.
+
+    from hillcrest.testing import assert_queries_do_not_grow
+
+    def test_worklist_has_no_n_plus_1(self):
+        assert_queries_do_not_grow(
+            lambda: self.client.get("/doctor/my-appointments/"),
+            lambda n: make_appointments(self.doctor, n),
+        )
+
+Concurrency tests (TransactionTestCase) start their writers together with
+`run_concurrently` and retry deadlock victims with `retry_locked`.
+"""
+import threading
+
+from django.db import OperationalError, connections
+from django.test.utils import CaptureQueriesContext
+
+
+def assert_queries_do_not_grow(request, add_rows, sizes=(1, 10), using="default"):
+    """
+    Call add_rows(k) to bring the result up to each size in `sizes` (k is the
+    number of rows to add since the previous size), run request() and count
+    its queries. Fails with both query logs when the counts differ, i.e.
+    when the endpoint does per-row queries (N+1).
+    Returns {size: query count}.
+    """
+    counts, logs = {}, {}
+    previous = 0
+    for size in sizes:
+        add_rows(size - previous)
+        previous = size
+        with CaptureQueriesContext(connections[using]) as ctx:
+            response = request()
+        status = getattr(response, "status_code", 200)
+        if status >= 400:
+            raise AssertionError(f"request failed with status {status} at size {size}")
+        counts[size] = len(ctx.captured_queries)
+        logs[size] = [q["sql"] for q in ctx.captured_queries]
+
+    if len(set(counts.values())) > 1:
+        detail = "\n".join(
+            f"--- {size} rows: {counts[size]} queries\n" + "\n".join(logs[size]) for size in sizes
+        )
+        raise AssertionError(f"query count grows with result size: {counts}\n{detail}")
+    return counts
+
+
+def skip_unless_concurrent_writes(test_case, using="default"):
+    """Call from setUp: an in-memory SQLite test database can't take writes from several threads."""
+    connection = connections[using]
+    if connection.vendor == "sqlite" and connection.is_in_memory_db():
+        test_case.skipTest("needs a test database that several threads can write to")
+
+
+def retry_locked(step, *args, **kwargs):
+    """
+    step(*args, **kwargs), run again while the database rolls it back as a
+    deadlock victim / "database is locked" (OperationalError), as a client
+    retrying the request would. step must be one transaction.
+    """
+    while True:
+        try:
+            return step(*args, **kwargs)
+        except OperationalError:
+            continue
+
+
+def run_concurrently(worker, workers=8):
+    """
+    Call worker(i) for i in range(workers), each in its own thread, all
+    released at the same moment. Each thread closes its database connections
+    when done. Returns the results by i; re-raises the first exception.
+    """
+    gate = threading.Barrier(workers)
+    results, errors = [None] * workers, []
+
+    def run(i):
+        try:
+            gate.wait()
+            results[i] = worker(i)
+        except BaseException as exc:
+            errors.append(exc)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
@@ -0,0 +1,75 @@
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.http import Http404, HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from doctor.models import ResourceVersion
+from .db_router import PIN_COOKIE, PrimaryReplicaRouter, ReplicaRoutingMiddleware
+from .metrics import MetricsMiddleware, metrics_view, registry
+
+
+def count_rows(request):
+    ResourceVersion.objects.count()
+    ResourceVersion.objects.count()
+    return HttpResponse("ok")
+
+
+async def acount_rows(request):
+    await ResourceVersion.objects.acount()
+    await sync_to_async(ResourceVersion.objects.count)()
+    return HttpResponse("ok")
+
+
+def queries_metric(route):
+    prefix = f'hillcrest_db_queries_total{{route="{route}",method="GET"}} '
+    for line in registry.render().splitlines():
+        if line.startswith(prefix):
+            return int(line[len(prefix):])
+    return None
+
+
+class MetricsMiddlewareTests(TestCase):
+    def setUp(self):
+        registry.reset()
+
+    def test_counts_sync_queries(self):
+        MetricsMiddleware(count_rows)(RequestFactory().get("/sync/"))
+        self.assertEqual(queries_metric("<unmatched>"), 2)
+
+    async def test_counts_async_queries(self):
+        middleware = MetricsMiddleware(acount_rows)
+        self.assertTrue(iscoroutinefunction(middleware))
+        await middleware(RequestFactory().get("/async/"))
+        self.assertEqual(queries_metric("<unmatched>"), 2)
+
+
+@override_settings(METRICS_TOKEN="s3cret")
+class MetricsViewTests(SimpleTestCase):
+    def test_requires_the_token(self):
+        factory = RequestFactory()
+        for headers in ({}, {"HTTP_AUTHORIZATION": "Bearer wrong"}, {"HTTP_AUTHORIZATION": "s3cret"}):
+            with self.assertRaises(Http404):
+                metrics_view(factory.get("/metrics", **headers))
+        response = metrics_view(factory.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret"))
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN="")
+    def test_disabled_without_a_token(self):
+        with self.assertRaises(Http404):
+            metrics_view(RequestFactory().get("/metrics", HTTP_AUTHORIZATION="Bearer "))
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRoutingMiddlewareTests(SimpleTestCase):
+    async def test_async_write_pins_the_client(self):
+        async def view(request):
+            await sync_to_async(PrimaryReplicaRouter().db_for_write)(ResourceVersion)
+            return HttpResponse("ok")
+
+        middleware = ReplicaRoutingMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = await middleware(RequestFactory().get("/"))
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_sync_read_does_not_pin(self):
+        response = ReplicaRoutingMiddleware(lambda request: HttpResponse("ok"))(RequestFactory().get("/"))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
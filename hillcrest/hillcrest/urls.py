@@ -17,6 +17,9 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path
 
+from .metrics import METRICS_ROUTE, metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path(METRICS_ROUTE, metrics_view),
 ]
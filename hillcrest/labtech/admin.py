@@ -1,3 +1,12 @@
 from django.contrib import admin
+from .models import LabResult, LabResultAttachment
 
-# Register your models here.
+class LabResultAttachmentInline(admin.TabularInline):
+    model = LabResultAttachment
+    extra = 0
+    readonly_fields = ("filename","content_type","size","received","sha256","is_complete","path")
+
+@admin.register(LabResult)
+class LabResultAdmin(admin.ModelAdmin):
+    list_display = ("id","order","technician","created_at")
+    inlines = [LabResultAttachmentInline]
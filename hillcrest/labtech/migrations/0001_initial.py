@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-17 15:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('admin_panel', '0004_alter_staffprofile_consultation_fee_and_more'),
+        ('doctor', '0006_pharmacyorder_claims'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LabResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('summary', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='results', to='doctor.laborder')),
+                ('technician', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='admin_panel.staffprofile')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LabResultAttachment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('filename', models.CharField(max_length=255)),
+                ('content_type', models.CharField(default='application/octet-stream', max_length=100)),
+                ('size', models.PositiveBigIntegerField()),
+                ('received', models.PositiveBigIntegerField(default=0)),
+                ('path', models.CharField(max_length=500)),
+                ('sha256', models.CharField(blank=True, max_length=64)),
+                ('is_complete', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('result', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attachments', to='labtech.labresult')),
+            ],
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-17 16:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0010_archive_tables'),
+        ('labtech', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='labresult',
+            name='order',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='results', to='doctor.laborder'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('labtech', '0002_labresult_order_no_constraint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='labresultattachment',
+            name='upload_token',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='labresultattachment',
+            name='upload_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,3 +1,40 @@
 from django.db import models
+from admin_panel.models import StaffProfile
+from doctor.models import LabOrder
 
-# Create your models here.
+
+class LabResult(models.Model):
+    # no database constraint: results stay put when their order is archived (doctor/archive.py)
+    order = models.ForeignKey(
+        LabOrder, on_delete=models.DO_NOTHING, db_constraint=False, related_name="results"
+    )
+    technician = models.ForeignKey(StaffProfile, on_delete=models.SET_NULL, null=True, blank=True)
+
+    summary = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"LabResult {self.id} for LabOrder {self.order_id}"
+
+
+class LabResultAttachment(models.Model):
+    result = models.ForeignKey(LabResult, on_delete=models.CASCADE, related_name="attachments")
+
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, default="application/octet-stream")
+    size = models.PositiveBigIntegerField()  # declared total size
+    received = models.PositiveBigIntegerField(default=0)  # bytes written so far (resume offset)
+    path = models.CharField(max_length=500)  # relative to settings.LAB_RESULTS_ROOT
+
+    sha256 = models.CharField(max_length=64, blank=True)  # set on completion, used as ETag
+    is_complete = models.BooleanField(default=False)
+
+    # lease on the next chunk while its body streams in (labtech/views.py upload_attachment)
+    upload_token = models.CharField(max_length=32, blank=True, default="")
+    upload_expires_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
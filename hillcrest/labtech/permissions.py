@@ -0,0 +1,26 @@
+# labtech/permissions.py
+from rest_framework.permissions import BasePermission
+from doctor.profiles import resolve_staff_profile
+
+
+class IsLabTechnician(BasePermission):
+    """
+    Allow access only to superusers or StaffProfile.role == 'LAB_TECHNICIAN'.
+    """
+    roles = ('LAB_TECHNICIAN',)
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        sp = resolve_staff_profile(request)
+        if user.is_superuser:
+            return True
+        return sp is not None and sp.role in self.roles
+
+
+class IsLabTechnicianOrDoctor(IsLabTechnician):
+    """
+    Lab technicians plus doctors, for reading results.
+    """
+    roles = ('LAB_TECHNICIAN', 'DOCTOR')
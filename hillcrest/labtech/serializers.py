@@ -0,0 +1,23 @@
+from rest_framework import serializers
+from .models import LabResult, LabResultAttachment
+
+
+class LabResultAttachmentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = LabResultAttachment
+        fields = ("id", "filename", "content_type", "size", "received", "sha256", "is_complete", "created_at")
+        read_only_fields = ("received", "sha256", "is_complete", "created_at")
+
+    def validate_size(self, value):
+        if value < 1:
+            raise serializers.ValidationError("Size must be positive.")
+        return value
+
+
+class LabResultSerializer(serializers.ModelSerializer):
+    attachments = LabResultAttachmentSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = LabResult
+        fields = ("id", "order", "technician", "summary", "attachments", "created_at")
+        read_only_fields = ("order", "technician", "created_at")
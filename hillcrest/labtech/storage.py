@@ -0,0 +1,78 @@
+# labtech/storage.py
+"""
+Disk storage for lab result attachments.
+
+Uploads arrive as sequential chunks (Content-Range) and are written straight
+to the target file in fixed-size pieces; downloads are read back the same
+way. Nothing holds more than CHUNK_SIZE bytes of a file in memory.
+"""
+import hashlib
+import os
+import uuid
+
+from django.conf import settings
+
+CHUNK_SIZE = 64 * 1024
+
+
+def results_root():
+    return str(getattr(settings, "LAB_RESULTS_ROOT", settings.BASE_DIR / "media" / "lab_results"))
+
+
+def new_relative_path(filename):
+    ext = os.path.splitext(filename)[1][:10]
+    name = uuid.uuid4().hex
+    return os.path.join(name[:2], name + ext)
+
+
+def absolute_path(relative_path):
+    return os.path.join(results_root(), relative_path)
+
+
+def append_stream(relative_path, offset, stream, length):
+    """
+    Copy `length` bytes from `stream` into the file at `offset`.
+    Returns the number of bytes written (less than `length` if the client hung up).
+    """
+    path = absolute_path(relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    mode = "r+b" if os.path.exists(path) else "wb"
+    written = 0
+    with open(path, mode) as fh:
+        fh.seek(offset)
+        fh.truncate()  # drop anything past the resume point from an interrupted chunk
+        while written < length:
+            chunk = stream.read(min(CHUNK_SIZE, length - written))
+            if not chunk:
+                break
+            fh.write(chunk)
+            written += len(chunk)
+    return written
+
+
+def file_sha256(relative_path):
+    digest = hashlib.sha256()
+    with open(absolute_path(relative_path), "rb") as fh:
+        for chunk in iter(lambda: fh.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_range(relative_path, start, end):
+    """Yield bytes start..end (inclusive) of the file in CHUNK_SIZE pieces."""
+    with open(absolute_path(relative_path), "rb") as fh:
+        fh.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = fh.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def delete_file(relative_path):
+    try:
+        os.remove(absolute_path(relative_path))
+    except FileNotFoundError:
+        pass
@@ -1,3 +1,100 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from admin_panel.models import StaffProfile
+from doctor.models import ArchivedLabOrder, LabOrder
+from doctor.profiles import profile_cache
+from hillcrest.testing import assert_queries_do_not_grow
+from receptionist.models import Appointment, Patient
+from .models import LabResult, LabResultAttachment
+
+User = get_user_model()
+
+
+@override_settings(ROOT_URLCONF="labtech.urls")
+class LabResultQueryCountTests(TestCase):
+    """Listing an order's results runs the same queries for 1 result as for 10."""
+
+    def setUp(self):
+        profile_cache.clear()
+        user = User.objects.create_user(username="lab_1_test", password="x")
+        self.technician = StaffProfile.objects.create(user=user, role="LAB_TECHNICIAN")
+        doctor = StaffProfile.objects.create(role="DOCTOR")
+        patient = Patient.objects.create(full_name="Jane Roe", phone="9000000000")
+        appt = Appointment.objects.create(patient=patient, doctor=doctor, appointment_datetime=timezone.now())
+        self.order = LabOrder.objects.create(appointment=appt, doctor=doctor, patient=patient, tests=[])
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        # the first request also fills the staff profile cache
+        self.client.get(f"/orders/{self.order.id}/results/")
+
+    def add_results(self, n):
+        # each result with two attachments
+        for i in range(n):
+            result = LabResult.objects.create(order=self.order, technician=self.technician, summary="Normal")
+            for j in range(2):
+                LabResultAttachment.objects.create(
+                    result=result, filename=f"scan-{i}-{j}.pdf", size=10, path=f"test/{i}-{j}.pdf"
+                )
+
+    def test_order_results(self):
+        assert_queries_do_not_grow(
+            lambda: self.client.get(f"/orders/{self.order.id}/results/"),
+            self.add_results,
+        )
+
+
+@override_settings(ROOT_URLCONF="labtech.urls")
+class DoctorScopeTests(TestCase):
+    """Doctors read the results of the lab orders they placed, and nobody else's."""
+
+    def setUp(self):
+        profile_cache.clear()
+        self.client, self.doctor = self.client_for("doc_3_test", "DOCTOR")
+        self.other_client, _ = self.client_for("doc_4_test", "DOCTOR")
+        patient = Patient.objects.create(full_name="Jane Roe", phone="9000000000")
+        appt = Appointment.objects.create(
+            patient=patient, doctor=self.doctor, appointment_datetime=timezone.now()
+        )
+        self.order = LabOrder.objects.create(appointment=appt, doctor=self.doctor, patient=patient, tests=[])
+        result = LabResult.objects.create(order=self.order, summary="Normal")
+        self.attachment = LabResultAttachment.objects.create(
+            result=result, filename="scan.pdf", size=10, path="test/scan.pdf", sha256="ab" * 32, is_complete=True
+        )
+
+    def client_for(self, username, role):
+        user = User.objects.create_user(username=username, password="x")
+        profile = StaffProfile.objects.create(user=user, role=role)
+        client = APIClient()
+        client.force_authenticate(user)
+        return client, profile
+
+    def download(self, client):
+        # a matching ETag answers 304 without touching storage
+        return client.get(
+            f"/attachments/{self.attachment.id}/", HTTP_IF_NONE_MATCH=f'"{self.attachment.sha256}"'
+        )
+
+    def test_order_results(self):
+        self.assertEqual(self.client.get(f"/orders/{self.order.id}/results/").status_code, 200)
+        self.assertEqual(self.other_client.get(f"/orders/{self.order.id}/results/").status_code, 404)
+        technician, _ = self.client_for("lab_2_test", "LAB_TECHNICIAN")
+        self.assertEqual(technician.get(f"/orders/{self.order.id}/results/").status_code, 200)
+
+    def test_archived_order_results(self):
+        ArchivedLabOrder.objects.create(
+            id=self.order.id, appointment_id=self.order.appointment_id, patient_id=self.order.patient_id,
+            created_at=self.order.created_at, data={"id": self.order.id, "doctor": self.doctor.id},
+        )
+        LabOrder.objects.filter(id=self.order.id).delete()
+
+        self.assertEqual(self.client.get(f"/orders/{self.order.id}/results/").status_code, 200)
+        self.assertEqual(self.other_client.get(f"/orders/{self.order.id}/results/").status_code, 404)
+        self.assertEqual(self.download(self.client).status_code, 304)
+        self.assertEqual(self.download(self.other_client).status_code, 404)
+
+    def test_download_attachment(self):
+        self.assertEqual(self.download(self.client).status_code, 304)
+        self.assertEqual(self.download(self.other_client).status_code, 404)
@@ -0,0 +1,16 @@
+from django.urls import path
+from doctor.events import CHANNEL_LAB, order_event_stream
+from . import views
+
+urlpatterns = [
+    # New / updated lab orders pushed as server-sent events (ASGI)
+    path("orders/events/", order_event_stream(CHANNEL_LAB, ("LAB_TECHNICIAN",))),
+
+    # Results for a lab order (list / add)
+    path("orders/<int:order_id>/results/", views.order_results),
+
+    # Attachments: start upload, send chunks / check resume offset, download
+    path("results/<int:result_id>/attachments/", views.create_attachment),
+    path("attachments/<int:attachment_id>/upload/", views.upload_attachment),
+    path("attachments/<int:attachment_id>/", views.download_attachment),
+]
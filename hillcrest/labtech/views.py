@@ -1,3 +1,257 @@
-from django.shortcuts import render
+# labtech/views.py
+import re
+import uuid
+from datetime import timedelta
 
-# Create your views here.
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from django.db import transaction
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+
+from doctor.events import publish_order_event
+from doctor.models import LabOrder, ArchivedLabOrder
+from doctor.profiles import resolve_staff_profile
+from . import storage
+from .models import LabResult, LabResultAttachment
+from .permissions import IsLabTechnician, IsLabTechnicianOrDoctor
+from .serializers import LabResultSerializer, LabResultAttachmentSerializer
+
+CONTENT_RANGE_RE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+UPLOAD_LEASE_SECONDS = getattr(settings, "LAB_UPLOAD_LEASE_SECONDS", 600)
+
+
+def _calling_doctor(request):
+    """
+    The caller's StaffProfile when they read as a doctor, else None. Doctors
+    only see the lab work they ordered; lab technicians and superusers see all.
+    """
+    staff = resolve_staff_profile(request)
+    if request.user.is_superuser or staff is None or staff.role != "DOCTOR":
+        return None
+    return staff
+
+
+def _ordering_doctor_id(order_id):
+    doctor_id = LabOrder.objects.filter(id=order_id).values_list("doctor_id", flat=True).first()
+    if doctor_id is None:
+        data = ArchivedLabOrder.objects.filter(id=order_id).values_list("data", flat=True).first()
+        doctor_id = (data or {}).get("doctor")
+    return doctor_id
+
+
+# --------------------------------------------------------------
+# RESULTS FOR A LAB ORDER
+# --------------------------------------------------------------
+@api_view(["GET", "POST"])
+@permission_classes([IsAuthenticated, IsLabTechnicianOrDoctor])
+def order_results(request, order_id):
+    doctor = _calling_doctor(request)
+    order = LabOrder.objects.filter(id=order_id).first()
+    if order is None:
+        # archived orders (doctor/archive.py) keep their results, read-only
+        archived = ArchivedLabOrder.objects.filter(id=order_id).values_list("data", flat=True).first()
+        if request.method == "GET" and archived is not None and (doctor is None or archived.get("doctor") == doctor.id):
+            results = LabResult.objects.filter(order_id=order_id).prefetch_related("attachments")
+            return Response(LabResultSerializer(results, many=True).data)
+        return Response({"detail": "Lab order not found"}, status=404)
+
+    if doctor is not None and order.doctor_id != doctor.id:
+        return Response({"detail": "Lab order not found"}, status=404)
+
+    if request.method == "GET":
+        results = order.results.prefetch_related("attachments")
+        return Response(LabResultSerializer(results, many=True).data)
+
+    if not IsLabTechnician().has_permission(request, None):
+        return Response({"detail": "Only lab technicians can add results"}, status=403)
+
+    serializer = LabResultSerializer(data=request.data)
+    if serializer.is_valid():
+        with transaction.atomic():
+            result = serializer.save(order=order, technician=resolve_staff_profile(request))
+            LabOrder.objects.filter(id=order.id).update(is_processed=True)
+            if not order.is_processed:
+                # update() sends no post_save; tell the lab consoles ourselves
+                order.is_processed = True
+                publish_order_event(order)
+        return Response(LabResultSerializer(result).data, status=201)
+
+    return Response(serializer.errors, status=400)
+
+
+# --------------------------------------------------------------
+# START AN ATTACHMENT UPLOAD
+# --------------------------------------------------------------
+@api_view(["POST"])
+@permission_classes([IsAuthenticated, IsLabTechnician])
+def create_attachment(request, result_id):
+    """
+    Body: {"filename": "...", "content_type": "...", "size": <total bytes>}
+    Then PUT the bytes to attachments/<id>/upload/ in one or more chunks.
+    """
+    try:
+        result = LabResult.objects.get(id=result_id)
+    except LabResult.DoesNotExist:
+        return Response({"detail": "Lab result not found"}, status=404)
+
+    serializer = LabResultAttachmentSerializer(data=request.data)
+    if serializer.is_valid():
+        attachment = serializer.save(
+            result=result,
+            path=storage.new_relative_path(serializer.validated_data["filename"]),
+        )
+        return Response(LabResultAttachmentSerializer(attachment).data, status=201)
+
+    return Response(serializer.errors, status=400)
+
+
+# --------------------------------------------------------------
+# CHUNKED / RESUMABLE UPLOAD
+# --------------------------------------------------------------
+@api_view(["GET", "PUT"])
+@permission_classes([IsAuthenticated, IsLabTechnician])
+def upload_attachment(request, attachment_id):
+    """
+    GET -> {"received": n, "size": total} so an interrupted client knows where to resume.
+    PUT -> raw bytes with "Content-Range: bytes <start>-<end>/<total>", where start
+           must equal the current "received" offset.
+    The body is read straight from the request stream (request.data is never touched).
+    """
+    if request.method == "GET":
+        try:
+            attachment = LabResultAttachment.objects.get(id=attachment_id)
+        except LabResultAttachment.DoesNotExist:
+            return Response({"detail": "Attachment not found"}, status=404)
+        return Response(LabResultAttachmentSerializer(attachment).data)
+
+    match = CONTENT_RANGE_RE.match(request.headers.get("Content-Range", ""))
+    if not match:
+        return Response({"detail": "Content-Range: bytes <start>-<end>/<total> required"}, status=400)
+    start, end, total = (int(g) for g in match.groups())
+    length = end - start + 1
+    if length < 1 or int(request.META.get("CONTENT_LENGTH") or 0) != length:
+        return Response({"detail": "Content-Length does not match Content-Range"}, status=400)
+
+    # one writer per attachment at a time: the chunk's range is reserved under a
+    # short row lock, the body is streamed with no transaction open, and the
+    # row is locked again only to record the result
+    token = uuid.uuid4().hex
+    with transaction.atomic():
+        try:
+            attachment = LabResultAttachment.objects.select_for_update().get(id=attachment_id)
+        except LabResultAttachment.DoesNotExist:
+            return Response({"detail": "Attachment not found"}, status=404)
+
+        if attachment.is_complete:
+            return Response({"detail": "Upload already complete"}, status=409)
+        if total != attachment.size or end >= attachment.size:
+            return Response({"detail": "Range outside declared size", "size": attachment.size}, status=400)
+        if start != attachment.received:
+            return Response(
+                {"detail": "Chunk does not start at the resume offset", "received": attachment.received},
+                status=409,
+            )
+        now = timezone.now()
+        if attachment.upload_token and attachment.upload_expires_at > now:
+            return Response({"detail": "Another chunk is being uploaded", "received": attachment.received}, status=409)
+
+        attachment.upload_token = token
+        attachment.upload_expires_at = now + timedelta(seconds=UPLOAD_LEASE_SECONDS)
+        attachment.save(update_fields=["upload_token", "upload_expires_at"])
+
+    try:
+        written = storage.append_stream(attachment.path, start, request, length)
+    except BaseException:
+        LabResultAttachment.objects.filter(id=attachment_id, upload_token=token).update(
+            upload_token="", upload_expires_at=None
+        )
+        raise
+    received = start + written
+    sha256 = storage.file_sha256(attachment.path) if received == attachment.size else ""
+
+    with transaction.atomic():
+        attachment = LabResultAttachment.objects.select_for_update().get(id=attachment_id)
+        if attachment.upload_token != token:
+            # the lease ran out and another upload took over; its offset wins
+            return Response({"detail": "Upload lease expired", "received": attachment.received}, status=409)
+        attachment.received = received
+        if sha256:
+            attachment.sha256 = sha256
+            attachment.is_complete = True
+        attachment.upload_token = ""
+        attachment.upload_expires_at = None
+        attachment.save(update_fields=[
+            "received", "sha256", "is_complete", "upload_token", "upload_expires_at", "updated_at",
+        ])
+
+    if written < length:
+        return Response({"detail": "Incomplete chunk", "received": attachment.received}, status=400)
+    return Response(LabResultAttachmentSerializer(attachment).data)
+
+
+# --------------------------------------------------------------
+# DOWNLOAD (ETag + Range)
+# --------------------------------------------------------------
+def _etag_matches(header, etag):
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated, IsLabTechnicianOrDoctor])
+def download_attachment(request, attachment_id):
+    try:
+        attachment = LabResultAttachment.objects.select_related("result").get(id=attachment_id, is_complete=True)
+    except LabResultAttachment.DoesNotExist:
+        return Response({"detail": "Attachment not found"}, status=404)
+
+    doctor = _calling_doctor(request)
+    if doctor is not None and _ordering_doctor_id(attachment.result.order_id) != doctor.id:
+        return Response({"detail": "Attachment not found"}, status=404)
+
+    etag = f'"{attachment.sha256}"'
+    size = attachment.size
+
+    if _etag_matches(request.headers.get("If-None-Match", ""), etag):
+        response = HttpResponse(status=304)
+        response["ETag"] = etag
+        return response
+
+    range_header = request.headers.get("Range", "")
+    if_range = request.headers.get("If-Range")
+    match = RANGE_RE.match(range_header) if range_header else None
+    if match and (if_range is None or if_range == etag):
+        first, last = match.groups()
+        if first:
+            start, end = int(first), min(int(last), size - 1) if last else size - 1
+        elif last:
+            start, end = max(size - int(last), 0), size - 1  # suffix range: last N bytes
+        else:
+            start, end = 0, -1
+        if start > end or start >= size:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+        response = StreamingHttpResponse(
+            storage.iter_range(attachment.path, start, end),
+            status=206,
+            content_type=attachment.content_type,
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(end - start + 1)
+    else:
+        response = FileResponse(
+            open(storage.absolute_path(attachment.path), "rb"),
+            content_type=attachment.content_type,
+        )
+
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Content-Disposition"] = content_disposition_header(False, attachment.filename)
+    return response
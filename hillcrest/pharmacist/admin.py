@@ -1,3 +1,14 @@
 from django.contrib import admin
+from .models import Medicine, StockMovement
 
-# Register your models here.
+@admin.register(Medicine)
+class MedicineAdmin(admin.ModelAdmin):
+    list_display = ("id","name","price","stock","reserved","is_active")
+    search_fields = ("name",)
+    # stock changes go through pharmacist/stock.py so they land in the ledger
+    readonly_fields = ("stock","reserved")
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ("id","medicine","order","kind","qty","staff","created_at")
+    list_filter = ("kind",)
@@ -0,0 +1,95 @@
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+
+from pharmacist.models import Medicine, StockMovement
+from pharmacist.stock import InsufficientStock, dispense_stock, reserve_stock
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark concurrent reserve+dispense on one popular SKU. "
+        "Starts with less stock than requested so it also checks nothing is oversold."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=20)
+        parser.add_argument("--ops", type=int, default=50, help="dispenses attempted per worker")
+        parser.add_argument("--stock", type=int, default=None, help="initial stock (default: 80%% of attempts)")
+        parser.add_argument("--keep", action="store_true", help="keep the benchmark medicine and ledger rows")
+
+    def handle(self, *args, **opts):
+        workers, ops = opts["workers"], opts["ops"]
+        attempts = workers * ops
+        initial = opts["stock"] if opts["stock"] is not None else int(attempts * 0.8)
+
+        medicine = Medicine.objects.create(name=f"__bench__{uuid.uuid4().hex[:8]}", price="1.00", stock=initial)
+        counts = {"ok": 0, "short": 0, "retry": 0}
+        lock = threading.Lock()
+        start_gate = threading.Barrier(workers)
+
+        def dispenser():
+            ok = short = 0
+            retries = [0]
+
+            def retrying(step):
+                # SQLite "database is locked" / MySQL deadlock victim: the step's
+                # transaction was rolled back, so run that step (only) again
+                while True:
+                    try:
+                        return step([(medicine.id, 1)])
+                    except OperationalError:
+                        retries[0] += 1
+
+            try:
+                start_gate.wait()
+                for _ in range(ops):
+                    try:
+                        retrying(reserve_stock)
+                    except InsufficientStock:
+                        short += 1
+                        continue
+                    retrying(dispense_stock)
+                    ok += 1
+            finally:
+                connection.close()
+                with lock:
+                    counts["ok"] += ok
+                    counts["short"] += short
+                    counts["retry"] += retries[0]
+
+        threads = [threading.Thread(target=dispenser) for _ in range(workers)]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+
+        medicine.refresh_from_db()
+        dispensed = StockMovement.objects.filter(medicine=medicine, kind=StockMovement.KIND_DISPENSE).count()
+        consistent = (
+            medicine.stock == initial - counts["ok"]
+            and medicine.reserved == 0
+            and dispensed == counts["ok"]
+            and counts["ok"] <= initial
+        )
+
+        self.stdout.write(
+            f"workers={workers} attempts={attempts} initial_stock={initial}\n"
+            f"dispensed={counts['ok']} rejected={counts['short']} retries={counts['retry']} "
+            f"final_stock={medicine.stock} reserved={medicine.reserved}\n"
+            f"elapsed={elapsed:.3f}s throughput={counts['ok'] / elapsed:.1f} dispenses/s"
+        )
+
+        if not opts["keep"]:
+            StockMovement.objects.filter(medicine=medicine).delete()
+            medicine.delete()
+
+        if consistent:
+            self.stdout.write(self.style.SUCCESS("stock consistent, no oversell"))
+        else:
+            self.stderr.write(self.style.ERROR("STOCK INCONSISTENT"))
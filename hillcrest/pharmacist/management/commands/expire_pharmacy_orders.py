@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from pharmacist.stock import ORDER_EXPIRY_DAYS, expire_orders, open_orders
+
+
+class Command(BaseCommand):
+    help = (
+        "Cancel undispensed pharmacy orders older than --days and release the stock "
+        "reserved for them. Safe to re-run, e.g. nightly from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=ORDER_EXPIRY_DAYS, help="expire orders older than this")
+        parser.add_argument("--limit", type=int, help="cancel at most this many orders")
+        parser.add_argument("--dry-run", action="store_true", help="only count what would be cancelled")
+
+    def handle(self, *args, **opts):
+        if opts["days"] < 1:
+            raise CommandError("--days must be at least 1")
+
+        if opts["dry_run"]:
+            before = timezone.now() - timedelta(days=opts["days"])
+            self.stdout.write(f"{open_orders().filter(created_at__lt=before).count()} orders to expire")
+            return
+
+        cancelled = expire_orders(days=opts["days"], limit=opts["limit"])
+        self.stdout.write(self.style.SUCCESS(f"{cancelled} orders expired, their reserved stock released"))
@@ -1,3 +1,58 @@
 from django.db import models
+from admin_panel.models import StaffProfile
 
-# Create your models here.
+
+class Medicine(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    # stock = units on the shelf, reserved = units promised to undispensed orders
+    stock = models.PositiveIntegerField(default=0)
+    reserved = models.PositiveIntegerField(default=0)
+
+    is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def available(self):
+        return self.stock - self.reserved
+
+
+class StockMovement(models.Model):
+    KIND_RESTOCK = "RESTOCK"
+    KIND_RESERVE = "RESERVE"
+    KIND_RELEASE = "RELEASE"
+    KIND_DISPENSE = "DISPENSE"
+
+    KIND_CHOICES = (
+        (KIND_RESTOCK, "Restock"),
+        (KIND_RESERVE, "Reserve"),
+        (KIND_RELEASE, "Release"),
+        (KIND_DISPENSE, "Dispense"),
+    )
+
+    medicine = models.ForeignKey(Medicine, on_delete=models.PROTECT, related_name="movements")
+    # no database constraint: movements keep the order id when the order is archived (doctor/archive.py)
+    order = models.ForeignKey(
+        "doctor.PharmacyOrder", null=True, blank=True, on_delete=models.DO_NOTHING, db_constraint=False,
+        related_name="stock_movements",
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    qty = models.PositiveIntegerField()
+    staff = models.ForeignKey(StaffProfile, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["medicine", "created_at"], name="stockmove_medicine_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.qty} x {self.medicine_id}"
@@ -0,0 +1,16 @@
+# pharmacist/permissions.py
+from rest_framework.permissions import BasePermission
+from doctor.profiles import resolve_staff_profile
+
+class IsPharmacist(BasePermission):
+    """
+    Allow access only to superusers or StaffProfile.role == 'PHARMACIST'.
+    """
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        sp = resolve_staff_profile(request)
+        if user.is_superuser:
+            return True
+        return sp is not None and sp.role == 'PHARMACIST'
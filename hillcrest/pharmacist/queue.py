@@ -0,0 +1,75 @@
+# pharmacist/queue.py
+"""
+Dispensing work queue.
+
+Pharmacists claim the oldest undispensed orders for a limited lease. On MySQL /
+PostgreSQL candidates are picked with SELECT ... FOR UPDATE SKIP LOCKED, so
+counters claiming at the same moment take different rows without waiting on
+each other. SQLite has no row locks; there every claim is a conditional
+UPDATE that only succeeds if the row is still unclaimed (compare-and-set).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from doctor.models import PharmacyOrder
+
+DEFAULT_LEASE_SECONDS = getattr(settings, "PHARMACY_CLAIM_LEASE_SECONDS", 300)
+
+
+def _claimable(now):
+    return PharmacyOrder.objects.filter(is_dispensed=False, cancelled_at__isnull=True).filter(
+        Q(claim_expires_at__isnull=True) | Q(claim_expires_at__lt=now)
+    )
+
+
+def claim_orders(pharmacist, limit=5, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """Claim up to `limit` of the oldest unclaimed orders. Returns the claimed orders."""
+    now = timezone.now()
+    expires = now + timedelta(seconds=lease_seconds)
+
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            ids = list(
+                _claimable(now)
+                .select_for_update(skip_locked=True)
+                .order_by("created_at", "id")
+                .values_list("id", flat=True)[:limit]
+            )
+            PharmacyOrder.objects.filter(id__in=ids).update(claimed_by=pharmacist, claim_expires_at=expires)
+        else:
+            ids = []
+            candidates = _claimable(now).order_by("created_at", "id").values_list("id", "claim_expires_at")
+            for order_id, old_expiry in candidates[:limit * 2]:
+                # only matches if nobody claimed the row since we read it
+                won = PharmacyOrder.objects.filter(
+                    id=order_id, is_dispensed=False, claim_expires_at=old_expiry
+                ).update(claimed_by=pharmacist, claim_expires_at=expires)
+                if won:
+                    ids.append(order_id)
+                    if len(ids) == limit:
+                        break
+
+    return list(PharmacyOrder.objects.filter(id__in=ids).order_by("created_at", "id"))
+
+
+def my_claims(pharmacist):
+    return PharmacyOrder.objects.filter(
+        claimed_by=pharmacist, is_dispensed=False, cancelled_at__isnull=True, claim_expires_at__gte=timezone.now()
+    ).order_by("created_at", "id")
+
+
+def holds_claim(order, pharmacist):
+    """True if nobody else holds a live lease on this order."""
+    if order.claim_expires_at is None or order.claim_expires_at < timezone.now():
+        return True
+    return order.claimed_by_id == getattr(pharmacist, "id", None)
+
+
+def release_claim(order_id, pharmacist):
+    return PharmacyOrder.objects.filter(id=order_id, claimed_by=pharmacist, is_dispensed=False).update(
+        claimed_by=None, claim_expires_at=None
+    )
@@ -0,0 +1,17 @@
+from rest_framework import serializers
+from .models import Medicine, StockMovement
+
+
+class MedicineSerializer(serializers.ModelSerializer):
+    available = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Medicine
+        fields = ("id", "name", "price", "stock", "reserved", "available", "is_active", "updated_at")
+        read_only_fields = ("stock", "reserved", "updated_at")
+
+
+class StockMovementSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockMovement
+        fields = ("id", "medicine", "order", "kind", "qty", "staff", "created_at")
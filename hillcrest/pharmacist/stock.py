@@ -0,0 +1,136 @@
+# pharmacist/stock.py
+"""
+Stock reservation / dispensing.
+
+Every change is a conditional UPDATE ... SET col = col +/- qty WHERE <enough stock>,
+so the check and the write happen in one statement under the row lock of that
+one medicine. Concurrent dispensers only wait on each other when they touch the
+same SKU, and never for longer than their own transaction.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from doctor.models import PharmacyOrder
+from .models import Medicine, StockMovement
+
+# undispensed orders older than this are given up by `manage.py expire_pharmacy_orders`
+ORDER_EXPIRY_DAYS = getattr(settings, "PHARMACY_ORDER_EXPIRY_DAYS", 14)
+
+
+class InsufficientStock(Exception):
+    def __init__(self, medicine_ids):
+        self.medicine_ids = medicine_ids
+        super().__init__(f"Insufficient stock for medicines {medicine_ids}")
+
+
+def _merge(lines):
+    # [(medicine_id, qty), ...] -> sorted, de-duplicated; a fixed lock order avoids deadlocks
+    merged = {}
+    for medicine_id, qty in lines:
+        merged[medicine_id] = merged.get(medicine_id, 0) + int(qty)
+    return sorted(merged.items())
+
+
+def _apply(lines, kind, condition, changes, order=None, staff=None):
+    lines = _merge(lines)
+    with transaction.atomic():
+        short = []
+        for medicine_id, qty in lines:
+            updated = (
+                Medicine.objects
+                .filter(pk=medicine_id, **condition(qty))
+                .update(**changes(qty))
+            )
+            if not updated:
+                short.append(medicine_id)
+        if short:
+            # leaving the atomic block with an exception undoes the rows already updated
+            raise InsufficientStock(short)
+
+        StockMovement.objects.bulk_create([
+            StockMovement(medicine_id=medicine_id, order=order, kind=kind, qty=qty, staff=staff)
+            for medicine_id, qty in lines
+        ])
+
+
+def reserve_stock(lines, order=None, staff=None):
+    """Promise units to an order; fails if stock - reserved would go negative."""
+    _apply(
+        lines, StockMovement.KIND_RESERVE,
+        condition=lambda qty: {"stock__gte": F("reserved") + qty},
+        changes=lambda qty: {"reserved": F("reserved") + qty},
+        order=order, staff=staff,
+    )
+
+
+def release_stock(lines, order=None, staff=None):
+    """Give back units reserved for an order that won't be dispensed."""
+    _apply(
+        lines, StockMovement.KIND_RELEASE,
+        condition=lambda qty: {"reserved__gte": qty},
+        changes=lambda qty: {"reserved": F("reserved") - qty},
+        order=order, staff=staff,
+    )
+
+
+def dispense_stock(lines, order=None, staff=None):
+    """Take reserved units off the shelf."""
+    _apply(
+        lines, StockMovement.KIND_DISPENSE,
+        condition=lambda qty: {"stock__gte": qty, "reserved__gte": qty},
+        changes=lambda qty: {"stock": F("stock") - qty, "reserved": F("reserved") - qty},
+        order=order, staff=staff,
+    )
+
+
+def restock(medicine_id, qty, staff=None):
+    with transaction.atomic():
+        Medicine.objects.filter(pk=medicine_id).update(stock=F("stock") + qty)
+        StockMovement.objects.create(medicine_id=medicine_id, kind=StockMovement.KIND_RESTOCK, qty=qty, staff=staff)
+
+
+def order_lines(order):
+    """(medicine_id, qty) pairs stored on PharmacyOrder.items."""
+    return [(i["medicine_id"], i["qty"]) for i in (order.items or []) if i.get("medicine_id")]
+
+
+def open_orders():
+    return PharmacyOrder.objects.filter(is_dispensed=False, cancelled_at__isnull=True)
+
+
+def cancel_order(order_id, staff=None):
+    """
+    Give up an undispensed order: release its reserved units and mark it
+    cancelled, under the order's row lock so it can't race a dispense or a
+    second cancel. Returns the order, or None if it was already dispensed or
+    cancelled (or doesn't exist).
+    """
+    with transaction.atomic():
+        order = open_orders().select_for_update().filter(id=order_id).first()
+        if order is None:
+            return None
+        release_stock(order_lines(order), order=order, staff=staff)
+        order.cancelled_at = timezone.now()
+        order.claimed_by = None
+        order.claim_expires_at = None
+        order.save(update_fields=["cancelled_at", "claimed_by", "claim_expires_at"])
+    return order
+
+
+def cancel_appointment_orders(appointment_id, staff=None):
+    """Cancel every open pharmacy order of an appointment. Returns how many were cancelled."""
+    ids = list(open_orders().filter(appointment_id=appointment_id).values_list("id", flat=True))
+    return sum(cancel_order(order_id, staff=staff) is not None for order_id in ids)
+
+
+def expire_orders(days=ORDER_EXPIRY_DAYS, limit=None):
+    """Cancel open orders created more than `days` ago (oldest first). Returns how many."""
+    before = timezone.now() - timedelta(days=days)
+    ids = open_orders().filter(created_at__lt=before).order_by("created_at", "id").values_list("id", flat=True)
+    if limit is not None:
+        ids = ids[:limit]
+    return sum(cancel_order(order_id) is not None for order_id in list(ids))
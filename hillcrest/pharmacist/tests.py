@@ -1,3 +1,239 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from admin_panel.models import StaffProfile
+from doctor.models import PharmacyOrder
+from doctor.profiles import profile_cache
+from hillcrest.testing import (
+    assert_queries_do_not_grow,
+    retry_locked,
+    run_concurrently,
+    skip_unless_concurrent_writes,
+)
+from receptionist.models import Appointment, Patient
+from .models import Medicine, StockMovement
+from .queue import claim_orders
+from .stock import InsufficientStock, dispense_stock, expire_orders, release_stock, reserve_stock
+
+User = get_user_model()
+
+
+@override_settings(ROOT_URLCONF="pharmacist.urls")
+class PharmacistQueryCountTests(TestCase):
+    """The pharmacist's list endpoints run the same queries for 1 row as for 10."""
+
+    def setUp(self):
+        profile_cache.clear()
+        user = User.objects.create_user(username="pha_1_test", password="x")
+        self.pharmacist = StaffProfile.objects.create(user=user, role="PHARMACIST")
+        self.doctor = StaffProfile.objects.create(role="DOCTOR")
+        self.patient = Patient.objects.create(full_name="Jane Roe", phone="9000000000")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        # the first request also fills the staff profile cache
+        self.client.get("/medicines/")
+
+    def add_medicines(self, n):
+        offset = Medicine.objects.count()
+        Medicine.objects.bulk_create([
+            Medicine(name=f"Medicine {i}", price=Decimal("12.50"), stock=100) for i in range(offset, offset + n)
+        ])
+
+    def add_claimed_orders(self, n):
+        for _ in range(n):
+            appt = Appointment.objects.create(
+                patient=self.patient, doctor=self.doctor, appointment_datetime=timezone.now()
+            )
+            PharmacyOrder.objects.create(
+                appointment=appt,
+                doctor=self.doctor,
+                patient=self.patient,
+                items=[{"name": "Paracetamol", "qty": 2, "price": 20}],
+                claimed_by=self.pharmacist,
+                claim_expires_at=timezone.now() + timedelta(minutes=5),
+            )
+
+    def test_medicine_list(self):
+        assert_queries_do_not_grow(lambda: self.client.get("/medicines/"), self.add_medicines)
+
+    def test_my_queue(self):
+        assert_queries_do_not_grow(lambda: self.client.get("/queue/mine/"), self.add_claimed_orders)
+
+
+def make_order(medicine, qty, doctor, patient, status="BOOKED", **fields):
+    """A pharmacy order for `qty` of `medicine` with the units reserved, as the doctor endpoints leave it."""
+    appt = Appointment.objects.create(
+        patient=patient, doctor=doctor, appointment_datetime=timezone.now(), status=status
+    )
+    order = PharmacyOrder.objects.create(
+        appointment=appt, doctor=doctor, patient=patient,
+        items=[{"medicine_id": medicine.id, "name": medicine.name, "qty": qty, "price": float(medicine.price)}],
+        **fields,
+    )
+    reserve_stock([(medicine.id, qty)], order=order, staff=doctor)
+    return order
+
+
+class StockConcurrencyTests(TransactionTestCase):
+    """Concurrent reserve / dispense / release on one SKU never oversell or leak reserved units."""
+
+    def setUp(self):
+        skip_unless_concurrent_writes(self)
+
+    def test_reserve_dispense_release(self):
+        initial, workers, ops = 30, 8, 6
+        medicine = Medicine.objects.create(name="Paracetamol", price=Decimal("1.00"), stock=initial)
+
+        def worker(i):
+            dispensed = released = short = 0
+            for op in range(ops):
+                try:
+                    retry_locked(reserve_stock, [(medicine.id, 1)])
+                except InsufficientStock:
+                    short += 1
+                    continue
+                # every third reservation is given back instead of dispensed
+                if op % 3 == 2:
+                    retry_locked(release_stock, [(medicine.id, 1)])
+                    released += 1
+                else:
+                    retry_locked(dispense_stock, [(medicine.id, 1)])
+                    dispensed += 1
+            return dispensed, released, short
+
+        results = run_concurrently(worker, workers)
+        dispensed = sum(r[0] for r in results)
+        released = sum(r[1] for r in results)
+
+        medicine.refresh_from_db()
+        self.assertLessEqual(dispensed, initial)
+        self.assertEqual(medicine.stock, initial - dispensed)
+        self.assertEqual(medicine.reserved, 0)
+        movements = StockMovement.objects.filter(medicine=medicine)
+        self.assertEqual(movements.filter(kind=StockMovement.KIND_DISPENSE).count(), dispensed)
+        self.assertEqual(movements.filter(kind=StockMovement.KIND_RELEASE).count(), released)
+        self.assertEqual(movements.filter(kind=StockMovement.KIND_RESERVE).count(), dispensed + released)
+
+
+class OrderCancellationTests(TestCase):
+    def setUp(self):
+        profile_cache.clear()
+        self.doctor = StaffProfile.objects.create(role="DOCTOR")
+        self.patient = Patient.objects.create(full_name="Jane Roe", phone="9000000000")
+        self.medicine = Medicine.objects.create(name="Paracetamol", price=Decimal("1.00"), stock=10)
+
+    def client_for(self, username, role):
+        user = User.objects.create_user(username=username, password="x")
+        profile = StaffProfile.objects.create(user=user, role=role)
+        client = APIClient()
+        client.force_authenticate(user)
+        return client, profile
+
+    def assert_released(self, order):
+        order.refresh_from_db()
+        self.medicine.refresh_from_db()
+        self.assertIsNotNone(order.cancelled_at)
+        self.assertEqual((self.medicine.stock, self.medicine.reserved), (10, 0))
+        self.assertTrue(
+            StockMovement.objects.filter(order=order, kind=StockMovement.KIND_RELEASE, qty=4).exists()
+        )
+
+    @override_settings(ROOT_URLCONF="reception.urls")
+    def test_cancelling_the_appointment_releases_its_orders(self):
+        order = make_order(self.medicine, 4, self.doctor, self.patient)
+        client, _ = self.client_for("rec_1_test", "RECEPTIONIST")
+
+        response = client.post(f"/appointments/{order.appointment_id}/cancel/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assert_released(order)
+
+    @override_settings(ROOT_URLCONF="pharmacist.urls")
+    def test_cancelled_order_is_not_dispensed_or_released_twice(self):
+        order = make_order(self.medicine, 4, self.doctor, self.patient)
+        client, _ = self.client_for("pha_2_test", "PHARMACIST")
+
+        self.assertEqual(client.post(f"/orders/{order.id}/cancel/").status_code, 200)
+        self.assertEqual(client.post(f"/orders/{order.id}/cancel/").status_code, 409)
+        self.assertEqual(client.post(f"/orders/{order.id}/dispense/").status_code, 409)
+        self.assert_released(order)
+
+    def test_abandoned_orders_expire(self):
+        old = make_order(self.medicine, 4, self.doctor, self.patient)
+        PharmacyOrder.objects.filter(id=old.id).update(created_at=timezone.now() - timedelta(days=30))
+        recent = make_order(self.medicine, 2, self.doctor, self.patient)
+
+        self.assertEqual(expire_orders(days=14), 1)
+
+        recent.refresh_from_db()
+        self.assertIsNone(recent.cancelled_at)
+        self.medicine.refresh_from_db()
+        self.assertEqual(self.medicine.reserved, 2)
+        old.refresh_from_db()
+        self.assertIsNotNone(old.cancelled_at)
+
+
+class ClaimQueueTests(TestCase):
+    def setUp(self):
+        profile_cache.clear()
+        self.doctor = StaffProfile.objects.create(role="DOCTOR")
+        self.patient = Patient.objects.create(full_name="Jane Roe", phone="9000000000")
+        self.medicine = Medicine.objects.create(name="Paracetamol", price=Decimal("1.00"), stock=10)
+        self.first, self.second = (StaffProfile.objects.create(role="PHARMACIST") for _ in range(2))
+
+    def test_expired_claim_can_be_reclaimed(self):
+        order = make_order(self.medicine, 1, self.doctor, self.patient)
+        self.assertEqual(claim_orders(self.first), [order])
+        self.assertEqual(claim_orders(self.second), [])
+
+        PharmacyOrder.objects.filter(id=order.id).update(claim_expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(claim_orders(self.second), [order])
+        order.refresh_from_db()
+        self.assertEqual(order.claimed_by_id, self.second.id)
+
+    @override_settings(ROOT_URLCONF="pharmacist.urls")
+    def test_dispensing_someone_elses_claim_is_refused(self):
+        order = make_order(self.medicine, 1, self.doctor, self.patient)
+        claim_orders(self.first)
+        user = User.objects.create_user(username="pha_3_test", password="x")
+        StaffProfile.objects.filter(id=self.second.id).update(user=user)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        response = client.post(f"/orders/{order.id}/dispense/")
+
+        self.assertEqual(response.status_code, 409)
+        order.refresh_from_db()
+        self.assertFalse(order.is_dispensed)
+        self.medicine.refresh_from_db()
+        self.assertEqual((self.medicine.stock, self.medicine.reserved), (10, 1))
+
+
+class ClaimQueueConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        skip_unless_concurrent_writes(self)
+
+    def test_concurrent_claims_never_share_an_order(self):
+        doctor = StaffProfile.objects.create(role="DOCTOR")
+        patient = Patient.objects.create(full_name="Jane Roe", phone="9000000000")
+        medicine = Medicine.objects.create(name="Paracetamol", price=Decimal("1.00"), stock=100)
+        for _ in range(40):
+            make_order(medicine, 1, doctor, patient)
+        pharmacists = [StaffProfile.objects.create(role="PHARMACIST") for _ in range(8)]
+
+        def worker(i):
+            return [order.id for order in retry_locked(claim_orders, pharmacists[i], limit=5)]
+
+        results = run_concurrently(worker, 8)
+        claimed = [order_id for ids in results for order_id in ids]
+        self.assertEqual(len(claimed), len(set(claimed)))
+        self.assertEqual(len(claimed), 40)
+        for pharmacist, ids in zip(pharmacists, results):
+            held = PharmacyOrder.objects.filter(claimed_by=pharmacist).values_list("id", flat=True)
+            self.assertEqual(sorted(held), sorted(ids))
@@ -0,0 +1,22 @@
+from django.urls import path
+from doctor.events import CHANNEL_PHARMACY, order_event_stream
+from . import views
+
+urlpatterns = [
+    # Medicine catalog & stock
+    path("medicines/", views.medicine_list),
+    path("medicines/<int:medicine_id>/restock/", views.restock_medicine),
+    path("medicines/<int:medicine_id>/movements/", views.medicine_movements),
+
+    # Dispensing queue
+    path("queue/claim/", views.claim_queue),
+    path("queue/mine/", views.my_queue),
+    path("orders/<int:order_id>/release/", views.release_order),
+    path("orders/<int:order_id>/cancel/", views.cancel_pharmacy_order),
+
+    # New / updated pharmacy orders pushed as server-sent events (ASGI)
+    path("orders/events/", order_event_stream(CHANNEL_PHARMACY, ("PHARMACIST",))),
+
+    # Dispense a pharmacy order
+    path("orders/<int:order_id>/dispense/", views.dispense_order),
+]
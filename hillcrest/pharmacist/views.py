@@ -1,3 +1,144 @@
-from django.shortcuts import render
+# pharmacist/views.py
 
-# Create your views here.
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from django.db import transaction
+
+from doctor.models import PharmacyOrder
+from doctor.profiles import resolve_staff_profile
+from doctor.serializers import PharmacyOrderSerializer
+from .models import Medicine, StockMovement
+from .permissions import IsPharmacist
+from .queue import DEFAULT_LEASE_SECONDS, claim_orders, holds_claim, my_claims, release_claim
+from .serializers import MedicineSerializer, StockMovementSerializer
+from .stock import InsufficientStock, cancel_order, dispense_stock, order_lines, restock
+
+
+# --------------------------------------------------------------
+# MEDICINE CATALOG / STOCK
+# --------------------------------------------------------------
+@api_view(["GET"])
+@permission_classes([IsAuthenticated, IsPharmacist])
+def medicine_list(request):
+    medicines = Medicine.objects.filter(is_active=True)
+    return Response(MedicineSerializer(medicines, many=True).data)
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated, IsPharmacist])
+def restock_medicine(request, medicine_id):
+    try:
+        qty = int(request.data.get("qty", 0))
+    except (TypeError, ValueError):
+        qty = 0
+    if qty < 1:
+        return Response({"qty": "Must be a positive integer."}, status=400)
+
+    if not Medicine.objects.filter(id=medicine_id).exists():
+        return Response({"detail": "Medicine not found"}, status=404)
+
+    restock(medicine_id, qty, staff=resolve_staff_profile(request))
+    return Response(MedicineSerializer(Medicine.objects.get(id=medicine_id)).data)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated, IsPharmacist])
+def medicine_movements(request, medicine_id):
+    if not Medicine.objects.filter(id=medicine_id).exists():
+        return Response({"detail": "Medicine not found"}, status=404)
+
+    movements = StockMovement.objects.filter(medicine_id=medicine_id)[:100]
+    return Response(StockMovementSerializer(movements, many=True).data)
+
+
+# --------------------------------------------------------------
+# DISPENSING QUEUE
+# --------------------------------------------------------------
+@api_view(["POST"])
+@permission_classes([IsAuthenticated, IsPharmacist])
+def claim_queue(request):
+    """
+    Claim the oldest pending orders for the calling pharmacist.
+    Body: {"limit": 5, "lease_seconds": 300}
+    """
+    try:
+        limit = max(1, min(int(request.data.get("limit", 5)), 50))
+        lease = max(30, min(int(request.data.get("lease_seconds", DEFAULT_LEASE_SECONDS)), 3600))
+    except (TypeError, ValueError):
+        return Response({"detail": "limit and lease_seconds must be integers"}, status=400)
+
+    orders = claim_orders(resolve_staff_profile(request), limit=limit, lease_seconds=lease)
+    return Response(PharmacyOrderSerializer(orders, many=True).data)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated, IsPharmacist])
+def my_queue(request):
+    orders = my_claims(resolve_staff_profile(request))
+    return Response(PharmacyOrderSerializer(orders, many=True).data)
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated, IsPharmacist])
+def release_order(request, order_id):
+    if not release_claim(order_id, resolve_staff_profile(request)):
+        return Response({"detail": "You don't hold a claim on this order"}, status=404)
+    return Response({"detail": "Claim released"})
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated, IsPharmacist])
+def cancel_pharmacy_order(request, order_id):
+    """
+    Give up an order that won't be dispensed (e.g. never collected): its
+    reserved units go back on the shelf.
+    """
+    pharmacist = resolve_staff_profile(request)
+    order = PharmacyOrder.objects.filter(id=order_id).first()
+    if order is None:
+        return Response({"detail": "Pharmacy order not found"}, status=404)
+    if not holds_claim(order, pharmacist):
+        return Response({"detail": "Order is claimed by another pharmacist"}, status=409)
+
+    order = cancel_order(order_id, staff=pharmacist)
+    if order is None:
+        return Response({"detail": "Order already dispensed or cancelled"}, status=409)
+    return Response(PharmacyOrderSerializer(order).data)
+
+
+# --------------------------------------------------------------
+# DISPENSE PHARMACY ORDER
+# --------------------------------------------------------------
+@api_view(["POST"])
+@permission_classes([IsAuthenticated, IsPharmacist])
+def dispense_order(request, order_id):
+    pharmacist = resolve_staff_profile(request)
+
+    with transaction.atomic():
+        try:
+            # lock only this order so two counters can't dispense it twice
+            order = PharmacyOrder.objects.select_for_update().get(id=order_id)
+        except PharmacyOrder.DoesNotExist:
+            return Response({"detail": "Pharmacy order not found"}, status=404)
+
+        if order.is_dispensed:
+            return Response({"detail": "Order already dispensed"}, status=400)
+
+        if order.cancelled_at is not None:
+            return Response({"detail": "Order was cancelled"}, status=409)
+
+        if not holds_claim(order, pharmacist):
+            return Response({"detail": "Order is claimed by another pharmacist"}, status=409)
+
+        try:
+            dispense_stock(order_lines(order), order=order, staff=pharmacist)
+        except InsufficientStock as exc:
+            return Response({"detail": "Insufficient stock", "medicine_ids": exc.medicine_ids}, status=409)
+
+        order.is_dispensed = True
+        order.claimed_by = None
+        order.claim_expires_at = None
+        order.save(update_fields=["is_dispensed", "claimed_by", "claim_expires_at"])
+
+    return Response(PharmacyOrderSerializer(order).data)
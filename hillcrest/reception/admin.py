@@ -1,3 +1,7 @@
 from django.contrib import admin
+from .models import AppointmentSlot
 
-# Register your models here.
+@admin.register(AppointmentSlot)
+class AppointmentSlotAdmin(admin.ModelAdmin):
+    list_display = ("id","appointment","doctor","start","end","is_active")
+    list_filter = ("is_active",)
@@ -0,0 +1,81 @@
+import random
+import statistics
+import string
+import time
+
+from django.core.management.base import BaseCommand
+
+from receptionist.models import Patient
+from reception.search import search_patients
+
+FIRST = ["Aisha", "Arjun", "Bilal", "Chen", "Divya", "Elena", "Farah", "Ganesh", "Hana", "Imran",
+         "Jane", "Karthik", "Lakshmi", "Mohan", "Nisha", "Omar", "Priya", "Rahul", "Sara", "Vikram"]
+LAST = ["Roe", "Kumar", "Khan", "Nair", "Iyer", "Patel", "Singh", "Das", "Menon", "Reddy",
+        "Fernandes", "Joseph", "Thomas", "Varma", "Pillai", "Shah", "Rao", "Bose", "Gupta", "Ali"]
+SEED_TAG = "Zbench"
+
+
+class Command(BaseCommand):
+    help = (
+        "Time patient typeahead queries. --seed N bulk-inserts N synthetic patients "
+        f"(last word '{SEED_TAG}', removed again with --cleanup)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--queries", type=int, default=500)
+        parser.add_argument("--limit", type=int, default=10)
+        parser.add_argument("--target-ms", type=float, default=50.0)
+        parser.add_argument("--cleanup", action="store_true")
+
+    def seed(self, count):
+        rng = random.Random(42)
+        batch = []
+        for i in range(count):
+            name = f"{rng.choice(FIRST)}{rng.choice(string.ascii_lowercase)} {rng.choice(LAST)} {SEED_TAG}"
+            phone = "9" + "".join(rng.choice(string.digits) for _ in range(9))
+            batch.append(Patient(full_name=name, phone=phone))
+            if len(batch) == 5000:
+                Patient.objects.bulk_create(batch)
+                batch = []
+                self.stdout.write(f"  seeded {i + 1}/{count}", ending="\r")
+        Patient.objects.bulk_create(batch)
+        self.stdout.write(f"  seeded {count}/{count}")
+
+    def handle(self, *args, **opts):
+        if opts["seed"]:
+            self.seed(opts["seed"])
+
+        total = Patient.objects.count()
+        rng = random.Random(7)
+        queries = []
+        for _ in range(opts["queries"]):
+            kind = rng.random()
+            if kind < 0.4:
+                queries.append(rng.choice(FIRST)[:rng.randint(2, 5)])
+            elif kind < 0.8:
+                queries.append(f"{rng.choice(FIRST)[:3]} {rng.choice(LAST)[:2]}")
+            else:
+                queries.append("9" + "".join(rng.choice(string.digits) for _ in range(rng.randint(2, 5))))
+
+        timings, hits = [], 0
+        for q in queries:
+            t0 = time.perf_counter()
+            hits += len(search_patients(q, opts["limit"]))
+            timings.append((time.perf_counter() - t0) * 1000)
+
+        timings.sort()
+        p50 = statistics.median(timings)
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(
+            f"patients={total} queries={len(queries)} avg_hits={hits / len(queries):.1f}\n"
+            f"p50={p50:.2f}ms p95={p95:.2f}ms max={timings[-1]:.2f}ms"
+        )
+        if p95 <= opts["target_ms"]:
+            self.stdout.write(self.style.SUCCESS(f"p95 within {opts['target_ms']}ms target"))
+        else:
+            self.stderr.write(self.style.ERROR(f"p95 above {opts['target_ms']}ms target"))
+
+        if opts["cleanup"]:
+            deleted, _ = Patient.objects.filter(full_name__endswith=f" {SEED_TAG}").delete()
+            self.stdout.write(f"removed {deleted} seeded rows")
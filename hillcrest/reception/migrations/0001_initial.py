@@ -0,0 +1,59 @@
+# Generated by Django 5.2.8 on 2026-10-17 15:59
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_slots(apps, schema_editor):
+    """
+    Give upcoming, not-cancelled appointments a slot so the overlap check sees them.
+    """
+    Appointment = apps.get_model('receptionist', 'Appointment')
+    AppointmentSlot = apps.get_model('reception', 'AppointmentSlot')
+    length = timedelta(minutes=getattr(settings, 'APPOINTMENT_SLOT_MINUTES', 15))
+
+    upcoming = (
+        Appointment.objects.filter(appointment_datetime__gte=timezone.now())
+        .exclude(status='CANCELLED')
+        .values_list('id', 'doctor_id', 'appointment_datetime')
+    )
+    batch = []
+    for appt_id, doctor_id, start in upcoming.iterator(chunk_size=1000):
+        batch.append(AppointmentSlot(appointment_id=appt_id, doctor_id=doctor_id, start=start, end=start + length))
+        if len(batch) >= 1000:
+            AppointmentSlot.objects.bulk_create(batch)
+            batch = []
+    AppointmentSlot.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('admin_panel', '0004_alter_staffprofile_consultation_fee_and_more'),
+        ('receptionist', '0004_alter_appointment_token_number'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateTimeField()),
+                ('end', models.DateTimeField()),
+                ('is_active', models.BooleanField(default=True)),
+                ('appointment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='slot', to='receptionist.appointment')),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='appointment_slots', to='admin_panel.staffprofile')),
+            ],
+            options={
+                'ordering': ['start'],
+                'indexes': [models.Index(fields=['doctor', 'start', 'end'], name='apptslot_doctor_interval_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_slots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Full-text index for reception/search.py. Patient lives in the receptionist
+# app, so the index is managed from here; what gets built depends on the backend.
+
+from django.db import migrations, models
+
+FTS_TABLE = 'reception_patient_fts'
+
+BTREE_INDEXES = [
+    models.Index(fields=['full_name'], name='patient_full_name_idx'),
+    models.Index(fields=['phone'], name='patient_phone_idx'),
+]
+
+
+def create_search_index(apps, schema_editor):
+    Patient = apps.get_model('receptionist', 'Patient')
+    table = Patient._meta.db_table
+    vendor = schema_editor.connection.vendor
+
+    for index in BTREE_INDEXES:
+        schema_editor.add_index(Patient, index)
+
+    if vendor == 'mysql':
+        schema_editor.execute(
+            f'CREATE FULLTEXT INDEX patient_search_ft ON {table} (full_name, phone)'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"full_name, phone, content='{table}', content_rowid='id', "
+            f"tokenize='unicode61', prefix='1 2 3')"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, full_name, phone) VALUES (new.id, new.full_name, new.phone); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, full_name, phone) "
+            f"VALUES ('delete', old.id, old.full_name, old.phone); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, full_name, phone) "
+            f"VALUES ('delete', old.id, old.full_name, old.phone); "
+            f"INSERT INTO {FTS_TABLE}(rowid, full_name, phone) VALUES (new.id, new.full_name, new.phone); END"
+        )
+        schema_editor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def drop_search_index(apps, schema_editor):
+    Patient = apps.get_model('receptionist', 'Patient')
+    table = Patient._meta.db_table
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'mysql':
+        schema_editor.execute(f'DROP INDEX patient_search_ft ON {table}')
+    elif vendor == 'sqlite':
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+    for index in BTREE_INDEXES:
+        schema_editor.remove_index(Patient, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reception', '0001_initial'),
+        ('receptionist', '0004_alter_appointment_token_number'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -1,3 +1,22 @@
 from django.db import models
+from admin_panel.models import StaffProfile
+from receptionist.models import Appointment
 
-# Create your models here.
+
+class AppointmentSlot(models.Model):
+    # the time interval an appointment blocks on the doctor's calendar
+    appointment = models.OneToOneField(Appointment, on_delete=models.CASCADE, related_name="slot")
+    doctor = models.ForeignKey(StaffProfile, on_delete=models.CASCADE, related_name="appointment_slots")
+
+    start = models.DateTimeField()
+    end = models.DateTimeField()
+    is_active = models.BooleanField(default=True)  # False once the appointment is cancelled
+
+    class Meta:
+        ordering = ["start"]
+        indexes = [
+            models.Index(fields=["doctor", "start", "end"], name="apptslot_doctor_interval_idx"),
+        ]
+
+    def __str__(self):
+        return f"Doctor {self.doctor_id}: {self.start:%Y-%m-%d %H:%M}-{self.end:%H:%M}"
@@ -0,0 +1,23 @@
+# reception/permissions.py
+from rest_framework.permissions import BasePermission
+from doctor.profiles import resolve_staff_profile
+
+
+class IsReceptionist(BasePermission):
+    """
+    Allow access only to superusers or StaffProfile.role == 'RECEPTIONIST'.
+    """
+    roles = ('RECEPTIONIST',)
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        sp = resolve_staff_profile(request)
+        if user.is_superuser:
+            return True
+        return sp is not None and sp.role in self.roles
+
+
+class IsReceptionistOrDoctor(IsReceptionist):
+    roles = ('RECEPTIONIST', 'DOCTOR')
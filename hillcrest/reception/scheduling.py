@@ -0,0 +1,70 @@
+# reception/scheduling.py
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from admin_panel.models import StaffProfile
+from .models import AppointmentSlot
+
+DEFAULT_SLOT_MINUTES = getattr(settings, "APPOINTMENT_SLOT_MINUTES", 15)
+
+
+class SlotTaken(Exception):
+    pass
+
+
+def overlapping(doctor_id, start, end):
+    # half-open intervals [start, end) overlap iff a.start < b.end and a.end > b.start
+    return AppointmentSlot.objects.filter(doctor_id=doctor_id, is_active=True, start__lt=end, end__gt=start)
+
+
+def book(doctor_id, start, end, create_appointment):
+    """
+    Reserve [start, end) for the doctor and create the appointment through
+    `create_appointment()`. Bookings for the same doctor are serialized on that
+    doctor's StaffProfile row, so two receptionists can't both win the same
+    slot, while bookings for other doctors are not blocked.
+    """
+    with transaction.atomic():
+        StaffProfile.objects.select_for_update().filter(id=doctor_id).exists()
+        if overlapping(doctor_id, start, end).exists():
+            raise SlotTaken()
+        appointment = create_appointment()
+        AppointmentSlot.objects.create(appointment=appointment, doctor_id=doctor_id, start=start, end=end)
+    return appointment
+
+
+def merge_intervals(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def free_slots(doctor_id, day, day_start, day_end, slot_minutes=DEFAULT_SLOT_MINUTES):
+    """
+    Free slot start times for a doctor on `day` between the working hours
+    day_start and day_end (datetime.time). One query for the busy intervals,
+    the rest is done in memory.
+    """
+    tz = timezone.get_current_timezone()
+    window_start = timezone.make_aware(datetime.combine(day, day_start), tz)
+    window_end = timezone.make_aware(datetime.combine(day, day_end), tz)
+
+    busy = merge_intervals(
+        overlapping(doctor_id, window_start, window_end).values_list("start", "end")
+    )
+
+    step = timedelta(minutes=slot_minutes)
+    slots, cursor = [], window_start
+    for busy_start, busy_end in busy + [[window_end, window_end]]:
+        while cursor + step <= min(busy_start, window_end):
+            slots.append(cursor)
+            cursor += step
+        cursor = max(cursor, busy_end)
+    return slots
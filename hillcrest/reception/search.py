@@ -0,0 +1,87 @@
+# reception/search.py
+"""
+Patient typeahead.
+
+Every whitespace-separated term of the query must be a prefix of a word in the
+patient's name or phone ("jan ro" finds "Jane Roe"). The lookup runs on a
+real full-text index:
+
+- MySQL:  FULLTEXT(full_name, phone), BOOLEAN MODE "+term*", ranked by MATCH score
+- SQLite: FTS5 table reception_patient_fts kept in sync by triggers, ranked by bm25
+- other backends: anchored istartswith on the b-tree indexes of full_name / phone
+
+The indexes are created by reception/migrations/0002_patient_search_index.py.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from receptionist.models import Patient
+
+FTS_TABLE = "reception_patient_fts"
+MAX_TERMS = 5
+MAX_RESULTS = 25
+
+# MySQL ignores prefixes shorter than innodb_ft_min_token_size (3 by default)
+MYSQL_MIN_PREFIX = 3
+
+
+def query_terms(q):
+    return re.findall(r"\w+", q or "", re.UNICODE)[:MAX_TERMS]
+
+
+def _mysql(terms, limit):
+    against = " ".join(f"+{t}*" for t in terms)
+    return list(
+        Patient.objects
+        .annotate(score=RawSQL("MATCH(full_name, phone) AGAINST (%s IN BOOLEAN MODE)", (against,)))
+        .filter(score__gt=0)
+        .order_by("-score", "id")[:limit]
+    )
+
+
+def _sqlite(terms, limit):
+    match = " ".join('"{}"*'.format(t.replace('"', '')) for t in terms)
+    with connection.cursor() as cursor:
+        # rank inside SQLite so the best matches win, not whichever rows the
+        # index yields first; ORDER BY + LIMIT keeps only the top `limit` rows
+        cursor.execute(
+            f"SELECT rowid, bm25({FTS_TABLE}) AS score FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+            " ORDER BY score, rowid LIMIT %s",
+            [match, limit],
+        )
+        ranked = cursor.fetchall()
+    patients = Patient.objects.in_bulk([pk for pk, _ in ranked])
+    results = []
+    for pk, rank in ranked:
+        if pk in patients:
+            patients[pk].score = -rank  # bm25 is lower-is-better
+            results.append(patients[pk])
+    return results
+
+
+def _prefix_scan(terms, limit):
+    # the first term narrows through the index; the rest must start a later word of the name
+    first, rest = terms[0], terms[1:]
+    qs = Patient.objects.filter(Q(full_name__istartswith=first) | Q(phone__startswith=first))
+    for term in rest:
+        qs = qs.filter(Q(full_name__istartswith=term) | Q(full_name__icontains=f" {term}"))
+    results = list(qs.order_by("full_name", "id")[:limit])
+    for p in results:
+        p.score = None
+    return results
+
+
+def search_patients(q, limit=10):
+    terms = query_terms(q)
+    if not terms:
+        return []
+    limit = max(1, min(limit, MAX_RESULTS))
+
+    if connection.vendor == "mysql" and all(len(t) >= MYSQL_MIN_PREFIX for t in terms):
+        return _mysql(terms, limit)
+    if connection.vendor == "sqlite":
+        return _sqlite(terms, limit)
+    return _prefix_scan(terms, limit)
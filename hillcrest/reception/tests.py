@@ -1,3 +1,108 @@
-from django.test import TestCase
+from datetime import datetime, time, timedelta
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from admin_panel.models import StaffProfile
+from doctor.profiles import profile_cache
+from hillcrest.testing import run_concurrently, skip_unless_concurrent_writes
+from receptionist.models import Appointment, Patient
+from .models import AppointmentSlot
+from .scheduling import free_slots
+
+User = get_user_model()
+
+
+def at(day, hour, minute=0):
+    return timezone.make_aware(datetime.combine(day, time(hour, minute)), timezone.get_current_timezone())
+
+
+def receptionist_client(username):
+    user = User.objects.get_or_create(username=username)[0]
+    StaffProfile.objects.get_or_create(user=user, role="RECEPTIONIST")
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@override_settings(ROOT_URLCONF="reception.urls")
+class BookingTests(TestCase):
+    def setUp(self):
+        profile_cache.clear()
+        self.client = receptionist_client("rec_2_test")
+        self.doctor = StaffProfile.objects.create(role="DOCTOR")
+        self.patient = Patient.objects.create(full_name="Jane Roe", phone="9000000000")
+        self.start = at(timezone.localdate() + timedelta(days=1), 10)
+
+    def book(self, doctor, start, minutes=30):
+        return self.client.post("/appointments/book/", {
+            "patient": self.patient.id,
+            "doctor": doctor.id,
+            "appointment_datetime": start.isoformat(),
+            "duration_minutes": minutes,
+        })
+
+    def test_overlapping_booking_is_refused(self):
+        self.assertEqual(self.book(self.doctor, self.start).status_code, 201)
+        self.assertEqual(self.book(self.doctor, self.start + timedelta(minutes=15)).status_code, 409)
+        # back to back is fine
+        self.assertEqual(self.book(self.doctor, self.start + timedelta(minutes=30)).status_code, 201)
+
+    def test_other_doctors_are_not_blocked(self):
+        other = StaffProfile.objects.create(role="DOCTOR")
+        self.assertEqual(self.book(self.doctor, self.start).status_code, 201)
+        self.assertEqual(self.book(other, self.start).status_code, 201)
+
+    def test_cancelling_frees_the_slot(self):
+        appt_id = self.book(self.doctor, self.start).data["id"]
+        self.assertEqual(self.client.post(f"/appointments/{appt_id}/cancel/").status_code, 200)
+
+        self.assertEqual(Appointment.objects.get(id=appt_id).status, "CANCELLED")
+        self.assertEqual(self.book(self.doctor, self.start).status_code, 201)
+
+    def test_free_slots_merge_overlapping_bookings(self):
+        day = self.start.date()
+        for start, end, active in (
+            (at(day, 9), at(day, 9, 30), True),
+            (at(day, 9, 15), at(day, 10), True),  # overlaps the first
+            (at(day, 10), at(day, 10, 15), True),  # touches the second
+            (at(day, 11, 5), at(day, 11, 10), True),  # off the 15 minute grid
+            (at(day, 10, 30), at(day, 11), False),  # cancelled
+        ):
+            appt = Appointment.objects.create(patient=self.patient, doctor=self.doctor, appointment_datetime=start)
+            AppointmentSlot.objects.create(appointment=appt, doctor=self.doctor, start=start, end=end, is_active=active)
+
+        slots = free_slots(self.doctor.id, day, time(9), time(12), 15)
+
+        self.assertEqual(slots, [
+            at(day, 10, 15), at(day, 10, 30), at(day, 10, 45),
+            at(day, 11, 10), at(day, 11, 25), at(day, 11, 40),
+        ])
+
+
+@override_settings(ROOT_URLCONF="reception.urls")
+class BookingConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        skip_unless_concurrent_writes(self)
+        profile_cache.clear()
+
+    def test_concurrent_bookings_for_one_slot(self):
+        doctor = StaffProfile.objects.create(role="DOCTOR")
+        patients = [Patient.objects.create(full_name=f"Patient {i}", phone=f"900000000{i}") for i in range(2)]
+        start = at(timezone.localdate() + timedelta(days=1), 10)
+        clients = [receptionist_client(f"rec_{i}_test") for i in (3, 4)]
+
+        def worker(i):
+            response = clients[i].post("/appointments/book/", {
+                "patient": patients[i].id,
+                "doctor": doctor.id,
+                "appointment_datetime": (start + timedelta(minutes=10 * i)).isoformat(),
+                "duration_minutes": 30,
+            })
+            return response.status_code
+
+        self.assertEqual(sorted(run_concurrently(worker, 2)), [201, 409])
+        self.assertEqual(AppointmentSlot.objects.filter(doctor=doctor, is_active=True).count(), 1)
+        self.assertEqual(Appointment.objects.filter(doctor=doctor).count(), 1)
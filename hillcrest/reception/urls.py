@@ -0,0 +1,14 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    # Book / cancel
+    path("appointments/book/", views.book_appointment),
+    path("appointments/<int:appt_id>/cancel/", views.cancel_appointment),
+
+    # Patient typeahead
+    path("patients/search/", views.patient_search),
+
+    # Doctor availability
+    path("doctors/<int:doctor_id>/free-slots/", views.doctor_free_slots),
+]
@@ -1,3 +1,121 @@
-from django.shortcuts import render
+# reception/views.py
+from datetime import time, timedelta
 
-# Create your views here.
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from django.db import transaction
+from django.utils.dateparse import parse_date, parse_time
+
+from doctor.profiles import resolve_staff_profile
+from pharmacist.stock import cancel_appointment_orders
+from receptionist.models import Appointment
+from receptionist.serializers import AppointmentSerializer
+from .models import AppointmentSlot
+from .permissions import IsReceptionist, IsReceptionistOrDoctor
+from .scheduling import DEFAULT_SLOT_MINUTES, SlotTaken, book, free_slots
+from .search import search_patients
+
+
+# --------------------------------------------------------------
+# BOOK APPOINTMENT (NO DOUBLE BOOKING)
+# --------------------------------------------------------------
+@api_view(["POST"])
+@permission_classes([IsAuthenticated, IsReceptionist])
+def book_appointment(request):
+    """
+    Same body as an Appointment, plus optional "duration_minutes".
+    Returns 409 if the doctor already has an appointment overlapping that time.
+    """
+    try:
+        minutes = int(request.data.get("duration_minutes", DEFAULT_SLOT_MINUTES))
+    except (TypeError, ValueError):
+        return Response({"duration_minutes": "Must be an integer."}, status=400)
+    if not 1 <= minutes <= 480:
+        return Response({"duration_minutes": "Must be between 1 and 480."}, status=400)
+
+    serializer = AppointmentSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=400)
+
+    doctor = serializer.validated_data["doctor"]
+    start = serializer.validated_data["appointment_datetime"]
+    end = start + timedelta(minutes=minutes)
+
+    try:
+        appt = book(doctor.id, start, end, serializer.save)
+    except SlotTaken:
+        return Response({"detail": "Doctor already has an appointment in this time slot"}, status=409)
+
+    data = AppointmentSerializer(appt).data
+    data["slot_end"] = end
+    return Response(data, status=201)
+
+
+# --------------------------------------------------------------
+# CANCEL APPOINTMENT (FREES THE SLOT)
+# --------------------------------------------------------------
+@api_view(["POST"])
+@permission_classes([IsAuthenticated, IsReceptionist])
+def cancel_appointment(request, appt_id):
+    with transaction.atomic():
+        appt = Appointment.objects.select_for_update().filter(id=appt_id).exclude(status="COMPLETED").first()
+        if appt is None:
+            return Response({"detail": "Appointment not found or already completed"}, status=404)
+        appt.status = "CANCELLED"
+        appt.save(update_fields=["status"])
+        AppointmentSlot.objects.filter(appointment_id=appt_id).update(is_active=False)
+        # medicines reserved for the visit go back on the shelf
+        cancel_appointment_orders(appt_id, staff=resolve_staff_profile(request))
+
+    return Response({"detail": "Appointment cancelled"})
+
+
+# --------------------------------------------------------------
+# FREE SLOTS FOR A DOCTOR ON A DAY
+# --------------------------------------------------------------
+@api_view(["GET"])
+@permission_classes([IsAuthenticated, IsReceptionistOrDoctor])
+def doctor_free_slots(request, doctor_id):
+    """
+    GET ?date=YYYY-MM-DD[&from=09:00&to=17:00&slot_minutes=15]
+    """
+    params = request.query_params
+    day = parse_date(params.get("date", ""))
+    day_start = parse_time(params.get("from", "")) or time(9, 0)
+    day_end = parse_time(params.get("to", "")) or time(17, 0)
+    try:
+        slot_minutes = int(params.get("slot_minutes", DEFAULT_SLOT_MINUTES))
+    except ValueError:
+        slot_minutes = 0
+    if day is None or day_start >= day_end or not 1 <= slot_minutes <= 480:
+        return Response({"detail": "date (YYYY-MM-DD), from < to and slot_minutes 1-480 required"}, status=400)
+
+    slots = free_slots(doctor_id, day, day_start, day_end, slot_minutes)
+    return Response({
+        "doctor": doctor_id,
+        "date": day,
+        "slot_minutes": slot_minutes,
+        "free_slots": slots,
+    })
+
+
+# --------------------------------------------------------------
+# PATIENT SEARCH / TYPEAHEAD
+# --------------------------------------------------------------
+@api_view(["GET"])
+@permission_classes([IsAuthenticated, IsReceptionistOrDoctor])
+def patient_search(request):
+    """
+    GET ?q=jan ro[&limit=10]  -> ranked patients whose name/phone words start with every term
+    """
+    try:
+        limit = int(request.query_params.get("limit", 10))
+    except ValueError:
+        limit = 10
+
+    patients = search_patients(request.query_params.get("q", ""), limit)
+    return Response([
+        {"id": p.id, "full_name": p.full_name, "phone": p.phone, "score": p.score}
+        for p in patients
+    ])